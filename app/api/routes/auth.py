@@ -1,9 +1,24 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, status, BackgroundTasks, Depends, Request
 from pydantic import BaseModel, EmailStr
-from app.core.database import get_db
-import bcrypt
+from typing import Optional
+from app.core.config import settings
+from app.core.database import ejecutar_db
+from app.core.lotes import LectorLote, cuerpo_lote_openapi, en_grupos, validar_fila, resultado_fallido
+from app.core.seguridad import hash_pool, HashSaturadoError, gestor_tokens, TokenInvalidoError, usuario_actual
+from app.services.catalogos_service import catalogos
+from app.services.revocacion_service import revocar_tokens, consumir_refresco
+import logging
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def error_saturado() -> HTTPException:
+    """Respuesta 429 cuando el pool de hashing no admite más trabajo"""
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Servidor ocupado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": "1"}
+    )
 
 class LoginRequest(BaseModel):
     correo: EmailStr
@@ -23,23 +38,46 @@ class RegisterRequest(BaseModel):
     ciudad: str
     estado: str
 
+class RefreshRequest(BaseModel):
+    refresco: str
+
+class LogoutRequest(BaseModel):
+    refresco: Optional[str] = None
+
 class LoginResponse(BaseModel):
     success: bool
     message: str
     usuario: dict
+    tokens: dict
+
+def _buscar_usuario_por_correo(conexion, correo: str):
+    """Buscar usuario por correo"""
+    cursor = conexion.cursor()
+    query = "SELECT * FROM Usuarios WHERE correo = %s"
+    cursor.execute(query, (correo,))
+    return cursor.fetchone()
+
+def _actualizar_contrasena(conexion, usuario_id: int, contrasena_hash: str):
+    cursor = conexion.cursor()
+    cursor.execute("UPDATE Usuarios SET contrasena = %s WHERE id = %s", (contrasena_hash, usuario_id))
+    conexion.commit()
+
+async def rehashear_contrasena(usuario_id: int, contrasena: str):
+    """Vuelve a hashear la contraseña con el factor de costo configurado"""
+    try:
+        contrasena_hash = await hash_pool.hashear(contrasena)
+        await ejecutar_db(_actualizar_contrasena, usuario_id, contrasena_hash)
+    except HashSaturadoError:
+        # Se reintentará en el próximo inicio de sesión
+        pass
+    except Exception as e:
+        logger.warning("No se pudo actualizar el hash del usuario %s: %s", usuario_id, e)
 
 @router.post("/login", response_model=LoginResponse)
-async def iniciar_sesion(credentials: LoginRequest):
+async def iniciar_sesion(credentials: LoginRequest, tareas: BackgroundTasks):
     """Endpoint para iniciar sesión"""
-    conexion = None
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
-        
-        # Buscar usuario por correo
-        query = "SELECT * FROM Usuarios WHERE correo = %s"
-        cursor.execute(query, (credentials.correo,))
-        usuario = cursor.fetchone()
+        usuario = await ejecutar_db(_buscar_usuario_por_correo, credentials.correo)
         
         if not usuario:
             raise HTTPException(
@@ -55,89 +93,101 @@ async def iniciar_sesion(credentials: LoginRequest):
             )
         
         # Verificar contraseña hasheada con bcrypt
-        if not bcrypt.checkpw(credentials.contrasena.encode('utf-8'), usuario['contrasena'].encode('utf-8')):
+        if not await hash_pool.verificar(credentials.contrasena, usuario['contrasena']):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Correo o contraseña incorrectos"
             )
         
+        # Actualizar el hash si se generó con otro factor de costo
+        if hash_pool.necesita_rehash(usuario['contrasena']):
+            tareas.add_task(rehashear_contrasena, usuario['id'], credentials.contrasena)
+        
         # Eliminar contraseña de la respuesta
         usuario_respuesta = {k: v for k, v in usuario.items() if k != 'contrasena'}
         
         return {
             "success": True,
             "message": "Inicio de sesión exitoso",
-            "usuario": usuario_respuesta
+            "usuario": usuario_respuesta,
+            "tokens": gestor_tokens.crear_tokens(usuario)
         }
             
     except HTTPException:
         raise
+    except HashSaturadoError:
+        raise error_saturado()
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error en el servidor: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
+
+def _correo_registrado(conexion, correo: str) -> bool:
+    """Verificar si el correo ya existe"""
+    cursor = conexion.cursor()
+    query_verificar = "SELECT id FROM Usuarios WHERE correo = %s"
+    cursor.execute(query_verificar, (correo,))
+    return cursor.fetchone() is not None
+
+QUERY_INSERTAR_USUARIO = """
+    INSERT INTO Usuarios (
+        idTipoUsuario, nombres, apellidoPaterno, apellidoMaterno,
+        correo, contrasena, telefono, direccion, colonia, codigoPostal,
+        ciudad, estado, estaActivo, verificado
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+def _valores_usuario(datos: RegisterRequest, contrasena_guardada: str) -> tuple:
+    return (
+        datos.idTipoUsuario,
+        datos.nombres,
+        datos.apellidoPaterno,
+        datos.apellidoMaterno,
+        datos.correo,
+        contrasena_guardada,
+        datos.telefono,
+        datos.direccion,
+        datos.colonia,
+        datos.codigoPostal,
+        datos.ciudad,
+        datos.estado,
+        1,  # estaActivo
+        0   # verificado
+    )
+
+def _insertar_usuario(conexion, datos: RegisterRequest, contrasena_guardada: str) -> dict:
+    """Insertar nuevo usuario y retornarlo"""
+    cursor = conexion.cursor()
+    try:
+        cursor.execute(QUERY_INSERTAR_USUARIO, _valores_usuario(datos, contrasena_guardada))
+        
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    
+    usuario_id = cursor.lastrowid
+    
+    # Obtener el usuario creado
+    query_usuario = "SELECT * FROM Usuarios WHERE id = %s"
+    cursor.execute(query_usuario, (usuario_id,))
+    return cursor.fetchone()
 
 @router.post("/register")
 async def registrar_usuario(datos: RegisterRequest):
     """Endpoint para registrar un nuevo usuario"""
-    conexion = None
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
-        
-        # Verificar si el correo ya existe
-        query_verificar = "SELECT id FROM Usuarios WHERE correo = %s"
-        cursor.execute(query_verificar, (datos.correo,))
-        usuario_existente = cursor.fetchone()
-        
-        if usuario_existente:
+        if await ejecutar_db(_correo_registrado, datos.correo):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="El correo electrónico ya está registrado"
             )
         
         # Hashear contraseña con bcrypt
-        salt = bcrypt.gensalt()
-        contrasena_hash = bcrypt.hashpw(datos.contrasena.encode('utf-8'), salt)
-        contrasena_guardada = contrasena_hash.decode('utf-8')
-        
-        # Insertar nuevo usuario
-        query_insertar = """
-            INSERT INTO Usuarios (
-                idTipoUsuario, nombres, apellidoPaterno, apellidoMaterno,
-                correo, contrasena, telefono, direccion, colonia, codigoPostal,
-                ciudad, estado, estaActivo, verificado
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(query_insertar, (
-            datos.idTipoUsuario,
-            datos.nombres,
-            datos.apellidoPaterno,
-            datos.apellidoMaterno,
-            datos.correo,
-            contrasena_guardada,
-            datos.telefono,
-            datos.direccion,
-            datos.colonia,
-            datos.codigoPostal,
-            datos.ciudad,
-            datos.estado,
-            1,  # estaActivo
-            0   # verificado
-        ))
+        contrasena_guardada = await hash_pool.hashear(datos.contrasena)
         
-        conexion.commit()
-        usuario_id = cursor.lastrowid
-        
-        # Obtener el usuario creado
-        query_usuario = "SELECT * FROM Usuarios WHERE id = %s"
-        cursor.execute(query_usuario, (usuario_id,))
-        usuario_nuevo = cursor.fetchone()
+        usuario_nuevo = await ejecutar_db(_insertar_usuario, datos, contrasena_guardada)
         
         # Eliminar contraseña de la respuesta
         usuario_respuesta = {k: v for k, v in usuario_nuevo.items() if k != 'contrasena'}
@@ -148,20 +198,207 @@ async def registrar_usuario(datos: RegisterRequest):
             "usuario": usuario_respuesta
         }
             
+    except HTTPException:
+        raise
+    except HashSaturadoError:
+        raise error_saturado()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en el servidor: {str(e)}"
+        )
+
+def _correos_registrados(conexion, correos: list) -> set:
+    """Correos (en minúsculas) que ya existen, con una sola consulta"""
+    if not correos:
+        return set()
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT correo FROM Usuarios WHERE correo IN ({', '.join(['%s'] * len(correos))})", correos)
+    return {fila["correo"].lower() for fila in cursor.fetchall()}
+
+def _insertar_lote_usuarios(conexion, usuarios: list, contrasenas_guardadas: list) -> dict:
+    """
+    Inserta un grupo de usuarios en una transacción con executemany.
+    Retorna correo (en minúsculas) -> id de los usuarios insertados.
+    """
+    cursor = conexion.cursor()
+    try:
+        conexion.begin()
+        # Otra petición pudo registrar alguno mientras se hasheaban las contraseñas
+        registrados = _correos_registrados(conexion, [usuario.correo for usuario in usuarios])
+        filas = [
+            (usuario, contrasena)
+            for usuario, contrasena in zip(usuarios, contrasenas_guardadas)
+            if usuario.correo.lower() not in registrados
+        ]
+        if not filas:
+            conexion.commit()
+            return {}
+        
+        cursor.executemany(QUERY_INSERTAR_USUARIO, [_valores_usuario(usuario, contrasena) for usuario, contrasena in filas])
+        
+        cursor.execute(
+            f"SELECT id, correo FROM Usuarios WHERE correo IN ({', '.join(['%s'] * len(filas))})",
+            [usuario.correo for usuario, _ in filas]
+        )
+        ids = {}
+        for fila in cursor.fetchall():
+            correo = fila["correo"].lower()
+            ids[correo] = max(ids.get(correo, 0), fila["id"])
+        
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    
+    return ids
+
+async def _registrar_grupo_usuarios(validos: list) -> list:
+    """Registra un grupo [(fila, RegisterRequest)] y retorna el resultado de cada fila"""
+    try:
+        registrados = await ejecutar_db(_correos_registrados, [usuario.correo for _, usuario in validos])
+        nuevos = [usuario for _, usuario in validos if usuario.correo.lower() not in registrados]
+        ids = {}
+        if nuevos:
+            # No se hashea la contraseña de un correo que ya existe
+            contrasenas_guardadas = await hash_pool.hashear_lote([usuario.contrasena for usuario in nuevos])
+            ids = await ejecutar_db(_insertar_lote_usuarios, nuevos, contrasenas_guardadas)
+    except HashSaturadoError:
+        return [resultado_fallido(numero, ["Servidor ocupado, intenta de nuevo con esta fila"]) for numero, _ in validos]
+    except Exception as e:
+        logger.error("No se pudo registrar un grupo de %s usuarios: %s", len(validos), e)
+        return [resultado_fallido(numero, [f"Error al guardar: {str(e)}"]) for numero, _ in validos]
+    
+    return [
+        {"fila": numero, "success": True, "usuario_id": ids[usuario.correo.lower()]}
+        if usuario.correo.lower() in ids
+        else resultado_fallido(numero, ["correo: El correo electrónico ya está registrado"])
+        for numero, usuario in validos
+    ]
+
+@router.post("/register-lote", openapi_extra=cuerpo_lote_openapi(RegisterRequest))
+async def registrar_usuarios_lote(request: Request, claims: dict = Depends(usuario_actual)):
+    """
+    Importa muchos usuarios (requiere sesión): un arreglo JSON de objetos como
+    RegisterRequest o un CSV (text/csv) con esas columnas. Las contraseñas se
+    hashean en paralelo en el pool de procesos y cada grupo de
+    LOTE_FILAS_POR_TRANSACCION filas se inserta en su propia transacción.
+    """
+    lector = LectorLote(request, settings.LOTE_MAX_FILAS)
+    resultados = []
+    correos_vistos = set()
+    
+    try:
+        async for grupo in en_grupos(lector.filas(), settings.LOTE_FILAS_POR_TRANSACCION):
+            validos = []
+            for numero, fila in grupo:
+                usuario, errores = validar_fila(RegisterRequest, fila)
+                if usuario is not None:
+                    correo = usuario.correo.lower()
+                    if correo in correos_vistos:
+                        usuario, errores = None, ["correo: repetido en el lote"]
+                    else:
+                        correos_vistos.add(correo)
+                if usuario is None:
+                    resultados.append(resultado_fallido(numero, errores))
+                else:
+                    validos.append((numero, usuario))
+            if validos:
+                resultados.extend(await _registrar_grupo_usuarios(validos))
+        
+        resultados.sort(key=lambda resultado: resultado["fila"])
+        creados = sum(1 for resultado in resultados if resultado["success"])
+        
+        return {
+            "success": True,
+            "message": f"{creados} de {len(resultados)} usuarios registrados",
+            "creados": creados,
+            "fallidos": len(resultados) - creados,
+            "filasExcedidas": lector.excedido,
+            "resultados": resultados
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en el servidor: {str(e)}"
+        )
+
+@router.post("/refresh")
+async def refrescar_sesion(datos: RefreshRequest):
+    """
+    Emite un nuevo par de tokens a partir de un token de refresco. El token se
+    marca como usado en la base antes de emitir: solo se puede usar una vez,
+    aunque lleguen dos refrescos simultáneos a workers distintos.
+    """
+    try:
+        claims = gestor_tokens.verificar(datos.refresco, tipo="refresco")
+    except TokenInvalidoError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de refresco inválido o expirado"
+        )
+    
+    try:
+        # El refresco es poco frecuente: aquí sí se comprueba que el usuario siga activo
+        usado_ahora, usuario = await consumir_refresco(claims)
+        if not usado_ahora:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token de refresco inválido o expirado"
+            )
+        if not usuario or usuario.get('estaActivo') != 1:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Usuario inactivo"
+            )
+        
+        return {
+            "success": True,
+            "message": "Sesión renovada",
+            "tokens": gestor_tokens.crear_tokens(usuario)
+        }
+    
     except HTTPException:
         raise
     except Exception as e:
-        if conexion:
-            conexion.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error en el servidor: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
 
 @router.post("/logout")
-async def cerrar_sesion():
-    """Endpoint para cerrar sesión (placeholder para cuando uses JWT)"""
-    return {"success": True, "message": "Sesión cerrada exitosamente"}
\ No newline at end of file
+async def cerrar_sesion(datos: Optional[LogoutRequest] = None, claims: dict = Depends(usuario_actual)):
+    """Endpoint para cerrar sesión: revoca el token de acceso y, si se envía, el de refresco"""
+    revocados = [claims]
+    if datos and datos.refresco:
+        try:
+            claims_refresco = gestor_tokens.verificar(datos.refresco, tipo="refresco")
+            if claims_refresco["sub"] == claims["sub"]:
+                revocados.append(claims_refresco)
+        except TokenInvalidoError:
+            pass
+    
+    try:
+        await revocar_tokens(*revocados)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en el servidor: {str(e)}"
+        )
+    
+    return {"success": True, "message": "Sesión cerrada exitosamente"}
+
+@router.get("/me")
+async def usuario_autenticado(claims: dict = Depends(usuario_actual)):
+    """Datos del usuario autenticado tomados del token"""
+    return {
+        "success": True,
+        "usuario": {
+            "id": int(claims["sub"]),
+            "idTipoUsuario": claims.get("idTipoUsuario"),
+            "tipoUsuario": catalogos.nombre_tipo_usuario(claims.get("idTipoUsuario"))
+        }
+    }
@@ -1,25 +1,52 @@
-from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form
-from pydantic import BaseModel
-from datetime import datetime
-from typing import Optional, List
-from app.core.database import get_db
-import boto3
-import os
-from dotenv import load_dotenv
+from fastapi import APIRouter, HTTPException, status, UploadFile, File, Form, Query, Depends, BackgroundTasks, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional, List, Dict
+from app.core.database import ejecutar_db, conexion_db, CursorSinBuffer
+from app.core.aws_clients import aws_clients, aws_gateway
+from app.core.config import settings
+from app.core.cache import cache_casos
+from app.core.etag import etag_coincide, no_modificado
+from app.core.lotes import LectorLote, cuerpo_lote_openapi, en_grupos, validar_fila, resultado_fallido
+from app.core.seguridad import usuario_actual
+from app.services.s3_service import S3Service
+from app.services.imagen_service import urls_variantes
+from app.services.indice_rostros_service import reindexar_caso, desindexar_caso
+from app.services.busqueda_service import indice_busqueda
+from app.services.geo_service import indice_geografico, casos_cercanos, caja_de_radio
+from app.services.estadisticas_service import estadisticas_casos, conciliar_estadisticas
+from app.services.catalogos_service import catalogos
+from app.services.versiones_service import (
+    incrementar_version_coleccion,
+    leer_version_caso,
+    leer_version_coleccion,
+    etag_caso,
+    etag_coleccion
+)
+from app.schemas.casos import (
+    Caso,
+    ListaCasosResponse,
+    BusquedaCasosResponse,
+    CasosCercanosResponse,
+    CasoDetalleResponse
+)
+import asyncio
+import base64
+import json
+import logging
+import orjson
 import uuid
-
-load_dotenv()
+from urllib.parse import urlparse
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Configuración de AWS S3
-s3_client = boto3.client(
-    's3',
-    region_name=os.getenv('AWS_REGION'),
-    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-)
-S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
+s3_client = aws_clients.s3
+s3_service = S3Service()
+S3_BUCKET_NAME = settings.S3_BUCKET_NAME
 
 class CasoCreate(BaseModel):
     idBeneficiario: int
@@ -30,6 +57,8 @@ class CasoCreate(BaseModel):
     entidad: str
     direccion: str
     fechaLimite: datetime
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
 
 class CasoUpdate(BaseModel):
     idCategoria: Optional[int] = None
@@ -41,6 +70,28 @@ class CasoUpdate(BaseModel):
     fechaLimite: Optional[datetime] = None
     idEstado: Optional[int] = None
     estaAbierto: Optional[int] = None
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
+
+class FiltrosCasos(BaseModel):
+    idEstado: Optional[int] = None
+    estaAbierto: Optional[int] = None
+    idCategoria: Optional[int] = None
+    entidad: Optional[str] = None
+    fechaLimiteDesde: Optional[datetime] = None
+    fechaLimiteHasta: Optional[datetime] = None
+
+class ImagenPresignada(BaseModel):
+    numero: int = Field(..., ge=1, le=4)
+    contentType: str
+    tamano: int = Field(..., gt=0)
+
+class SolicitudPresignado(BaseModel):
+    imagenes: List[ImagenPresignada]
+
+class ConfirmacionImagenes(BaseModel):
+    # Campo (imagen1..imagen4) -> clave S3 subida con la URL prefirmada
+    imagenes: Dict[str, str]
 
 class CasoResponse(BaseModel):
     success: bool
@@ -48,30 +99,71 @@ class CasoResponse(BaseModel):
     caso_id: int
     data: dict
 
+# Consulta base de un caso con su categoría y beneficiario.
+# El nombre de la categoría sale del catálogo en memoria, no de un JOIN.
+QUERY_CASO_COMPLETO = """
+    SELECT 
+        c.*,
+        cc.idCategoria,
+        u.nombres as nombreBeneficiario,
+        u.apellidoPaterno as apellidoBeneficiario,
+        u.apellidoMaterno as apellidoMaterno,
+        u.correo as correoBeneficiario,
+        u.telefono as telefonoBeneficiario
+    FROM Casos c
+    LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
+    LEFT JOIN Usuarios u ON c.idBeneficiario = u.id
+"""
+
+# Extensión de archivo para cada tipo de imagen aceptado
+EXTENSIONES_IMAGEN = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/heic": "heic"
+}
+
+CAMPOS_IMAGEN = ("imagen1", "imagen2", "imagen3", "imagen4")
+
 def traducir_estado(id_estado: int) -> str:
     """Traduce el ID del estado a texto legible"""
-    estados = {
-        1: "Activo",
-        2: "En Revisión",
-        3: "Pausado",
-        4: "Rechazado",
-        5: "Concluido"
-    }
-    return estados.get(id_estado, "Desconocido")
+    return catalogos.nombre_estado(id_estado)
 
 def traducir_esta_abierto(esta_abierto: int) -> str:
     """Traduce si el caso está abierto o cerrado"""
     return "Abierto" if esta_abierto == 1 else "Cerrado"
 
-def subir_imagen_s3(archivo: UploadFile, caso_id: int, numero_imagen: int) -> str:
+def validar_ubicacion(latitud: Optional[float], longitud: Optional[float]):
+    """La latitud y la longitud se envían juntas o ninguna"""
+    if (latitud is None) != (longitud is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Se deben enviar latitud y longitud juntas"
+        )
+
+def formatear_ubicacion(caso: dict) -> Optional[dict]:
+    if caso.get("latitud") is None or caso.get("longitud") is None:
+        return None
+    return {"latitud": float(caso["latitud"]), "longitud": float(caso["longitud"])}
+
+async def subir_imagen_s3(archivo: UploadFile, caso_id: int, numero_imagen: int) -> str:
     """Sube una imagen a S3 y retorna la URL"""
+    # Con normalización activa se guarda el original procesado junto a sus variantes
+    if settings.IMAGENES_NORMALIZAR:
+        return await s3_service.upload_image(
+            archivo,
+            f"casos/caso_{caso_id}/imagen_{numero_imagen}_{uuid.uuid4()}"
+        )
+    
     try:
         # Generar nombre único para la imagen
         extension = archivo.filename.split('.')[-1]
         nombre_archivo = f"casos/caso_{caso_id}/imagen_{numero_imagen}_{uuid.uuid4()}.{extension}"
         
         # Subir a S3
-        s3_client.upload_fileobj(
+        await aws_gateway.ejecutar(
+            "s3.upload_fileobj",
+            s3_client.upload_fileobj,
             archivo.file,
             S3_BUCKET_NAME,
             nombre_archivo,
@@ -79,12 +171,40 @@ def subir_imagen_s3(archivo: UploadFile, caso_id: int, numero_imagen: int) -> st
         )
         
         # Generar URL pública
-        url = f"https://{S3_BUCKET_NAME}.s3.{os.getenv('AWS_REGION')}.amazonaws.com/{nombre_archivo}"
-        return url
+        return url_publica_s3(nombre_archivo)
     except Exception as e:
         raise Exception(f"Error al subir imagen a S3: {str(e)}")
 
-def formatear_caso(caso: dict) -> dict:
+def url_publica_s3(clave: str) -> str:
+    """URL pública de un objeto del bucket"""
+    return f"https://{S3_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{clave}"
+
+def clave_s3_desde_url(url: str) -> str:
+    """Obtiene la clave del objeto S3 a partir de su URL pública"""
+    return urlparse(url).path.lstrip('/')
+
+async def eliminar_imagenes_s3(urls: list):
+    """Elimina de S3 las imágenes indicadas y sus variantes; los errores solo se registran"""
+    urls = [
+        url_variante
+        for url in urls
+        for url_variante in (urls_variantes(url) or {"original": url}).values()
+    ]
+    
+    async def eliminar(url):
+        try:
+            await aws_gateway.ejecutar(
+                "s3.delete_object",
+                s3_client.delete_object,
+                Bucket=S3_BUCKET_NAME,
+                Key=clave_s3_desde_url(url)
+            )
+        except Exception as e:
+            logger.warning("No se pudo eliminar la imagen huérfana %s: %s", url, e)
+    
+    await asyncio.gather(*[eliminar(url) for url in urls])
+
+def formatear_caso(caso: dict) -> Caso:
     """Formatea un caso con información estructurada"""
     return {
         "id": caso.get("id"),
@@ -94,6 +214,7 @@ def formatear_caso(caso: dict) -> dict:
         "montoRecaudado": caso.get("montoRecaudado", 0),
         "entidad": caso.get("entidad"),
         "direccion": caso.get("direccion"),
+        "ubicacion": formatear_ubicacion(caso),
         "fechaLimite": caso.get("fechaLimite"),
         "fechaCreacion": caso.get("fechaCreacion"),
         "imagenes": {
@@ -102,6 +223,12 @@ def formatear_caso(caso: dict) -> dict:
             "imagen3": caso.get("imagen3"),
             "imagen4": caso.get("imagen4")
         },
+        "imagenesVariantes": {
+            "imagen1": urls_variantes(caso.get("imagen1")),
+            "imagen2": urls_variantes(caso.get("imagen2")),
+            "imagen3": urls_variantes(caso.get("imagen3")),
+            "imagen4": urls_variantes(caso.get("imagen4"))
+        },
         "estado": {
             "id": caso.get("idEstado"),
             "nombre": traducir_estado(caso.get("idEstado"))
@@ -112,7 +239,7 @@ def formatear_caso(caso: dict) -> dict:
         },
         "categoria": {
             "id": caso.get("idCategoria"),
-            "nombre": caso.get("nombreCategoria")
+            "nombre": catalogos.nombre_categoria(caso.get("idCategoria"))
         },
         "beneficiario": {
             "id": caso.get("idBeneficiario"),
@@ -122,11 +249,106 @@ def formatear_caso(caso: dict) -> dict:
             "nombreCompleto": f"{caso.get('nombreBeneficiario', '')} {caso.get('apellidoBeneficiario', '')} {caso.get('apellidoMaterno', '')}".strip(),
             "correo": caso.get("correoBeneficiario"),
             "telefono": caso.get("telefonoBeneficiario")
-        }
+        },
+        "version": caso.get("version")
     }
 
+def _obtener_caso_completo(cursor, caso_id: int) -> Optional[dict]:
+    """Obtiene un caso con su categoría y beneficiario"""
+    cursor.execute(QUERY_CASO_COMPLETO + " WHERE c.id = %s", (caso_id,))
+    return cursor.fetchone()
+
+def _obtener_caso(conexion, caso_id: int) -> Optional[dict]:
+    return _obtener_caso_completo(conexion.cursor(), caso_id)
+
+QUERY_INSERTAR_CASO = """
+    INSERT INTO Casos (
+        idBeneficiario,
+        idEstado,
+        titulo,
+        descripcion,
+        montoObjetivo,
+        entidad,
+        direccion,
+        fechaLimite,
+        latitud,
+        longitud
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+QUERY_INSERTAR_CATEGORIA = """
+    INSERT INTO CasoCategorias (
+        idCaso,
+        idCategoria
+    ) VALUES (%s, %s)
+"""
+
+def _insertar_caso(conexion, idBeneficiario, idCategoria, titulo, descripcion, montoObjetivo,
+                   entidad, direccion, fecha_limite_dt, latitud=None, longitud=None) -> int:
+    """Inserta el caso (sin imágenes) y su categoría en una transacción corta"""
+    cursor = conexion.cursor()
+    try:
+        # Iniciar transacción
+        conexion.begin()
+        
+        cursor.execute(QUERY_INSERTAR_CASO, (
+            idBeneficiario,
+            1,  # Estado inicial: Activo
+            titulo,
+            descripcion,
+            montoObjetivo,
+            entidad,
+            direccion,
+            fecha_limite_dt,
+            latitud,
+            longitud
+        ))
+        
+        # Obtener el ID del caso recién creado
+        caso_id = cursor.lastrowid
+        
+        # Asignar la Categoría al Caso
+        cursor.execute(QUERY_INSERTAR_CATEGORIA, (caso_id, idCategoria))
+        
+        # Confirmar la transacción
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    
+    incrementar_version_coleccion(conexion)
+    return caso_id
+
+def _guardar_imagenes(conexion, caso_id: int, urls_imagenes: dict) -> Optional[dict]:
+    """Guarda las URLs de las imágenes y retorna el caso completo"""
+    cursor = conexion.cursor()
+    
+    if urls_imagenes:
+        campos_update = ", ".join([f"{campo} = %s" for campo in urls_imagenes.keys()])
+        query_imagenes = f"UPDATE Casos SET {campos_update}, version = version + 1 WHERE id = %s"
+        valores = list(urls_imagenes.values()) + [caso_id]
+        cursor.execute(query_imagenes, valores)
+        conexion.commit()
+        incrementar_version_coleccion(conexion)
+    
+    return _obtener_caso_completo(cursor, caso_id)
+
+def _eliminar_caso_creado(conexion, caso_id: int):
+    """Compensación: elimina un caso recién creado cuyas imágenes no se guardaron"""
+    cursor = conexion.cursor()
+    try:
+        conexion.begin()
+        cursor.execute("DELETE FROM CasoCategorias WHERE idCaso = %s", (caso_id,))
+        cursor.execute("DELETE FROM Casos WHERE id = %s", (caso_id,))
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    incrementar_version_coleccion(conexion)
+
 @router.post("/crear")
 async def crear_caso(
+    tareas: BackgroundTasks,
     idBeneficiario: int = Form(...),
     idCategoria: int = Form(...),
     titulo: str = Form(...),
@@ -135,6 +357,8 @@ async def crear_caso(
     entidad: str = Form(...),
     direccion: str = Form(...),
     fechaLimite: str = Form(...),
+    latitud: Optional[float] = Form(None, ge=-90, le=90),
+    longitud: Optional[float] = Form(None, ge=-180, le=180),
     imagen1: UploadFile = File(None),
     imagen2: UploadFile = File(None),
     imagen3: UploadFile = File(None),
@@ -144,47 +368,12 @@ async def crear_caso(
     Endpoint para crear un nuevo caso con hasta 4 imágenes.
     Las imágenes se suben a S3 y se guardan las URLs en la base de datos.
     """
-    conexion = None
+    validar_ubicacion(latitud, longitud)
+    
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
-        
-        # Iniciar transacción
-        conexion.begin()
-        
         # Convertir fechaLimite de string a datetime
         fecha_limite_dt = datetime.fromisoformat(fechaLimite.replace('Z', '+00:00'))
         
-        # Paso 1: Insertar el Caso Principal (sin imágenes primero)
-        query_caso = """
-            INSERT INTO Casos (
-                idBeneficiario,
-                idEstado,
-                titulo,
-                descripcion,
-                montoObjetivo,
-                entidad,
-                direccion,
-                fechaLimite
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        cursor.execute(query_caso, (
-            idBeneficiario,
-            1,  # Estado inicial: Activo
-            titulo,
-            descripcion,
-            montoObjetivo,
-            entidad,
-            direccion,
-            fecha_limite_dt
-        ))
-        
-        # Obtener el ID del caso recién creado
-        caso_id = cursor.lastrowid
-        
-        # Paso 2: Subir imágenes a S3 y obtener URLs
-        urls_imagenes = {}
         imagenes = [
             (imagen1, 1, 'imagen1'),
             (imagen2, 2, 'imagen2'),
@@ -192,50 +381,58 @@ async def crear_caso(
             (imagen4, 4, 'imagen4')
         ]
         
-        for imagen, numero, campo in imagenes:
-            if imagen and imagen.filename:
-                url = subir_imagen_s3(imagen, caso_id, numero)
-                urls_imagenes[campo] = url
-        
-        # Paso 3: Actualizar el caso con las URLs de las imágenes
-        if urls_imagenes:
-            campos_update = ", ".join([f"{campo} = %s" for campo in urls_imagenes.keys()])
-            query_imagenes = f"UPDATE Casos SET {campos_update} WHERE id = %s"
-            valores = list(urls_imagenes.values()) + [caso_id]
-            cursor.execute(query_imagenes, valores)
+        # Paso 1: Insertar el caso y su categoría (la transacción se cierra aquí)
+        caso_id = await ejecutar_db(
+            _insertar_caso,
+            idBeneficiario,
+            idCategoria,
+            titulo,
+            descripcion,
+            montoObjetivo,
+            entidad,
+            direccion,
+            fecha_limite_dt,
+            latitud,
+            longitud
+        )
         
-        # Paso 4: Asignar la Categoría al Caso
-        query_categoria = """
-            INSERT INTO CasoCategorias (
-                idCaso,
-                idCategoria
-            ) VALUES (%s, %s)
-        """
+        # Paso 2: Subir las imágenes a S3 en paralelo, sin conexión ni bloqueos abiertos
+        imagenes = [(imagen, numero, campo) for imagen, numero, campo in imagenes if imagen and imagen.filename]
+        resultados = await asyncio.gather(
+            *[subir_imagen_s3(imagen, caso_id, numero) for imagen, numero, _ in imagenes],
+            return_exceptions=True
+        )
+        urls_imagenes = {
+            campo: resultado
+            for (_, _, campo), resultado in zip(imagenes, resultados)
+            if not isinstance(resultado, BaseException)
+        }
         
-        cursor.execute(query_categoria, (caso_id, idCategoria))
+        try:
+            errores = [resultado for resultado in resultados if isinstance(resultado, BaseException)]
+            if errores:
+                raise errores[0]
+            
+            # Paso 3: Guardar las URLs de las imágenes
+            caso_creado = await ejecutar_db(_guardar_imagenes, caso_id, urls_imagenes)
+        except BaseException:
+            # Compensación: no dejar objetos huérfanos en S3 ni un caso a medias
+            await eliminar_imagenes_s3(list(urls_imagenes.values()))
+            try:
+                await ejecutar_db(_eliminar_caso_creado, caso_id)
+            except Exception as e:
+                logger.error("No se pudo eliminar el caso incompleto %s: %s", caso_id, e)
+            raise
+        finally:
+            await cache_casos.invalidar(caso_id)
         
-        # Confirmar la transacción
-        conexion.commit()
+        indice_busqueda.indexar_caso(caso_creado)
+        indice_geografico.actualizar_caso(caso_creado)
+        estadisticas_casos.actualizar_caso(caso_creado)
         
-        # Obtener el caso completo creado
-        query_obtener = """
-            SELECT 
-                c.*,
-                cc.idCategoria,
-                cat.nombre as nombreCategoria,
-                u.nombres as nombreBeneficiario,
-                u.apellidoPaterno as apellidoBeneficiario,
-                u.apellidoMaterno as apellidoMaterno,
-                u.correo as correoBeneficiario,
-                u.telefono as telefonoBeneficiario
-            FROM Casos c
-            LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
-            LEFT JOIN Categorias cat ON cc.idCategoria = cat.id
-            LEFT JOIN Usuarios u ON c.idBeneficiario = u.id
-            WHERE c.id = %s
-        """
-        cursor.execute(query_obtener, (caso_id,))
-        caso_creado = cursor.fetchone()
+        # Indexar los rostros de las imágenes después de responder
+        if urls_imagenes:
+            tareas.add_task(reindexar_caso, caso_id, urls_imagenes)
         
         return {
             "success": True,
@@ -246,132 +443,602 @@ async def crear_caso(
         }
         
     except Exception as e:
-        # Si algo falla, revertir la transacción
-        if conexion:
-            conexion.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al crear el caso: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
-
-@router.get("/listar")
-async def listar_casos():
-    """Listar todos los casos con sus categorías"""
-    conexion = None
+
+def _valores_insercion(caso: CasoCreate) -> tuple:
+    return (
+        caso.idBeneficiario,
+        1,  # Estado inicial: Activo
+        caso.titulo,
+        caso.descripcion,
+        caso.montoObjetivo,
+        caso.entidad,
+        caso.direccion,
+        caso.fechaLimite,
+        caso.latitud,
+        caso.longitud
+    )
+
+def _ids_existentes(cursor, tabla: str, ids: set) -> set:
+    if not ids:
+        return set()
+    cursor.execute(f"SELECT id FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(ids))})", list(ids))
+    return {fila["id"] for fila in cursor.fetchall()}
+
+def _insertar_grupo_casos(cursor, casos: list) -> list:
+    """
+    INSERT de varias filas con executemany. Si los IDs asignados no resultan
+    consecutivos desde lastrowid (executemany partió la sentencia o el servidor
+    intercaló otras inserciones), se deshace y se inserta fila por fila.
+    """
+    cursor.executemany(QUERY_INSERTAR_CASO, [_valores_insercion(caso) for caso in casos])
+    primero = cursor.lastrowid
+    cursor.execute(
+        "SELECT idBeneficiario, titulo FROM Casos WHERE id BETWEEN %s AND %s ORDER BY id",
+        (primero, primero + len(casos) - 1)
+    )
+    if [(fila["idBeneficiario"], fila["titulo"]) for fila in cursor.fetchall()] == \
+            [(caso.idBeneficiario, caso.titulo) for caso in casos]:
+        return list(range(primero, primero + len(casos)))
+    
+    cursor.connection.rollback()
+    cursor.connection.begin()
+    ids = []
+    for caso in casos:
+        cursor.execute(QUERY_INSERTAR_CASO, _valores_insercion(caso))
+        ids.append(cursor.lastrowid)
+    return ids
+
+def _insertar_lote_casos(conexion, casos: list) -> tuple:
+    """
+    Inserta un grupo de casos validados y sus categorías en una transacción.
+    Retorna (resultado por caso: ID o mensaje de error, filas completas creadas).
+    """
+    cursor = conexion.cursor()
+    beneficiarios = _ids_existentes(cursor, "Usuarios", {caso.idBeneficiario for caso in casos})
+    categorias = _ids_existentes(cursor, "Categorias", {caso.idCategoria for caso in casos})
+    
+    resultados = []
+    insertables = []
+    for caso in casos:
+        if caso.idBeneficiario not in beneficiarios:
+            resultados.append(f"idBeneficiario: no existe el usuario {caso.idBeneficiario}")
+        elif caso.idCategoria not in categorias:
+            resultados.append(f"idCategoria: no existe la categoría {caso.idCategoria}")
+        else:
+            resultados.append(None)
+            insertables.append(caso)
+    if not insertables:
+        return resultados, []
+    
+    try:
+        conexion.begin()
+        ids = _insertar_grupo_casos(cursor, insertables)
+        cursor.executemany(
+            QUERY_INSERTAR_CATEGORIA,
+            [(caso_id, caso.idCategoria) for caso_id, caso in zip(ids, insertables)]
+        )
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    incrementar_version_coleccion(conexion)
+    
+    ids_restantes = iter(ids)
+    resultados = [next(ids_restantes) if resultado is None else resultado for resultado in resultados]
+    return resultados, _obtener_casos_por_id(conexion, ids)
+
+def _indexar_casos_creados(casos: list):
+    for caso in casos:
+        indice_busqueda.indexar_caso(caso)
+        indice_geografico.actualizar_caso(caso)
+        estadisticas_casos.actualizar_caso(caso)
+
+async def _crear_grupo_casos(validos: list) -> list:
+    """Inserta un grupo [(fila, CasoCreate)] y retorna el resultado de cada fila"""
+    try:
+        resultados, casos_creados = await ejecutar_db(_insertar_lote_casos, [caso for _, caso in validos])
+    except Exception as e:
+        logger.error("No se pudo guardar un grupo de %s casos: %s", len(validos), e)
+        return [resultado_fallido(numero, [f"Error al guardar: {str(e)}"]) for numero, _ in validos]
+    
+    await cache_casos.invalidar(*[caso["id"] for caso in casos_creados])
+    # Indexar cientos de casos toma unos milisegundos: fuera del event loop
+    await asyncio.to_thread(_indexar_casos_creados, casos_creados)
+    
+    return [
+        {"fila": numero, "success": True, "caso_id": resultado}
+        if isinstance(resultado, int) else resultado_fallido(numero, [resultado])
+        for (numero, _), resultado in zip(validos, resultados)
+    ]
+
+@router.post("/crear-lote", openapi_extra=cuerpo_lote_openapi(CasoCreate))
+async def crear_casos_lote(request: Request, claims: dict = Depends(usuario_actual)):
+    """
+    Crea muchos casos (sin imágenes, requiere sesión) en una sola petición: un
+    arreglo JSON de objetos como CasoCreate o un CSV (text/csv) con esas
+    columnas. Las filas válidas se insertan en grupos de
+    LOTE_FILAS_POR_TRANSACCION, cada grupo en su propia transacción; la
+    respuesta trae el resultado de cada fila.
+    """
+    lector = LectorLote(request, settings.LOTE_MAX_FILAS)
+    resultados = []
+    
+    try:
+        async for grupo in en_grupos(lector.filas(), settings.LOTE_FILAS_POR_TRANSACCION):
+            validos = []
+            for numero, fila in grupo:
+                caso, errores = validar_fila(CasoCreate, fila)
+                if caso is not None and (caso.latitud is None) != (caso.longitud is None):
+                    caso, errores = None, ["ubicacion: la latitud y la longitud se envían juntas"]
+                if caso is None:
+                    resultados.append(resultado_fallido(numero, errores))
+                else:
+                    validos.append((numero, caso))
+            if validos:
+                resultados.extend(await _crear_grupo_casos(validos))
+        
+        resultados.sort(key=lambda resultado: resultado["fila"])
+        creados = sum(1 for resultado in resultados if resultado["success"])
+        
+        return {
+            "success": True,
+            "message": f"{creados} de {len(resultados)} casos creados",
+            "creados": creados,
+            "fallidos": len(resultados) - creados,
+            "filasExcedidas": lector.excedido,
+            "resultados": resultados
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al crear los casos: {str(e)}"
+        )
+
+def codificar_cursor(caso: dict) -> str:
+    """Codifica la posición (fechaCreacion, id) de un caso como cursor opaco"""
+    posicion = [caso["fechaCreacion"].isoformat(), caso["id"]]
+    return base64.urlsafe_b64encode(json.dumps(posicion).encode('utf-8')).decode('ascii')
+
+def decodificar_cursor(cursor: str) -> tuple:
+    """Obtiene la posición (fechaCreacion, id) a partir de un cursor"""
+    try:
+        fecha, caso_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(fecha), int(caso_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+def construir_filtros(filtros: FiltrosCasos, posicion: Optional[tuple] = None) -> tuple:
+    """Construye la cláusula WHERE y sus valores a partir de los filtros"""
+    condiciones = []
+    valores = []
+    
+    if filtros.idEstado is not None:
+        condiciones.append("c.idEstado = %s")
+        valores.append(filtros.idEstado)
+    if filtros.estaAbierto is not None:
+        condiciones.append("c.estaAbierto = %s")
+        valores.append(filtros.estaAbierto)
+    if filtros.idCategoria is not None:
+        condiciones.append("cc.idCategoria = %s")
+        valores.append(filtros.idCategoria)
+    if filtros.entidad is not None:
+        condiciones.append("c.entidad = %s")
+        valores.append(filtros.entidad)
+    if filtros.fechaLimiteDesde is not None:
+        condiciones.append("c.fechaLimite >= %s")
+        valores.append(filtros.fechaLimiteDesde)
+    if filtros.fechaLimiteHasta is not None:
+        condiciones.append("c.fechaLimite <= %s")
+        valores.append(filtros.fechaLimiteHasta)
+    
+    # Keyset: casos posteriores a la última posición devuelta
+    if posicion is not None:
+        condiciones.append("(c.fechaCreacion < %s OR (c.fechaCreacion = %s AND c.id < %s))")
+        valores.extend([posicion[0], posicion[0], posicion[1]])
+    
+    where = " WHERE " + " AND ".join(condiciones) if condiciones else ""
+    return where, valores
+
+def _listar_casos(conexion, filtros: FiltrosCasos, posicion: Optional[tuple], limite: int) -> list:
+    """Obtiene una página de casos ordenados por fecha de creación"""
+    where, valores = construir_filtros(filtros, posicion)
+    cursor = conexion.cursor()
+    cursor.execute(
+        QUERY_CASO_COMPLETO + where + " ORDER BY c.fechaCreacion DESC, c.id DESC LIMIT %s",
+        valores + [limite]
+    )
+    return cursor.fetchall()
+
+def _listar_casos_versionado(conexion, filtros: FiltrosCasos, posicion: Optional[tuple], limite: int) -> tuple:
+    """(versión de la colección, página); la versión se lee antes para que el ETag nunca sea más nuevo que los datos"""
+    version = leer_version_coleccion(conexion)
+    return version, _listar_casos(conexion, filtros, posicion, limite)
+
+def _agregar_etag(response: Response, etag: Optional[str]):
+    if etag:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+# Filas leídas del servidor por cada fragmento de una transmisión
+TAMANO_LOTE_TRANSMISION = 500
+
+def _abrir_cursor_casos(conexion, filtros: FiltrosCasos, posicion: Optional[tuple]):
+    """Ejecuta la consulta de casos con un cursor sin buffer"""
+    where, valores = construir_filtros(filtros, posicion)
+    cursor = conexion.cursor(CursorSinBuffer)
+    cursor.execute(QUERY_CASO_COMPLETO + where + " ORDER BY c.fechaCreacion DESC, c.id DESC", valores)
+    return cursor
+
+def _leer_lote(conexion, cursor, tamano: int) -> list:
+    return cursor.fetchmany(tamano)
+
+def _cerrar_cursor(conexion, cursor):
+    cursor.close()
+
+def serializar_valor(valor):
+    """Convierte a JSON los tipos que devuelve pymysql"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+def _caso_a_json(caso: dict) -> bytes:
+    return orjson.dumps(formatear_caso(caso), default=serializar_valor)
+
+async def transmitir_casos(filtros: FiltrosCasos, posicion: Optional[tuple], formato: str):
+    """
+    Genera los casos como NDJSON o como un arreglo JSON por fragmentos.
+    El primer fragmento se produce después de ejecutar la consulta, de modo que
+    los errores de base de datos ocurren antes de enviar la respuesta.
+    """
+    async with conexion_db() as conexion:
+        cursor = await conexion.ejecutar(_abrir_cursor_casos, filtros, posicion)
+        leido = False
+        try:
+            yield b"[" if formato == "json" else b""
+            
+            separador = b""
+            while True:
+                filas = await conexion.ejecutar(_leer_lote, cursor, TAMANO_LOTE_TRANSMISION)
+                if not filas:
+                    break
+                
+                if formato == "json":
+                    fragmento = separador + b",".join(_caso_a_json(fila) for fila in filas)
+                    separador = b","
+                else:
+                    fragmento = b"".join(_caso_a_json(fila) + b"\n" for fila in filas)
+                yield fragmento
+            
+            leido = True
+            if formato == "json":
+                yield b"]"
+        finally:
+            if leido:
+                await conexion.ejecutar(_cerrar_cursor, cursor)
+            else:
+                # Cerrar un cursor sin buffer obliga a leer el resto de filas;
+                # si el cliente se desconectó es más barato descartar la conexión
+                conexion.conexion.invalidar()
+
+async def respuesta_transmitida(filtros: FiltrosCasos, posicion: Optional[tuple], formato: str,
+                                nombre_archivo: Optional[str] = None) -> StreamingResponse:
+    """Crea la respuesta de una transmisión de casos ya iniciada"""
+    generador = transmitir_casos(filtros, posicion, formato)
+    primer_fragmento = await generador.__anext__()
+    
+    async def contenido():
+        yield primer_fragmento
+        async for fragmento in generador:
+            yield fragmento
+    
+    headers = {}
+    if nombre_archivo:
+        headers["Content-Disposition"] = f'attachment; filename="{nombre_archivo}"'
+    
+    return StreamingResponse(
+        contenido(),
+        media_type="application/x-ndjson" if formato == "ndjson" else "application/json",
+        headers=headers
+    )
+
+@router.get("/listar", response_model=ListaCasosResponse)
+async def listar_casos(
+    request: Request,
+    response: Response,
+    filtros: FiltrosCasos = Depends(),
+    limite: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    formato: str = Query("json", pattern="^(json|ndjson)$")
+):
+    """
+    Listar casos con sus categorías, paginados por cursor.
+    Con formato=ndjson se transmiten todos los casos desde el cursor, uno por línea.
+    El ETag sigue la versión de la colección: con If-None-Match vigente responde
+    304 tras una sola lectura, sin consultar ni formatear la página.
+    """
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
-        
-        query = """
-            SELECT 
-                c.*,
-                cc.idCategoria,
-                cat.nombre as nombreCategoria,
-                u.nombres as nombreBeneficiario,
-                u.apellidoPaterno as apellidoBeneficiario,
-                u.apellidoMaterno as apellidoMaterno,
-                u.correo as correoBeneficiario,
-                u.telefono as telefonoBeneficiario
-            FROM Casos c
-            LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
-            LEFT JOIN Categorias cat ON cc.idCategoria = cat.id
-            LEFT JOIN Usuarios u ON c.idBeneficiario = u.id
-            ORDER BY c.fechaCreacion DESC
-        """
-        
-        cursor.execute(query)
-        casos = cursor.fetchall()
+        posicion = decodificar_cursor(cursor) if cursor else None
+        
+        if formato == "ndjson":
+            return await respuesta_transmitida(filtros, posicion, formato)
+        
+        if request.headers.get("if-none-match"):
+            etag = etag_coleccion(await ejecutar_db(leer_version_coleccion))
+            if etag_coincide(request, etag):
+                return no_modificado(etag)
+        
+        # Se pide un caso extra para saber si hay página siguiente
+        version, casos = await ejecutar_db(_listar_casos_versionado, filtros, posicion, limite + 1)
+        hay_siguiente = len(casos) > limite
+        casos = casos[:limite]
         
         # Formatear cada caso
         casos_formateados = [formatear_caso(caso) for caso in casos]
+        _agregar_etag(response, etag_coleccion(version))
         
         return {
             "success": True,
             "total": len(casos_formateados),
-            "data": casos_formateados
+            "data": casos_formateados,
+            "siguienteCursor": codificar_cursor(casos[-1]) if hay_siguiente else None
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al listar casos: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
-
-@router.get("/obtener/{caso_id}")
-async def obtener_caso(caso_id: int):
-    """Obtener un caso específico por ID con formato estructurado"""
-    conexion = None
+
+@router.get("/exportar")
+async def exportar_casos(
+    filtros: FiltrosCasos = Depends(),
+    formato: str = Query("ndjson", pattern="^(json|ndjson)$")
+):
+    """Exportar todos los casos como NDJSON o arreglo JSON transmitido por fragmentos"""
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
-        
-        query = """
-            SELECT 
-                c.*,
-                cc.idCategoria,
-                cat.nombre as nombreCategoria,
-                u.nombres as nombreBeneficiario,
-                u.apellidoPaterno as apellidoBeneficiario,
-                u.apellidoMaterno as apellidoMaterno,
-                u.correo as correoBeneficiario,
-                u.telefono as telefonoBeneficiario
-            FROM Casos c
-            LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
-            LEFT JOIN Categorias cat ON cc.idCategoria = cat.id
-            LEFT JOIN Usuarios u ON c.idBeneficiario = u.id
-            WHERE c.id = %s
-        """
-        
-        cursor.execute(query, (caso_id,))
-        caso = cursor.fetchone()
-        
-        if not caso:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Caso no encontrado"
-            )
+        extension = "ndjson" if formato == "ndjson" else "json"
+        return await respuesta_transmitida(filtros, None, formato, f"casos.{extension}")
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al exportar casos: {str(e)}"
+        )
+
+def _obtener_casos_por_id(conexion, ids: list) -> list:
+    """Obtiene varios casos completos en el orden de `ids`"""
+    if not ids:
+        return []
+    cursor = conexion.cursor()
+    cursor.execute(QUERY_CASO_COMPLETO + f" WHERE c.id IN ({', '.join(['%s'] * len(ids))})", ids)
+    por_id = {caso["id"]: caso for caso in cursor.fetchall()}
+    return [por_id[caso_id] for caso_id in ids if caso_id in por_id]
+
+@router.get("/buscar", response_model=BusquedaCasosResponse)
+async def buscar_casos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limite: int = Query(20, ge=1, le=100),
+    desplazamiento: int = Query(0, ge=0, le=1000)
+):
+    """
+    Buscar casos por texto en título, descripción, entidad y dirección.
+    Sin distinguir acentos ni mayúsculas; la última parte de cada palabra puede omitirse.
+    """
+    if not indice_busqueda.listo:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El índice de búsqueda se está construyendo"
+        )
+    
+    try:
+        total, resultados = indice_busqueda.buscar(q, limite, desplazamiento)
+        casos = await ejecutar_db(_obtener_casos_por_id, [caso_id for caso_id, _ in resultados])
+        puntajes = dict(resultados)
         
         return {
             "success": True,
-            "data": formatear_caso(caso)
+            "total": total,
+            "data": [
+                {**formatear_caso(caso), "puntaje": round(puntajes[caso["id"]], 4)}
+                for caso in casos
+            ]
         }
+    
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar casos: {str(e)}"
+        )
+
+async def respuesta_cercanos(latitud: float, longitud: float, caja: tuple, radio_km: Optional[float],
+                             limite: int, desplazamiento: int) -> dict:
+    """Página de casos ordenados por distancia al punto, con su distancia en km"""
+    cercanos = await casos_cercanos(latitud, longitud, caja, radio_km)
+    pagina = cercanos[desplazamiento:desplazamiento + limite]
+    casos = await ejecutar_db(_obtener_casos_por_id, [caso_id for caso_id, _ in pagina])
+    distancias = dict(pagina)
+    
+    return {
+        "success": True,
+        "total": len(cercanos),
+        "data": [
+            {**formatear_caso(caso), "distanciaKm": round(distancias[caso["id"]], 3)}
+            for caso in casos
+        ]
+    }
+
+@router.get("/cercanos", response_model=CasosCercanosResponse)
+async def listar_casos_cercanos(
+    latitud: float = Query(..., ge=-90, le=90),
+    longitud: float = Query(..., ge=-180, le=180),
+    radioKm: float = Query(10, gt=0, le=500),
+    limite: int = Query(20, ge=1, le=100),
+    desplazamiento: int = Query(0, ge=0)
+):
+    """Casos dentro de un radio alrededor de un punto, del más cercano al más lejano"""
+    try:
+        return await respuesta_cercanos(
+            latitud, longitud, caja_de_radio(latitud, longitud, radioKm), radioKm, limite, desplazamiento
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar casos cercanos: {str(e)}"
+        )
+
+@router.get("/en-area", response_model=CasosCercanosResponse)
+async def listar_casos_en_area(
+    sur: float = Query(..., ge=-90, le=90),
+    oeste: float = Query(..., ge=-180, le=180),
+    norte: float = Query(..., ge=-90, le=90),
+    este: float = Query(..., ge=-180, le=180),
+    limite: int = Query(20, ge=1, le=100),
+    desplazamiento: int = Query(0, ge=0)
+):
+    """Casos dentro de un rectángulo (p. ej. la vista de un mapa), ordenados por distancia a su centro"""
+    if sur > norte or oeste > este:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El área debe cumplir sur <= norte y oeste <= este"
+        )
+    
+    try:
+        return await respuesta_cercanos(
+            (sur + norte) / 2, (oeste + este) / 2, (sur, oeste, norte, este), None, limite, desplazamiento
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al buscar casos en el área: {str(e)}"
+        )
+
+@router.get("/estadisticas")
+async def obtener_estadisticas():
+    """
+    Conteos por estado, categoría y entidad y sumas de montos de todos los casos.
+    Se mantienen en memoria en cada escritura y se concilian periódicamente con la base de datos.
+    """
+    try:
+        if not estadisticas_casos.listo:
+            await conciliar_estadisticas()
         
-    except HTTPException:
-        raise
+        resumen = estadisticas_casos.resumen()
+        
+        return {
+            "success": True,
+            "data": {
+                "total": resumen["total"],
+                "abiertos": resumen["abiertos"],
+                "montoObjetivoTotal": float(resumen["montoObjetivo"]),
+                "montoRecaudadoTotal": float(resumen["montoRecaudado"]),
+                "porEstado": [
+                    {"id": id_estado, "nombre": traducir_estado(id_estado), "casos": casos}
+                    for id_estado, casos in sorted(resumen["porEstado"].items(), key=lambda par: -par[1])
+                ],
+                "porCategoria": [
+                    {"id": id_categoria, "nombre": catalogos.nombre_categoria(id_categoria), "casos": casos}
+                    for id_categoria, casos in sorted(resumen["porCategoria"].items(), key=lambda par: -par[1])
+                ],
+                "porEntidad": [
+                    {"entidad": entidad, "casos": casos}
+                    for entidad, casos in sorted(resumen["porEntidad"].items(), key=lambda par: -par[1])
+                ]
+            },
+            "conciliacion": estadisticas_casos.estadisticas()
+        }
+    
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error al obtener el caso: {str(e)}"
+            detail=f"Error al obtener estadísticas: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
 
-@router.put("/actualizar/{caso_id}")
-async def actualizar_caso(caso_id: int, datos: CasoUpdate):
-    """Actualizar un caso existente con transacciones"""
-    conexion = None
+async def _cargar_caso_formateado(caso_id: int) -> Optional[dict]:
+    """Entrada de cache_casos: el caso formateado y el ETag con el que se formateó"""
+    caso = await ejecutar_db(_obtener_caso, caso_id)
+    if not caso:
+        return None
+    formateado = formatear_caso(caso)
+    # Sin await de por medio: el ETag lleva el hash del mismo catálogo de categorías
+    return {"etag": etag_caso(caso_id, formateado.get("version")), "caso": formateado}
+
+@router.get("/obtener/{caso_id}", response_model=CasoDetalleResponse)
+async def obtener_caso(caso_id: int, request: Request, response: Response):
+    """
+    Obtener un caso específico por ID con formato estructurado.
+    La versión vigente se lee siempre de la base (una columna por clave primaria):
+    con If-None-Match que coincide responde 304 sin el JOIN ni formatear_caso, y
+    la entrada en caché solo se usa si tiene ese mismo ETag (versión y catálogo).
+    """
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
+        version = await ejecutar_db(leer_version_caso, caso_id)
+        if version is None:
+            await cache_casos.invalidar(caso_id)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Caso no encontrado"
+            )
         
-        # Verificar que el caso existe
-        query_verificar = "SELECT id FROM Casos WHERE id = %s"
-        cursor.execute(query_verificar, (caso_id,))
-        caso_existe = cursor.fetchone()
+        etag = etag_caso(caso_id, version)
+        if request.headers.get("if-none-match") and etag_coincide(request, etag):
+            return no_modificado(etag)
         
-        if not caso_existe:
+        entrada = await cache_casos.obtener_o_cargar(caso_id, lambda: _cargar_caso_formateado(caso_id))
+        if entrada and entrada.get("etag") != etag:
+            # La entrada es anterior a una escritura atendida por otro worker (la
+            # caché es por proceso) o a un refresco que cambió los nombres de categoría
+            await cache_casos.invalidar(caso_id)
+            entrada = await cache_casos.obtener_o_cargar(caso_id, lambda: _cargar_caso_formateado(caso_id))
+        
+        if not entrada:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Caso no encontrado"
             )
         
+        _agregar_etag(response, entrada["etag"])
+        return {
+            "success": True,
+            "data": entrada["caso"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al obtener el caso: {str(e)}"
+        )
+
+def _actualizar_caso(conexion, caso_id: int, datos: CasoUpdate) -> dict:
+    """Actualiza los campos y la categoría de un caso en una transacción"""
+    cursor = conexion.cursor()
+    
+    # Verificar que el caso existe
+    query_verificar = "SELECT id FROM Casos WHERE id = %s"
+    cursor.execute(query_verificar, (caso_id,))
+    caso_existe = cursor.fetchone()
+    
+    if not caso_existe:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Caso no encontrado"
+        )
+    
+    try:
         # Iniciar transacción
         conexion.begin()
         
@@ -393,13 +1060,15 @@ async def actualizar_caso(caso_id: int, datos: CasoUpdate):
             campos_caso['idEstado'] = datos.idEstado
         if datos.estaAbierto is not None:
             campos_caso['estaAbierto'] = datos.estaAbierto
+        if datos.latitud is not None:
+            campos_caso['latitud'] = datos.latitud
+            campos_caso['longitud'] = datos.longitud
         
-        # Actualizar campos del caso si hay cambios
-        if campos_caso:
-            set_clause = ", ".join([f"{campo} = %s" for campo in campos_caso.keys()])
-            query_caso = f"UPDATE Casos SET {set_clause} WHERE id = %s"
-            valores_caso = list(campos_caso.values()) + [caso_id]
-            cursor.execute(query_caso, valores_caso)
+        # Actualizar campos del caso; la versión cambia aunque solo cambie la categoría
+        set_clause = ", ".join([f"{campo} = %s" for campo in campos_caso.keys()] + ["version = version + 1"])
+        query_caso = f"UPDATE Casos SET {set_clause} WHERE id = %s"
+        valores_caso = list(campos_caso.values()) + [caso_id]
+        cursor.execute(query_caso, valores_caso)
         
         # Actualizar categoría si se proporciona
         if datos.idCategoria is not None:
@@ -419,26 +1088,25 @@ async def actualizar_caso(caso_id: int, datos: CasoUpdate):
         
         # Confirmar la transacción
         conexion.commit()
-        
-        # Obtener el caso actualizado
-        query_obtener = """
-            SELECT 
-                c.*,
-                cc.idCategoria,
-                cat.nombre as nombreCategoria,
-                u.nombres as nombreBeneficiario,
-                u.apellidoPaterno as apellidoBeneficiario,
-                u.apellidoMaterno as apellidoMaterno,
-                u.correo as correoBeneficiario,
-                u.telefono as telefonoBeneficiario
-            FROM Casos c
-            LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
-            LEFT JOIN Categorias cat ON cc.idCategoria = cat.id
-            LEFT JOIN Usuarios u ON c.idBeneficiario = u.id
-            WHERE c.id = %s
-        """
-        cursor.execute(query_obtener, (caso_id,))
-        caso_actualizado = cursor.fetchone()
+    except Exception:
+        conexion.rollback()
+        raise
+    incrementar_version_coleccion(conexion)
+    
+    # Obtener el caso actualizado
+    return _obtener_caso_completo(cursor, caso_id)
+
+@router.put("/actualizar/{caso_id}")
+async def actualizar_caso(caso_id: int, datos: CasoUpdate):
+    """Actualizar un caso existente con transacciones"""
+    validar_ubicacion(datos.latitud, datos.longitud)
+    
+    try:
+        caso_actualizado = await ejecutar_db(_actualizar_caso, caso_id, datos)
+        await cache_casos.invalidar(caso_id)
+        indice_busqueda.indexar_caso(caso_actualizado)
+        indice_geografico.actualizar_caso(caso_actualizado)
+        estadisticas_casos.actualizar_caso(caso_actualizado)
         
         return {
             "success": True,
@@ -449,35 +1117,27 @@ async def actualizar_caso(caso_id: int, datos: CasoUpdate):
     except HTTPException:
         raise
     except Exception as e:
-        if conexion:
-            conexion.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al actualizar el caso: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
 
-@router.delete("/eliminar/{caso_id}")
-async def eliminar_caso(caso_id: int):
-    """Eliminar un caso y su categoría asociada con transacciones"""
-    conexion = None
+def _eliminar_caso(conexion, caso_id: int) -> dict:
+    """Elimina un caso y su categoría en una transacción; retorna el caso eliminado"""
+    cursor = conexion.cursor()
+    
+    # Verificar que el caso existe
+    query_verificar = "SELECT id, titulo FROM Casos WHERE id = %s"
+    cursor.execute(query_verificar, (caso_id,))
+    caso = cursor.fetchone()
+    
+    if not caso:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Caso no encontrado"
+        )
+    
     try:
-        conexion = get_db()
-        cursor = conexion.cursor()
-        
-        # Verificar que el caso existe
-        query_verificar = "SELECT id, titulo FROM Casos WHERE id = %s"
-        cursor.execute(query_verificar, (caso_id,))
-        caso = cursor.fetchone()
-        
-        if not caso:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Caso no encontrado"
-            )
-        
         # Iniciar transacción
         conexion.begin()
         
@@ -491,6 +1151,23 @@ async def eliminar_caso(caso_id: int):
         
         # Confirmar la transacción
         conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    incrementar_version_coleccion(conexion)
+    
+    return caso
+
+@router.delete("/eliminar/{caso_id}")
+async def eliminar_caso(caso_id: int, tareas: BackgroundTasks):
+    """Eliminar un caso y su categoría asociada con transacciones"""
+    try:
+        caso = await ejecutar_db(_eliminar_caso, caso_id)
+        await cache_casos.invalidar(caso_id)
+        indice_busqueda.eliminar_caso(caso_id)
+        indice_geografico.eliminar_caso(caso_id)
+        estadisticas_casos.eliminar_caso(caso_id)
+        tareas.add_task(desindexar_caso, caso_id)
         
         return {
             "success": True,
@@ -501,12 +1178,193 @@ async def eliminar_caso(caso_id: int):
     except HTTPException:
         raise
     except Exception as e:
-        if conexion:
-            conexion.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al eliminar el caso: {str(e)}"
         )
-    finally:
-        if conexion:
-            conexion.close()
\ No newline at end of file
+
+def _verificar_caso_existe(conexion, caso_id: int):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT id FROM Casos WHERE id = %s", (caso_id,))
+    if not cursor.fetchone():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Caso no encontrado"
+        )
+
+def _reemplazar_imagenes(conexion, caso_id: int, urls_imagenes: dict) -> tuple:
+    """Guarda las nuevas URLs; retorna las URLs reemplazadas y las imágenes actuales del caso"""
+    cursor = conexion.cursor()
+    try:
+        conexion.begin()
+        campos = ", ".join(CAMPOS_IMAGEN)
+        cursor.execute(f"SELECT {campos} FROM Casos WHERE id = %s FOR UPDATE", (caso_id,))
+        anteriores = cursor.fetchone()
+        if not anteriores:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Caso no encontrado"
+            )
+        
+        set_clause = ", ".join([f"{campo} = %s" for campo in urls_imagenes.keys()])
+        cursor.execute(
+            f"UPDATE Casos SET {set_clause}, version = version + 1 WHERE id = %s",
+            list(urls_imagenes.values()) + [caso_id]
+        )
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+    incrementar_version_coleccion(conexion)
+    
+    reemplazadas = [
+        url for campo, url in anteriores.items()
+        if url and campo in urls_imagenes and url != urls_imagenes[campo]
+    ]
+    return reemplazadas, {**anteriores, **urls_imagenes}
+
+@router.post("/imagenes/presignar/{caso_id}")
+async def presignar_imagenes(caso_id: int, solicitud: SolicitudPresignado):
+    """
+    Genera URLs prefirmadas para subir imágenes del caso directamente a S3.
+    Después de subirlas, el cliente debe llamar a /imagenes/confirmar/{caso_id}.
+    """
+    tipos_permitidos = settings.IMAGENES_TIPOS_PERMITIDOS.split(',')
+    for imagen in solicitud.imagenes:
+        if imagen.contentType not in tipos_permitidos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tipo de imagen no permitido: {imagen.contentType}"
+            )
+        if imagen.tamano > settings.IMAGENES_TAMANO_MAX:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La imagen {imagen.numero} excede el tamaño máximo de {settings.IMAGENES_TAMANO_MAX} bytes"
+            )
+    
+    try:
+        await ejecutar_db(_verificar_caso_existe, caso_id)
+        
+        async def presignar(imagen: ImagenPresignada) -> dict:
+            extension = EXTENSIONES_IMAGEN.get(imagen.contentType, "bin")
+            clave = f"casos/caso_{caso_id}/imagen_{imagen.numero}_{uuid.uuid4()}.{extension}"
+            
+            # POST permite limitar el tamaño con content-length-range
+            post = await aws_gateway.ejecutar(
+                "s3.generate_presigned_post",
+                s3_client.generate_presigned_post,
+                Bucket=S3_BUCKET_NAME,
+                Key=clave,
+                Fields={"Content-Type": imagen.contentType},
+                Conditions=[
+                    {"Content-Type": imagen.contentType},
+                    ["content-length-range", 1, settings.IMAGENES_TAMANO_MAX]
+                ],
+                ExpiresIn=settings.PRESIGNADO_EXPIRACION
+            )
+            # PUT queda firmado con el tipo y el tamaño exactos declarados
+            put = await aws_gateway.ejecutar(
+                "s3.generate_presigned_url",
+                s3_client.generate_presigned_url,
+                "put_object",
+                Params={
+                    "Bucket": S3_BUCKET_NAME,
+                    "Key": clave,
+                    "ContentType": imagen.contentType,
+                    "ContentLength": imagen.tamano
+                },
+                ExpiresIn=settings.PRESIGNADO_EXPIRACION
+            )
+            
+            return {
+                "campo": f"imagen{imagen.numero}",
+                "clave": clave,
+                "post": post,
+                "put": put
+            }
+        
+        subidas = await asyncio.gather(*[presignar(imagen) for imagen in solicitud.imagenes])
+        
+        return {
+            "success": True,
+            "caso_id": caso_id,
+            "expiraEn": settings.PRESIGNADO_EXPIRACION,
+            "subidas": subidas
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al generar URLs de subida: {str(e)}"
+        )
+
+@router.post("/imagenes/confirmar/{caso_id}")
+async def confirmar_imagenes(caso_id: int, confirmacion: ConfirmacionImagenes, tareas: BackgroundTasks):
+    """Registra en el caso las imágenes subidas directamente a S3"""
+    tipos_permitidos = settings.IMAGENES_TIPOS_PERMITIDOS.split(',')
+    for campo, clave in confirmacion.imagenes.items():
+        if campo not in CAMPOS_IMAGEN:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Campo de imagen inválido: {campo}"
+            )
+        # La clave debe ser una de las generadas para este caso y este campo
+        if not clave.startswith(f"casos/caso_{caso_id}/imagen_{campo[-1]}_") or ".." in clave:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La clave de {campo} no corresponde al caso {caso_id}"
+            )
+    
+    if not confirmacion.imagenes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se proporcionaron imágenes para confirmar"
+        )
+    
+    try:
+        async def verificar(campo: str, clave: str):
+            try:
+                objeto = await aws_gateway.ejecutar(
+                    "s3.head_object",
+                    s3_client.head_object,
+                    Bucket=S3_BUCKET_NAME,
+                    Key=clave
+                )
+            except Exception:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La imagen de {campo} no se encontró en S3"
+                )
+            if objeto.get("ContentLength", 0) > settings.IMAGENES_TAMANO_MAX or objeto.get("ContentType") not in tipos_permitidos:
+                await eliminar_imagenes_s3([url_publica_s3(clave)])
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"La imagen de {campo} no cumple el tipo o tamaño permitido"
+                )
+        
+        await asyncio.gather(*[verificar(campo, clave) for campo, clave in confirmacion.imagenes.items()])
+        
+        urls_imagenes = {campo: url_publica_s3(clave) for campo, clave in confirmacion.imagenes.items()}
+        reemplazadas, imagenes_actuales = await ejecutar_db(_reemplazar_imagenes, caso_id, urls_imagenes)
+        await cache_casos.invalidar(caso_id)
+        tareas.add_task(reindexar_caso, caso_id, imagenes_actuales)
+        
+        # Las imágenes anteriores ya no están referenciadas
+        await eliminar_imagenes_s3(reemplazadas)
+        
+        return {
+            "success": True,
+            "message": "Imágenes registradas exitosamente",
+            "caso_id": caso_id,
+            "imagenes": urls_imagenes
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al confirmar imágenes: {str(e)}"
+        )
@@ -0,0 +1,47 @@
+# app/api/routes/catalogos.py
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from app.core.etag import etag_coincide, no_modificado
+from app.services.catalogos_service import catalogos
+
+router = APIRouter()
+
+async def _responder_catalogo(nombre: str, request: Request, response: Response):
+    # Los estados son fijos; el resto se carga de la base de datos
+    if nombre != "estados":
+        try:
+            await catalogos.asegurar_vigente()
+        except Exception as e:
+            # Con la base de datos caída se sirve el último catálogo cargado
+            if not catalogos.cargado:
+                raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    datos, etag = catalogos.listar(nombre)
+    if etag_coincide(request, etag):
+        return no_modificado(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return {"success": True, "total": len(datos), "data": datos}
+
+@router.get("/categorias")
+async def listar_categorias(request: Request, response: Response):
+    """Categorías de casos, servidas desde memoria (admite If-None-Match)"""
+    return await _responder_catalogo("categorias", request, response)
+
+@router.get("/estados")
+async def listar_estados(request: Request, response: Response):
+    """Estados posibles de un caso"""
+    return await _responder_catalogo("estados", request, response)
+
+@router.get("/tipos-usuario")
+async def listar_tipos_usuario(request: Request, response: Response):
+    """Tipos de usuario"""
+    return await _responder_catalogo("tiposUsuario", request, response)
+
+@router.post("/refrescar")
+async def refrescar_catalogos():
+    """Recargar los catálogos desde la base de datos (tras editarlos directamente)"""
+    try:
+        await catalogos.refrescar()
+        return {"success": True, "catalogos": catalogos.estadisticas()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
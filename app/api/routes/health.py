@@ -1,5 +1,18 @@
 # app/api/routes/health.py
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.core.database import db_pool
+from app.core.consultas import registro_consultas
+from app.core.aws_clients import aws_gateway
+from app.core.cache import cache_casos
+from app.core.compresion import estadisticas_compresion
+from app.core.metricas import metricas
+from app.core.seguridad import hash_pool, gestor_tokens
+from app.services.rekognition_service import cache_rekognition
+from app.services.imagen_service import imagen_service
+from app.services.busqueda_service import indice_busqueda
+from app.services.geo_service import indice_geografico
+from app.services.catalogos_service import catalogos
 
 router = APIRouter()
 
@@ -7,3 +20,51 @@ router = APIRouter()
 def health_check():
     """Endpoint de verificación de salud"""
     return {"status": "ok", "message": "Backend-AquiEstoy funcionando correctamente"}
+
+@router.get("/health/db")
+def estado_pool_db():
+    """Estadísticas del pool de conexiones y de las consultas con más tiempo acumulado"""
+    return {"status": "ok", "pool": db_pool.estadisticas(), "consultas": registro_consultas.estadisticas()}
+
+@router.get("/health/aws")
+def estado_aws():
+    """Latencia por operación y profundidad de cola de las llamadas a AWS"""
+    return {
+        "status": "ok",
+        "aws": aws_gateway.estadisticas(),
+        "preprocesamientoRekognition": imagen_service.estadisticas()
+    }
+
+@router.get("/health/cache")
+def estado_cache():
+    """Aciertos, fallos y expulsiones de las cachés"""
+    return {
+        "status": "ok",
+        "casos": cache_casos.estadisticas(),
+        "rekognition": cache_rekognition.estadisticas(),
+        "catalogos": catalogos.estadisticas()
+    }
+
+@router.get("/health/hash")
+def estado_hash():
+    """Ocupación del pool de hashing y caché de tokens verificados"""
+    return {"status": "ok", "hash": hash_pool.estadisticas(), "tokens": gestor_tokens.estadisticas()}
+
+@router.get("/health/busqueda")
+def estado_busqueda():
+    """Tamaño y latencia del índice de búsqueda de casos y del índice geográfico"""
+    return {
+        "status": "ok",
+        "busqueda": indice_busqueda.estadisticas(),
+        "geografico": indice_geografico.estadisticas()
+    }
+
+@router.get("/health/compresion")
+def estado_compresion():
+    """Bytes antes y después de comprimir y tiempo de CPU por algoritmo"""
+    return {"status": "ok", "compresion": estadisticas_compresion.estadisticas()}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def exponer_metricas():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return PlainTextResponse(metricas.exponer(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,17 @@
 # app/api/routes/rekognition.py
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from app.services.rekognition_service import RekognitionService
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, BackgroundTasks, Depends, status
+from fastapi.responses import StreamingResponse
+from PIL import UnidentifiedImageError
+from app.core.config import settings
+from app.core.compresion import sin_compresion
+from app.core.database import ejecutar_db
+from app.services.rekognition_service import RekognitionService, huella_imagen
+from app.services.imagen_service import imagen_service
+from app.services.indice_rostros_service import buscar_rostro, reindexar_caso, desindexar_caso
+from app.api.routes.casos import FiltrosCasos, construir_filtros, clave_s3_desde_url, CAMPOS_IMAGEN
 
 router = APIRouter()
 rekognition_service = RekognitionService()
@@ -13,3 +24,148 @@ async def detect_faces(file: UploadFile = File(...)):
         return {"faces_detected": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/search-faces")
+async def search_faces(
+    tareas: BackgroundTasks,
+    file: UploadFile = File(...),
+    umbral: float = Form(80.0, ge=0, le=100),
+    max_resultados: int = Form(20, ge=1, le=100)
+):
+    """Buscar los casos cuyas imágenes contienen el rostro de la imagen enviada"""
+    try:
+        imagen, _, _ = await imagen_service.preparar_rekognition(await file.read())
+        coincidencias, eliminados = await buscar_rostro(imagen, umbral, max_resultados)
+        # Reintentar el borrado de los rostros de casos que ya no existen
+        for caso_id in eliminados:
+            tareas.add_task(desindexar_caso, caso_id)
+        return {"total": len(coincidencias), "coincidencias": coincidencias}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _imagenes_de_casos(conexion) -> list:
+    cursor = conexion.cursor()
+    cursor.execute("SELECT id, imagen1, imagen2, imagen3, imagen4 FROM Casos")
+    return cursor.fetchall()
+
+async def _reindexar_todos(casos: list):
+    # Concurrencia acotada para no acaparar el gateway de AWS
+    limite = asyncio.Semaphore(4)
+    
+    async def reindexar(caso: dict):
+        async with limite:
+            imagenes = {campo: url for campo, url in caso.items() if campo != "id" and url}
+            await reindexar_caso(caso["id"], imagenes)
+    
+    await asyncio.gather(*[reindexar(caso) for caso in casos])
+
+@router.post("/index-cases", status_code=status.HTTP_202_ACCEPTED)
+async def index_cases(tareas: BackgroundTasks):
+    """Reindexar en segundo plano los rostros de todos los casos"""
+    try:
+        casos = await ejecutar_db(_imagenes_de_casos)
+        tareas.add_task(_reindexar_todos, casos)
+        return {"message": "Reindexación iniciada", "casos": len(casos)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _imagenes_para_comparar(conexion, caso_ids: Optional[list], filtros: FiltrosCasos, limite: int) -> list:
+    """Imágenes de los casos indicados por ID o por filtros"""
+    where, valores = construir_filtros(filtros)
+    if caso_ids:
+        condicion = f"c.id IN ({', '.join(['%s'] * len(caso_ids))})"
+        where = f"{where} AND {condicion}" if where else f" WHERE {condicion}"
+        valores = valores + caso_ids
+    
+    cursor = conexion.cursor()
+    cursor.execute(
+        f"""
+            SELECT c.id, c.imagen1, c.imagen2, c.imagen3, c.imagen4
+            FROM Casos c
+            LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
+            {where}
+            ORDER BY c.fechaCreacion DESC, c.id DESC
+            LIMIT %s
+        """,
+        valores + [limite]
+    )
+    return [
+        (caso["id"], campo, caso[campo])
+        for caso in cursor.fetchall()
+        for campo in CAMPOS_IMAGEN
+        if caso[campo]
+    ]
+
+async def _comparar_lote(source_bytes: bytes, source_hash: str, objetivos: list, umbral: float):
+    """
+    Compara la imagen origen, ya preparada para Rekognition, con cada objetivo y
+    produce NDJSON según terminan. source_hash es la huella de los bytes recibidos.
+    """
+    limite = asyncio.Semaphore(settings.REKOGNITION_LOTE_CONCURRENCIA)
+    
+    async def comparar(caso_id: int, campo: str, url: str) -> dict:
+        resultado = {"caso_id": caso_id, "imagen": campo}
+        try:
+            async with limite:
+                response = await asyncio.wait_for(
+                    rekognition_service.compare_faces_s3(source_bytes, source_hash, clave_s3_desde_url(url), umbral),
+                    timeout=settings.REKOGNITION_LOTE_TIMEOUT
+                )
+            similitudes = [match["Similarity"] for match in response.get("FaceMatches", [])]
+            resultado["coincide"] = bool(similitudes)
+            resultado["similitud"] = round(max(similitudes), 2) if similitudes else None
+        except asyncio.TimeoutError:
+            resultado["error"] = "Tiempo de espera agotado"
+        except Exception as e:
+            resultado["error"] = str(e)
+        return resultado
+    
+    tareas = [asyncio.ensure_future(comparar(*objetivo)) for objetivo in objetivos]
+    resumen = {"comparaciones": len(tareas), "coincidencias": 0, "errores": 0}
+    try:
+        for tarea in asyncio.as_completed(tareas):
+            resultado = await tarea
+            resumen["coincidencias"] += int(resultado.get("coincide", False))
+            resumen["errores"] += int("error" in resultado)
+            yield (json.dumps(resultado) + "\n").encode('utf-8')
+        yield (json.dumps({"resumen": resumen}) + "\n").encode('utf-8')
+    finally:
+        # Si el cliente se desconecta no tiene sentido seguir comparando
+        for tarea in tareas:
+            tarea.cancel()
+
+# Cada línea sale en cuanto termina su comparación: comprimir líneas sueltas no ahorra bytes
+@router.post("/compare-batch")
+@sin_compresion
+async def compare_batch(
+    file: UploadFile = File(...),
+    caso_ids: Optional[str] = Form(None, description="IDs de casos separados por comas"),
+    umbral: float = Form(80.0, ge=0, le=100),
+    filtros: FiltrosCasos = Depends()
+):
+    """
+    Comparar un rostro contra las imágenes de varios casos (por ID o filtros).
+    Los resultados se transmiten como NDJSON a medida que terminan.
+    """
+    try:
+        ids = [int(caso_id) for caso_id in caso_ids.split(',') if caso_id.strip()] if caso_ids else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="caso_ids debe ser una lista de enteros separados por comas")
+    
+    try:
+        source_bytes = await file.read()
+        # Se prepara antes de responder: una vez enviados los encabezados ya no
+        # se puede contestar 400 por una foto inválida
+        try:
+            preparada, _, _ = await imagen_service.preparar_rekognition(source_bytes)
+        except UnidentifiedImageError:
+            raise HTTPException(status_code=400, detail="El archivo no es una imagen válida")
+        objetivos = await ejecutar_db(_imagenes_para_comparar, ids, filtros, settings.REKOGNITION_LOTE_MAX_CASOS)
+        return StreamingResponse(
+            _comparar_lote(preparada, huella_imagen(source_bytes), objetivos, umbral),
+            media_type="application/x-ndjson"
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
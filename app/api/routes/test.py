@@ -3,7 +3,9 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Optional
 from tests import crear_usuario, leer_usuario, leer_todos_usuarios, actualizar_usuario, eliminar_usuario
-from app.core.database import get_db
+from app.core.database import ejecutar_db, conexion_db
+from app.core.cache import cache_casos
+from app.services.versiones_service import incrementar_version_coleccion, incrementar_versiones_beneficiario
 
 
 router = APIRouter()
@@ -40,14 +42,23 @@ class UsuarioUpdate(BaseModel):
     estaActivo: Optional[int] = None
     verificado: Optional[int] = None
 
+# Datos del usuario que aparecen en sus casos como beneficiario
+CAMPOS_BENEFICIARIO = {"nombres", "apellidoPaterno", "apellidoMaterno", "correo", "telefono"}
+
+def marcar_casos_beneficiario(conexion, usuario_id: int) -> list:
+    """Cambia la versión (y el ETag) de los casos del usuario; retorna sus IDs"""
+    ids = incrementar_versiones_beneficiario(conexion.cursor(), usuario_id)
+    conexion.commit()
+    if ids:
+        incrementar_version_coleccion(conexion)
+    return ids
+
 @router.post("/test/crear")
 async def test_crear_usuario(usuario: UsuarioCreate):
     """Crear usuario de prueba"""
-    conexion = None
     try:
-        conexion = get_db()
-        usuario_id = crear_usuario(
-            conexion, 
+        usuario_id = await ejecutar_db(
+            crear_usuario,
             usuario.idTipoUsuario,
             usuario.nombres,
             usuario.apellidoPaterno,
@@ -68,17 +79,12 @@ async def test_crear_usuario(usuario: UsuarioCreate):
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        if conexion:
-            conexion.close()
 
 @router.get("/test/leer/{usuario_id}")
 async def test_leer_usuario(usuario_id: int):
     """Leer usuario de prueba por ID"""
-    conexion = None
     try:
-        conexion = get_db()
-        usuario = leer_usuario(conexion, usuario_id)
+        usuario = await ejecutar_db(leer_usuario, usuario_id)
         
         if usuario:
             return {"success": True, "data": usuario}
@@ -87,44 +93,38 @@ async def test_leer_usuario(usuario_id: int):
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        if conexion:
-            conexion.close()
 
 @router.get("/test/leer")
 async def test_leer_todos_usuarios():
     """Leer todos los usuarios"""
-    conexion = None
     try:
-        conexion = get_db()
-        usuarios = leer_todos_usuarios(conexion)
+        usuarios = await ejecutar_db(leer_todos_usuarios)
         
         return {"success": True, "total": len(usuarios), "data": usuarios}
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        if conexion:
-            conexion.close()
 
 @router.put("/test/actualizar/{usuario_id}")
 async def test_actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate):
     """Actualizar usuario de prueba"""
-    conexion = None
     try:
-        conexion = get_db()
-        
         # Convertir el modelo a diccionario, excluyendo valores None
         datos_actualizar = usuario.model_dump(exclude_unset=True)
         
         if not datos_actualizar:
             raise HTTPException(status_code=400, detail="No se proporcionaron campos para actualizar")
         
-        filas_actualizadas = actualizar_usuario(conexion, usuario_id, **datos_actualizar)
+        async with conexion_db() as conexion:
+            filas_actualizadas = await conexion.ejecutar(actualizar_usuario, usuario_id, **datos_actualizar)
+            if filas_actualizadas > 0 and CAMPOS_BENEFICIARIO & datos_actualizar.keys():
+                casos_afectados = await conexion.ejecutar(marcar_casos_beneficiario, usuario_id)
+                await cache_casos.invalidar(*casos_afectados)
+            
+            # Obtener el usuario actualizado
+            usuario_actualizado = await conexion.ejecutar(leer_usuario, usuario_id) if filas_actualizadas > 0 else None
         
         if filas_actualizadas > 0:
-            # Obtener el usuario actualizado
-            usuario_actualizado = leer_usuario(conexion, usuario_id)
             return {
                 "success": True, 
                 "message": f"Usuario {usuario_id} actualizado correctamente",
@@ -135,17 +135,12 @@ async def test_actualizar_usuario(usuario_id: int, usuario: UsuarioUpdate):
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        if conexion:
-            conexion.close()
 
 @router.delete("/test/eliminar/{usuario_id}")
 async def test_eliminar_usuario(usuario_id: int):
     """Eliminar usuario de prueba"""
-    conexion = None
     try:
-        conexion = get_db()
-        filas_eliminadas = eliminar_usuario(conexion, usuario_id)
+        filas_eliminadas = await ejecutar_db(eliminar_usuario, usuario_id)
         
         if filas_eliminadas > 0:
             return {"success": True, "message": f"Usuario {usuario_id} eliminado correctamente"}
@@ -154,6 +149,3 @@ async def test_eliminar_usuario(usuario_id: int):
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
-    finally:
-        if conexion:
-            conexion.close()
\ No newline at end of file
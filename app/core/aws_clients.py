@@ -1,24 +1,125 @@
 # app/core/aws_clients.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 from app.core.config import settings
+# `metricas` ya nombra el dict de cada operación en AWSGateway._registrar
+from app.core.metricas import metricas as registro_metricas, duracion_aws, errores_aws
 
 class AWSClients:
     """Cliente singleton para servicios AWS"""
     
     def __init__(self):
+        # AWS_ENDPOINT_URL permite apuntar a un sustituto local (p. ej. LocalStack)
+        endpoint_url = settings.AWS_ENDPOINT_URL or None
+        
         self.s3 = boto3.client(
             's3',
             region_name=settings.AWS_REGION,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            endpoint_url=endpoint_url
         )
         
         self.rekognition = boto3.client(
             'rekognition',
             region_name=settings.AWS_REGION,
             aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            endpoint_url=endpoint_url
         )
 
+class AWSGateway:
+    """Ejecuta llamadas bloqueantes de boto3 en un pool de hilos con concurrencia acotada"""
+    
+    def __init__(self, max_concurrencia: int):
+        self.max_concurrencia = max_concurrencia
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrencia, thread_name_prefix="aws")
+        self._lock = threading.Lock()
+        self._en_cola = 0
+        self._en_curso = 0
+        self._max_en_cola = 0
+        self._operaciones = {}
+    
+    async def ejecutar(self, operacion: str, funcion, *args, **kwargs):
+        """Ejecuta funcion(*args, **kwargs) en el pool y registra sus métricas bajo `operacion`"""
+        encolada_en = time.monotonic()
+        with self._lock:
+            self._en_cola += 1
+            self._max_en_cola = max(self._max_en_cola, self._en_cola)
+        
+        def llamar():
+            inicio = time.monotonic()
+            with self._lock:
+                self._en_cola -= 1
+                self._en_curso += 1
+            error = False
+            try:
+                return funcion(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                self._registrar(operacion, inicio - encolada_en, time.monotonic() - inicio, error)
+        
+        futuro = asyncio.get_running_loop().run_in_executor(self._executor, llamar)
+        # shield: si se cancela la petición, la llamada ya encolada termina y se contabiliza
+        return await asyncio.shield(futuro)
+    
+    def _registrar(self, operacion: str, espera: float, latencia: float, error: bool):
+        with self._lock:
+            self._en_curso -= 1
+            metricas = self._operaciones.setdefault(operacion, {
+                "llamadas": 0,
+                "errores": 0,
+                "latenciaTotal": 0.0,
+                "latenciaMax": 0.0,
+                "esperaTotal": 0.0
+            })
+            metricas["llamadas"] += 1
+            metricas["errores"] += int(error)
+            metricas["latenciaTotal"] += latencia
+            metricas["latenciaMax"] = max(metricas["latenciaMax"], latencia)
+            metricas["esperaTotal"] += espera
+        duracion_aws.observar(operacion, valor=latencia)
+        if error:
+            errores_aws.incrementar(operacion)
+    
+    def estadisticas(self) -> dict:
+        """Profundidad de cola y latencia por operación"""
+        with self._lock:
+            operaciones = {
+                nombre: {
+                    "llamadas": m["llamadas"],
+                    "errores": m["errores"],
+                    "latenciaPromedio": round(m["latenciaTotal"] / m["llamadas"], 6),
+                    "latenciaMax": round(m["latenciaMax"], 6),
+                    "esperaPromedio": round(m["esperaTotal"] / m["llamadas"], 6)
+                }
+                for nombre, m in self._operaciones.items()
+            }
+            return {
+                "maxConcurrencia": self.max_concurrencia,
+                "enCola": self._en_cola,
+                "enCurso": self._en_curso,
+                "maxEnCola": self._max_en_cola,
+                "operaciones": operaciones
+            }
+    
+    def cerrar(self):
+        """Detiene el pool de hilos"""
+        self._executor.shutdown(wait=False)
+
 # Instancia global
 aws_clients = AWSClients()
+aws_gateway = AWSGateway(settings.AWS_MAX_CONCURRENCIA)
+
+@registro_metricas.colector
+def _metricas_aws() -> list:
+    estadisticas = aws_gateway.estadisticas()
+    return [
+        ("aquiestoy_aws_en_cola", "Llamadas a AWS esperando un hilo", estadisticas["enCola"]),
+        ("aquiestoy_aws_en_curso", "Llamadas a AWS en curso", estadisticas["enCurso"])
+    ]
@@ -0,0 +1,274 @@
+# app/core/cache.py
+import asyncio
+import os
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from app.core.config import settings
+
+class CacheBackend(ABC):
+    """Interfaz de almacenamiento para la caché"""
+
+    # True si cada operación es E/S de red: CacheLectura la ejecuta fuera del event loop
+    bloqueante = False
+
+    @abstractmethod
+    def obtener(self, clave: str) -> tuple:
+        """Retorna (encontrado, valor)"""
+
+    @abstractmethod
+    def guardar(self, clave: str, valor, ttl: float):
+        ...
+
+    @abstractmethod
+    def eliminar(self, clave: str):
+        ...
+
+    @abstractmethod
+    def limpiar(self):
+        ...
+
+    @abstractmethod
+    def estadisticas(self) -> dict:
+        ...
+
+class MemoriaLRU(CacheBackend):
+    """Caché en memoria del proceso con expulsión LRU y expiración por TTL"""
+
+    def __init__(self, max_entradas: int):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+        self._expulsiones = 0
+        self._expiraciones = 0
+
+    def obtener(self, clave: str) -> tuple:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self._fallos += 1
+                return False, None
+
+            valor, expira_en = entrada
+            if expira_en is not None and expira_en <= time.monotonic():
+                del self._datos[clave]
+                self._expiraciones += 1
+                self._fallos += 1
+                return False, None
+
+            self._datos.move_to_end(clave)
+            self._aciertos += 1
+            return True, valor
+
+    def guardar(self, clave: str, valor, ttl: float):
+        expira_en = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (valor, expira_en)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self._expulsiones += 1
+
+    def eliminar(self, clave: str):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def guardar_en_disco(self, ruta: str):
+        """Escribe las entradas vigentes en un archivo (de forma atómica)"""
+        ahora_monotonico, ahora = time.monotonic(), time.time()
+        with self._lock:
+            # Las expiraciones se guardan en tiempo de reloj para sobrevivir al reinicio
+            entradas = [
+                (clave, valor, None if expira_en is None else ahora + (expira_en - ahora_monotonico))
+                for clave, (valor, expira_en) in self._datos.items()
+                if expira_en is None or expira_en > ahora_monotonico
+            ]
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "wb") as archivo:
+            pickle.dump(entradas, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+
+    def cargar_de_disco(self, ruta: str) -> int:
+        """Carga las entradas guardadas con guardar_en_disco; retorna cuántas siguen vigentes"""
+        if not os.path.exists(ruta):
+            return 0
+        with open(ruta, "rb") as archivo:
+            entradas = pickle.load(archivo)
+        ahora_monotonico, ahora = time.monotonic(), time.time()
+        cargadas = 0
+        with self._lock:
+            for clave, valor, expira_en in entradas:
+                if expira_en is not None and expira_en <= ahora:
+                    continue
+                self._datos[clave] = (valor, None if expira_en is None else ahora_monotonico + (expira_en - ahora))
+                cargadas += 1
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+        return cargadas
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "backend": "memoria",
+                "entradas": len(self._datos),
+                "maxEntradas": self.max_entradas,
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasaAciertos": round(self._aciertos / consultas, 4) if consultas else None,
+                "expulsiones": self._expulsiones,
+                "expiraciones": self._expiraciones
+            }
+
+class RedisBackend(CacheBackend):
+    """Caché compartida entre workers sobre Redis (requiere el paquete redis)"""
+
+    bloqueante = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requiere instalar el paquete 'redis'")
+
+        self._cliente = redis.Redis.from_url(url)
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+
+    def obtener(self, clave: str) -> tuple:
+        datos = self._cliente.get(clave)
+        with self._lock:
+            if datos is None:
+                self._fallos += 1
+                return False, None
+            self._aciertos += 1
+        return True, pickle.loads(datos)
+
+    def guardar(self, clave: str, valor, ttl: float):
+        self._cliente.set(clave, pickle.dumps(valor), px=int(ttl * 1000) if ttl else None)
+
+    def eliminar(self, clave: str):
+        self._cliente.delete(clave)
+
+    def limpiar(self):
+        self._cliente.flushdb()
+
+    def estadisticas(self) -> dict:
+        # Las expulsiones las decide Redis según su política maxmemory
+        expulsiones = self._cliente.info("stats").get("evicted_keys")
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "backend": "redis",
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasaAciertos": round(self._aciertos / consultas, 4) if consultas else None,
+                "expulsiones": expulsiones
+            }
+
+class _CargaAbandonada(Exception):
+    """La petición que cargaba la clave se canceló; quien esperaba la reintenta"""
+
+class CacheLectura:
+    """Caché read-through: carga en fallo, una sola carga simultánea por clave"""
+
+    def __init__(self, backend: CacheBackend, prefijo: str, ttl: float):
+        self.backend = backend
+        self.prefijo = prefijo
+        self.ttl = ttl
+        self._en_vuelo = {}
+        self._invalidaciones = 0
+        self._cargas = 0
+        self._compartidas = 0
+
+    def _clave(self, clave) -> str:
+        return f"{self.prefijo}:{clave}"
+
+    async def _backend(self, funcion, *args):
+        if self.backend.bloqueante:
+            return await asyncio.to_thread(funcion, *args)
+        return funcion(*args)
+
+    def _eliminar(self, claves: list):
+        for clave in claves:
+            self.backend.eliminar(clave)
+
+    async def obtener_o_cargar(self, clave, cargador):
+        """Retorna el valor en caché o lo obtiene con `await cargador()`; None no se guarda"""
+        clave = self._clave(clave)
+        while True:
+            encontrado, valor = await self._backend(self.backend.obtener, clave)
+            if encontrado:
+                return valor
+
+            # Si otra petición ya está cargando esta clave, esperar su resultado
+            futuro = self._en_vuelo.get(clave)
+            if futuro is None:
+                break
+            self._compartidas += 1
+            try:
+                return await asyncio.shield(futuro)
+            except _CargaAbandonada:
+                # Se canceló la petición que cargaba (p. ej. el cliente se
+                # desconectó): esta toma su lugar o espera a la que lo haga
+                continue
+
+        futuro = asyncio.get_running_loop().create_future()
+        futuro.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._en_vuelo[clave] = futuro
+        invalidaciones_al_iniciar = self._invalidaciones
+        self._cargas += 1
+        try:
+            valor = await cargador()
+            # No guardar si hubo una escritura mientras se cargaba
+            if valor is not None and self._invalidaciones == invalidaciones_al_iniciar:
+                await self._backend(self.backend.guardar, clave, valor, self.ttl)
+            futuro.set_result(valor)
+            return valor
+        except asyncio.CancelledError:
+            # Cancelar el futuro compartido cancelaría a todas las peticiones en espera
+            futuro.set_exception(_CargaAbandonada())
+            raise
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            del self._en_vuelo[clave]
+
+    async def invalidar(self, *claves):
+        """Elimina claves tras una escritura"""
+        # Se cuenta antes de esperar: una carga en curso ya no guardará su valor
+        self._invalidaciones += 1
+        await self._backend(self._eliminar, [self._clave(clave) for clave in claves])
+
+    def estadisticas(self) -> dict:
+        estadisticas = self.backend.estadisticas()
+        estadisticas.update({
+            "ttl": self.ttl,
+            "cargas": self._cargas,
+            "cargasCompartidas": self._compartidas,
+            "invalidaciones": self._invalidaciones
+        })
+        return estadisticas
+
+def crear_backend(max_entradas: int) -> CacheBackend:
+    """Crea el backend configurado en CACHE_BACKEND"""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisBackend(settings.CACHE_REDIS_URL)
+    return MemoriaLRU(max_entradas)
+
+# Instancia global
+cache_casos = CacheLectura(
+    crear_backend(settings.CACHE_CASOS_MAX_ENTRADAS),
+    prefijo="caso",
+    ttl=settings.CACHE_CASOS_TTL
+)
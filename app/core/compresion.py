@@ -0,0 +1,263 @@
+# app/core/compresion.py
+import asyncio
+import threading
+import time
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from app.core.config import settings
+
+# Compresión negociada de las respuestas (Accept-Encoding). gzip siempre está
+# disponible; br y zstd solo si están instalados los paquetes brotli y zstandard.
+
+NIVEL_GZIP = 5
+CALIDAD_BROTLI = 4
+NIVEL_ZSTD = 3
+
+# Cuerpos desde este tamaño se comprimen fuera del event loop
+MINIMO_EN_HILO = 256 * 1024
+
+TIPOS_COMPRIMIBLES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+    "text/"
+)
+
+class _CompresorGzip:
+    def __init__(self):
+        # wbits 31: formato gzip (cabecera y CRC)
+        self._compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def parte(self, datos: bytes) -> bytes:
+        """Comprime y vacía lo acumulado para que el cliente lo reciba ya"""
+        return self._compresor.compress(datos) + self._compresor.flush(zlib.Z_SYNC_FLUSH)
+
+    def final(self, datos: bytes = b"") -> bytes:
+        return self._compresor.compress(datos) + self._compresor.flush()
+
+COMPRESORES = {"gzip": _CompresorGzip}
+
+try:
+    import brotli
+
+    class _CompresorBrotli:
+        def __init__(self):
+            self._compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+
+        def parte(self, datos: bytes) -> bytes:
+            return self._compresor.process(datos) + self._compresor.flush()
+
+        def final(self, datos: bytes = b"") -> bytes:
+            return self._compresor.process(datos) + self._compresor.finish()
+
+    COMPRESORES["br"] = _CompresorBrotli
+except ImportError:
+    pass
+
+try:
+    import zstandard
+
+    class _CompresorZstd:
+        def __init__(self):
+            self._compresor = zstandard.ZstdCompressor(level=NIVEL_ZSTD).compressobj()
+
+        def parte(self, datos: bytes) -> bytes:
+            return self._compresor.compress(datos) + self._compresor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+        def final(self, datos: bytes = b"") -> bytes:
+            return self._compresor.compress(datos) + self._compresor.flush()
+
+    COMPRESORES["zstd"] = _CompresorZstd
+except ImportError:
+    pass
+
+def sin_compresion(endpoint):
+    """Decorador: las respuestas de este endpoint nunca se comprimen"""
+    endpoint.sin_compresion = True
+    return endpoint
+
+def negociar(accept_encoding: str, preferencia: list):
+    """Primer algoritmo de `preferencia` aceptado por el cliente (q > 0), o None"""
+    aceptados = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptados[nombre.strip()] = calidad
+    for nombre in preferencia:
+        if aceptados.get(nombre, aceptados.get("*", 0.0)) > 0:
+            return nombre
+    return None
+
+class EstadisticasCompresion:
+    """Bytes antes y después y tiempo de CPU por algoritmo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_algoritmo = {}
+        self._omitidas = 0
+
+    def registrar(self, algoritmo: str, original: int, comprimido: int, cpu: float, transmitida: bool):
+        with self._lock:
+            datos = self._por_algoritmo.setdefault(algoritmo, {
+                "respuestas": 0,
+                "transmitidas": 0,
+                "bytesOriginales": 0,
+                "bytesEnviados": 0,
+                "cpuSegundos": 0.0
+            })
+            datos["respuestas"] += 0 if transmitida else 1
+            datos["transmitidas"] += 1 if transmitida else 0
+            datos["bytesOriginales"] += original
+            datos["bytesEnviados"] += comprimido
+            datos["cpuSegundos"] += cpu
+
+    def omitir(self):
+        with self._lock:
+            self._omitidas += 1
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            algoritmos = {}
+            for nombre, datos in self._por_algoritmo.items():
+                megabytes = datos["bytesOriginales"] / (1024 * 1024)
+                algoritmos[nombre] = {
+                    **datos,
+                    "cpuSegundos": round(datos["cpuSegundos"], 3),
+                    "reduccion": round(1 - datos["bytesEnviados"] / datos["bytesOriginales"], 3) if datos["bytesOriginales"] else None,
+                    "cpuMsPorMB": round(datos["cpuSegundos"] * 1000 / megabytes, 2) if megabytes else None
+                }
+            return {
+                "activa": settings.COMPRESION_ACTIVA,
+                "disponibles": list(COMPRESORES),
+                "minimoBytes": settings.COMPRESION_MIN_BYTES,
+                "omitidasPorTamano": self._omitidas,
+                "algoritmos": algoritmos
+            }
+
+def _comprimir_completo(algoritmo: str, datos: bytes) -> tuple:
+    inicio = time.thread_time()
+    comprimido = COMPRESORES[algoritmo]().final(datos)
+    return comprimido, time.thread_time() - inicio
+
+class _RespuestaComprimida:
+    """Envoltura de `send` para una respuesta: decide al ver el primer fragmento del cuerpo"""
+
+    def __init__(self, scope, algoritmo: str, send):
+        self.scope = scope
+        self.algoritmo = algoritmo
+        self.send = send
+        self.inicio = None
+        self.compresor = None
+        self.pasar = False
+        self.original = 0
+        self.enviado = 0
+        self.cpu = 0.0
+
+    def _comprimible(self, inicio: dict, headers: MutableHeaders) -> bool:
+        if getattr(self.scope.get("endpoint"), "sin_compresion", False):
+            return False
+        if inicio["status"] < 200 or inicio["status"] in (204, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        tipo = headers.get("content-type", "")
+        return tipo.startswith(TIPOS_COMPRIMIBLES)
+
+    def _marcar_codificacion(self, headers: MutableHeaders):
+        headers["Content-Encoding"] = self.algoritmo
+        # Otra codificación es otra representación: el ETag deja de ser fuerte
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def enviar(self, mensaje):
+        if mensaje["type"] == "http.response.start":
+            self.inicio = mensaje
+            return
+        if mensaje["type"] != "http.response.body":
+            await self.send(mensaje)
+            return
+
+        cuerpo = mensaje.get("body", b"")
+        mas = mensaje.get("more_body", False)
+
+        if self.inicio is not None:
+            inicio, self.inicio = self.inicio, None
+            headers = MutableHeaders(scope=inicio)
+            comprimible = self._comprimible(inicio, headers)
+            if comprimible:
+                headers.add_vary_header("Accept-Encoding")
+            if not comprimible or (not mas and len(cuerpo) < settings.COMPRESION_MIN_BYTES):
+                if comprimible:
+                    estadisticas_compresion.omitir()
+                self.pasar = True
+                await self.send(inicio)
+                await self.send(mensaje)
+                return
+
+            self._marcar_codificacion(headers)
+            if not mas:
+                # Respuesta completa: comprimir de una vez y fijar Content-Length
+                if len(cuerpo) >= MINIMO_EN_HILO:
+                    comprimido, cpu = await asyncio.to_thread(_comprimir_completo, self.algoritmo, cuerpo)
+                else:
+                    comprimido, cpu = _comprimir_completo(self.algoritmo, cuerpo)
+                headers["Content-Length"] = str(len(comprimido))
+                headers.append("Server-Timing", f"compresion;dur={cpu * 1000:.2f}")
+                estadisticas_compresion.registrar(self.algoritmo, len(cuerpo), len(comprimido), cpu, False)
+                await self.send(inicio)
+                await self.send({"type": "http.response.body", "body": comprimido, "more_body": False})
+                return
+
+            # Respuesta transmitida: comprimir cada fragmento a medida que llega
+            del headers["Content-Length"]
+            self.compresor = COMPRESORES[self.algoritmo]()
+            await self.send(inicio)
+
+        if self.pasar:
+            await self.send(mensaje)
+            return
+
+        tiempo = time.thread_time()
+        comprimido = self.compresor.parte(cuerpo) if mas else self.compresor.final(cuerpo)
+        self.cpu += time.thread_time() - tiempo
+        self.original += len(cuerpo)
+        self.enviado += len(comprimido)
+        if not mas:
+            estadisticas_compresion.registrar(self.algoritmo, self.original, self.enviado, self.cpu, True)
+        if comprimido or not mas:
+            await self.send({"type": "http.response.body", "body": comprimido, "more_body": mas})
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI: comprime con el algoritmo preferido que acepte el cliente
+    las respuestas de texto/JSON desde COMPRESION_MIN_BYTES. Las respuestas
+    transmitidas se comprimen por fragmentos, vaciando el compresor en cada
+    uno para no retrasar las líneas de un NDJSON.
+    """
+
+    def __init__(self, app, preferencia: list):
+        self.app = app
+        self.preferencia = [nombre for nombre in preferencia if nombre in COMPRESORES]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESION_ACTIVA:
+            await self.app(scope, receive, send)
+            return
+        algoritmo = negociar(Headers(scope=scope).get("accept-encoding", ""), self.preferencia)
+        if algoritmo is None:
+            await self.app(scope, receive, send)
+            return
+        respuesta = _RespuestaComprimida(scope, algoritmo, send)
+        await self.app(scope, receive, respuesta.enviar)
+
+# Instancia global
+estadisticas_compresion = EstadisticasCompresion()
@@ -14,10 +14,84 @@ class Settings(BaseSettings):
     AWS_ACCESS_KEY_ID: str = os.environ.get("AWS_ACCESS_KEY_ID", "")
     AWS_SECRET_ACCESS_KEY: str = os.environ.get("AWS_SECRET_ACCESS_KEY", "")
     S3_BUCKET_NAME: str = os.environ.get("S3_BUCKET_NAME", "")
+    AWS_ENDPOINT_URL: str = os.environ.get("AWS_ENDPOINT_URL", "")
+    AWS_MAX_CONCURRENCIA: int = int(os.environ.get("AWS_MAX_CONCURRENCIA", "16"))
+    
+    # Imágenes de casos
+    IMAGENES_TAMANO_MAX: int = int(os.environ.get("IMAGENES_TAMANO_MAX", str(10 * 1024 * 1024)))
+    IMAGENES_TIPOS_PERMITIDOS: str = os.environ.get("IMAGENES_TIPOS_PERMITIDOS", "image/jpeg,image/png,image/webp")
+    PRESIGNADO_EXPIRACION: int = int(os.environ.get("PRESIGNADO_EXPIRACION", "900"))
+    IMAGENES_NORMALIZAR: bool = os.environ.get("IMAGENES_NORMALIZAR", "true").lower() == "true"
+    IMAGENES_MAX_DIMENSION: int = int(os.environ.get("IMAGENES_MAX_DIMENSION", "2048"))
+    IMAGENES_FORMATO_VARIANTES: str = os.environ.get("IMAGENES_FORMATO_VARIANTES", "WEBP")
+    IMAGENES_CALIDAD: int = int(os.environ.get("IMAGENES_CALIDAD", "82"))
+    IMAGENES_PROCESOS: int = int(os.environ.get("IMAGENES_PROCESOS", "2"))
     
     # Database
     DATABASE_URL: str = os.environ.get("DATABASE_URL", "")
     
+    # Contraseñas
+    BCRYPT_ROUNDS: int = int(os.environ.get("BCRYPT_ROUNDS", "12"))
+    HASH_PROCESOS: int = int(os.environ.get("HASH_PROCESOS", "2"))
+    HASH_MAX_COLA: int = int(os.environ.get("HASH_MAX_COLA", "32"))
+    
+    # Sesiones JWT
+    # Obligatorio: la aplicación no arranca sin él (ver lifespan en main.py)
+    JWT_SECRET: str = os.environ.get("JWT_SECRET", "")
+    JWT_ALGORITMO: str = os.environ.get("JWT_ALGORITMO", "HS256")
+    JWT_ACCESO_MINUTOS: int = int(os.environ.get("JWT_ACCESO_MINUTOS", "15"))
+    JWT_REFRESCO_DIAS: int = int(os.environ.get("JWT_REFRESCO_DIAS", "7"))
+    JWT_CACHE_MAX: int = int(os.environ.get("JWT_CACHE_MAX", "10000"))
+    # Cada cuánto cada worker trae los tokens revocados en los demás
+    REVOCACION_SINCRONIZAR_SEGUNDOS: float = float(os.environ.get("REVOCACION_SINCRONIZAR_SEGUNDOS", "5"))
+    
+    # Índice de rostros (rekognition | local)
+    INDICE_ROSTROS: str = os.environ.get("INDICE_ROSTROS", "rekognition")
+    REKOGNITION_COLECCION: str = os.environ.get("REKOGNITION_COLECCION", "aquiestoy-casos")
+    INDICE_ROSTROS_MAX_POR_IMAGEN: int = int(os.environ.get("INDICE_ROSTROS_MAX_POR_IMAGEN", "5"))
+    
+    # Caché de resultados de Rekognition por hash de imagen
+    REKOGNITION_CACHE_MAX_ENTRADAS: int = int(os.environ.get("REKOGNITION_CACHE_MAX_ENTRADAS", "2000"))
+    REKOGNITION_CACHE_TTL: float = float(os.environ.get("REKOGNITION_CACHE_TTL", str(7 * 24 * 3600)))
+    REKOGNITION_CACHE_ARCHIVO: str = os.environ.get("REKOGNITION_CACHE_ARCHIVO", "")
+    
+    # Preprocesamiento de imágenes antes de enviarlas a Rekognition
+    REKOGNITION_PREPROCESAR: bool = os.environ.get("REKOGNITION_PREPROCESAR", "true").lower() == "true"
+    REKOGNITION_MAX_DIMENSION: int = int(os.environ.get("REKOGNITION_MAX_DIMENSION", "1600"))
+    REKOGNITION_CALIDAD: int = int(os.environ.get("REKOGNITION_CALIDAD", "90"))
+    
+    # Comparación por lotes
+    REKOGNITION_LOTE_CONCURRENCIA: int = int(os.environ.get("REKOGNITION_LOTE_CONCURRENCIA", "8"))
+    REKOGNITION_LOTE_TIMEOUT: float = float(os.environ.get("REKOGNITION_LOTE_TIMEOUT", "10"))
+    REKOGNITION_LOTE_MAX_CASOS: int = int(os.environ.get("REKOGNITION_LOTE_MAX_CASOS", "200"))
+    
+    # Catálogos (Categorias, TipoUsuario): cada cuánto se recargan
+    CATALOGOS_TTL: float = float(os.environ.get("CATALOGOS_TTL", "600"))
+    
+    # Estadísticas de casos: cada cuánto se concilian con la base de datos
+    ESTADISTICAS_CONCILIACION_SEGUNDOS: float = float(os.environ.get("ESTADISTICAS_CONCILIACION_SEGUNDOS", "300"))
+    
+    # Índices en memoria (búsqueda y geográfico): cada cuánto se reconstruyen
+    # desde la base para incluir escrituras de otros workers
+    BUSQUEDA_RECONSTRUIR_SEGUNDOS: float = float(os.environ.get("BUSQUEDA_RECONSTRUIR_SEGUNDOS", "600"))
+    # Si la rejilla geográfica pasa del doble sin reconstruirse, las consultas usan SQL
+    GEO_RECONSTRUIR_SEGUNDOS: float = float(os.environ.get("GEO_RECONSTRUIR_SEGUNDOS", "600"))
+    
+    # Cargas masivas de casos y usuarios
+    LOTE_MAX_FILAS: int = int(os.environ.get("LOTE_MAX_FILAS", "50000"))
+    LOTE_FILAS_POR_TRANSACCION: int = int(os.environ.get("LOTE_FILAS_POR_TRANSACCION", "500"))
+    
+    # Compresión de respuestas (br y zstd requieren los paquetes brotli y zstandard)
+    COMPRESION_ACTIVA: bool = os.environ.get("COMPRESION_ACTIVA", "true").lower() == "true"
+    COMPRESION_MIN_BYTES: int = int(os.environ.get("COMPRESION_MIN_BYTES", "1024"))
+    COMPRESION_ALGORITMOS: str = os.environ.get("COMPRESION_ALGORITMOS", "zstd,br,gzip")
+    
+    # Caché de casos
+    CACHE_BACKEND: str = os.environ.get("CACHE_BACKEND", "memoria")
+    CACHE_REDIS_URL: str = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_CASOS_TTL: float = float(os.environ.get("CACHE_CASOS_TTL", "300"))
+    CACHE_CASOS_MAX_ENTRADAS: int = int(os.environ.get("CACHE_CASOS_MAX_ENTRADAS", "5000"))
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -0,0 +1,201 @@
+# app/core/consultas.py
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# Muestras recientes por huella para estimar p50/p99
+MUESTRAS_POR_HUELLA = 1024
+# Huellas distintas que se siguen; el resto se acumula en OTRAS
+MAX_HUELLAS = 500
+OTRAS = "(otras consultas)"
+
+_LITERAL_CADENA = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_LITERAL_NUMERO = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b")
+_MARCADOR = re.compile(r"%\(\w+\)s|%s")
+_LISTA_VALORES = re.compile(r"\(\s*\?(?:\s*,\s*(?:\?|null))*\s*\)")
+_TUPLAS_REPETIDAS = re.compile(r"\(\?\+?\)(?:\s*,\s*\(\?\+?\))+")
+_ESPACIOS = re.compile(r"\s+")
+
+# Solo las consultas cortas pasan por la caché de huellas. El INSERT múltiple
+# que arma executemany mide cientos de KB y trae los datos de cada fila
+# (correos, hashes): guardarlo como clave lo retendría en memoria sin redactar
+LARGO_MAXIMO_CACHE = 4096
+
+def _normalizar(consulta: str) -> str:
+    texto = consulta.strip().lower()
+    texto = _LITERAL_CADENA.sub("?", texto)
+    texto = _MARCADOR.sub("?", texto)
+    texto = _LITERAL_NUMERO.sub("?", texto)
+    texto = _ESPACIOS.sub(" ", texto)
+    texto = _LISTA_VALORES.sub("(?+)", texto)
+    texto = _TUPLAS_REPETIDAS.sub("(?+)", texto)
+    return texto.rstrip(";").strip()
+
+_huella_cacheada = lru_cache(maxsize=2048)(_normalizar)
+
+def huella(consulta: str) -> str:
+    """
+    Forma normalizada de una consulta: sin literales ni marcadores, con las
+    listas IN (...) y las filas de un INSERT múltiple colapsadas. Consultas
+    que solo difieren en sus valores comparten huella.
+    """
+    if len(consulta) > LARGO_MAXIMO_CACHE:
+        return _normalizar(consulta)
+    return _huella_cacheada(consulta)
+
+def _describir(valor) -> str:
+    """Tipo (y tamaño) de un parámetro, nunca su contenido"""
+    if valor is None:
+        return "NULL"
+    if isinstance(valor, (str, bytes, bytearray)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    if isinstance(valor, (list, tuple, set)):
+        return f"{type(valor).__name__}[{len(valor)}]"
+    return type(valor).__name__
+
+def redactar(parametros):
+    if parametros is None:
+        return None
+    if isinstance(parametros, dict):
+        return {clave: _describir(valor) for clave, valor in parametros.items()}
+    if isinstance(parametros, (list, tuple)):
+        return [_describir(valor) for valor in parametros]
+    return _describir(parametros)
+
+def _percentil(ordenadas: list, fraccion: float) -> float:
+    return ordenadas[min(len(ordenadas) - 1, int(fraccion * len(ordenadas)))]
+
+class RegistroConsultas:
+    """
+    Tiempos de cada cursor.execute agrupados por huella. Las consultas que
+    superan el umbral se registran en el log con los parámetros redactados y,
+    si hay archivo configurado, el EXPLAIN de cada huella lenta se guarda una vez.
+    """
+
+    def __init__(self, umbral_lenta: float, archivo_explain: str = ""):
+        self.umbral_lenta = umbral_lenta
+        self.archivo_explain = archivo_explain
+        self._lock = threading.Lock()
+        self._huellas = {}
+        self._explicadas = set()
+        self._lentas = 0
+
+    def registrar(self, cursor, consulta, parametros, duracion: float):
+        # executemany arma el INSERT múltiple como bytearray
+        if isinstance(consulta, (bytes, bytearray)):
+            consulta = bytes(consulta).decode("utf-8", "replace")
+        clave = huella(consulta)
+        with self._lock:
+            datos = self._huellas.get(clave)
+            if datos is None:
+                if len(self._huellas) >= MAX_HUELLAS:
+                    clave = OTRAS
+                datos = self._huellas.setdefault(clave, {
+                    "llamadas": 0,
+                    "total": 0.0,
+                    "maximo": 0.0,
+                    "lentas": 0,
+                    "muestras": deque(maxlen=MUESTRAS_POR_HUELLA)
+                })
+            datos["llamadas"] += 1
+            datos["total"] += duracion
+            datos["maximo"] = max(datos["maximo"], duracion)
+            datos["muestras"].append(duracion)
+            lenta = duracion >= self.umbral_lenta
+            if lenta:
+                datos["lentas"] += 1
+                self._lentas += 1
+                explicar = bool(self.archivo_explain) and clave not in self._explicadas and clave != OTRAS
+                if explicar:
+                    self._explicadas.add(clave)
+
+        if lenta:
+            logger.warning(
+                "Consulta lenta (%.1f ms): %s parámetros=%s",
+                duracion * 1000, clave, redactar(parametros)
+            )
+            if explicar:
+                self._guardar_explain(cursor, consulta, parametros, clave, duracion)
+
+    def _guardar_explain(self, cursor, consulta: str, parametros, clave: str, duracion: float):
+        # Solo SELECT y solo con cursores con buffer: uno sin buffer aún tiene
+        # filas pendientes en la conexión
+        if not clave.startswith(("select", "(select")) or isinstance(cursor, pymysql.cursors.SSCursor):
+            return
+        try:
+            sentencia = cursor.mogrify(consulta, parametros)
+            explain = cursor.connection.cursor(pymysql.cursors.DictCursor)
+            try:
+                explain.execute("EXPLAIN " + sentencia)
+                plan = explain.fetchall()
+            finally:
+                explain.close()
+            entrada = {
+                "fecha": datetime.now().isoformat(timespec="seconds"),
+                "huella": clave,
+                "duracionMs": round(duracion * 1000, 1),
+                "plan": plan
+            }
+            with self._lock, open(self.archivo_explain, "a", encoding="utf-8") as archivo:
+                archivo.write(json.dumps(entrada, ensure_ascii=False, default=str) + "\n")
+        except Exception as e:
+            logger.warning("No se pudo guardar el EXPLAIN de %s: %s", clave, e)
+
+    def estadisticas(self, limite: int = 20) -> dict:
+        """Huellas con más tiempo acumulado, con p50/p99 de sus muestras recientes"""
+        with self._lock:
+            filas = [
+                (clave, datos["llamadas"], datos["total"], datos["maximo"], datos["lentas"], sorted(datos["muestras"]))
+                for clave, datos in self._huellas.items()
+            ]
+            lentas = self._lentas
+        filas.sort(key=lambda fila: fila[2], reverse=True)
+        return {
+            "umbralLentaMs": round(self.umbral_lenta * 1000, 1),
+            "huellas": len(filas),
+            "consultasLentas": lentas,
+            "explainArchivo": self.archivo_explain or None,
+            "consultas": [
+                {
+                    "huella": clave,
+                    "llamadas": llamadas,
+                    "totalMs": round(total * 1000, 1),
+                    "p50Ms": round(_percentil(muestras, 0.50) * 1000, 2),
+                    "p99Ms": round(_percentil(muestras, 0.99) * 1000, 2),
+                    "maxMs": round(maximo * 1000, 2),
+                    "lentas": lentas_huella
+                }
+                for clave, llamadas, total, maximo, lentas_huella, muestras in filas[:limite]
+            ]
+        }
+
+class _CursorInstrumentado:
+    """Mide cada execute; executemany pasa por execute con las sentencias ya armadas"""
+
+    def execute(self, query, args=None):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            registro_consultas.registrar(self, query, args, time.perf_counter() - inicio)
+
+class CursorInstrumentado(_CursorInstrumentado, pymysql.cursors.DictCursor):
+    pass
+
+class CursorSinBufferInstrumentado(_CursorInstrumentado, pymysql.cursors.SSDictCursor):
+    pass
+
+# Instancia global
+registro_consultas = RegistroConsultas(
+    umbral_lenta=float(os.getenv("DB_CONSULTA_LENTA_MS", "200")) / 1000,
+    archivo_explain=os.getenv("DB_EXPLAIN_ARCHIVO", "")
+)
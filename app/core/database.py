@@ -1,21 +1,309 @@
 import pymysql
 import os
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
+from app.core.metricas import metricas, espera_conexion_db, duracion_db, errores_db
+from app.core.consultas import CursorInstrumentado, CursorSinBufferInstrumentado
 
 load_dotenv()
 
-def get_db():
-    """Crea y devuelve una conexión a la base de datos RDS"""
+# Cursor sin buffer: las filas se leen del servidor a medida que se piden.
+# Ambos cursores miden cada consulta (ver app/core/consultas.py)
+CursorSinBuffer = CursorSinBufferInstrumentado
+
+class PoolTimeoutError(Exception):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+class ConexionPool:
+    """Envoltura de una conexión del pool; close() la devuelve en lugar de cerrarla"""
+
+    def __init__(self, pool, conexion, creada_en):
+        self._pool = pool
+        self._conexion = conexion
+        self._creada_en = creada_en
+
+    def __getattr__(self, nombre):
+        if self._conexion is None:
+            raise pymysql.err.InterfaceError("La conexión ya fue devuelta al pool")
+        return getattr(self._conexion, nombre)
+
+    def close(self):
+        """Devuelve la conexión al pool (idempotente)"""
+        if self._conexion is not None:
+            conexion, self._conexion = self._conexion, None
+            self._pool._devolver(conexion, self._creada_en)
+
+    def invalidar(self):
+        """Cierra la conexión física y libera su lugar en el pool"""
+        if self._conexion is not None:
+            conexion, self._conexion = self._conexion, None
+            self._pool._descartar(conexion)
+
+class ConnectionPool:
+    """Pool de conexiones MySQL acotado, con overflow, reciclaje y verificación al tomar"""
+
+    def __init__(self, creador, tamano=5, max_overflow=10, reciclar=3600, timeout=30.0, verificar=True):
+        self._creador = creador
+        self.tamano = tamano
+        self.max_overflow = max_overflow
+        self.reciclar = reciclar
+        self.timeout = timeout
+        self.verificar = verificar
+
+        self._inactivas = deque()
+        self._condicion = threading.Condition()
+        self._abiertas = 0
+        self._en_uso = 0
+
+        self._esperas = 0
+        self._tiempo_espera = 0.0
+        self._creadas = 0
+        self._recicladas = 0
+        self._descartadas = 0
+        self._timeouts = 0
+
+    @property
+    def maximo(self):
+        return self.tamano + self.max_overflow
+
+    def obtener(self):
+        """Toma una conexión del pool, creando una nueva si hay capacidad"""
+        inicio_espera = None
+        with self._condicion:
+            while True:
+                if self._inactivas:
+                    conexion, creada_en = self._inactivas.pop()
+                    break
+                if self._abiertas < self.maximo:
+                    self._abiertas += 1
+                    conexion = None
+                    break
+
+                # Pool agotado: esperar a que se devuelva una conexión
+                if inicio_espera is None:
+                    inicio_espera = time.monotonic()
+                    self._esperas += 1
+                restante = self.timeout - (time.monotonic() - inicio_espera)
+                if restante <= 0:
+                    self._tiempo_espera += time.monotonic() - inicio_espera
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"No hay conexiones disponibles tras {self.timeout}s "
+                        f"(tamaño={self.tamano}, overflow={self.max_overflow})"
+                    )
+                self._condicion.wait(restante)
+
+            if inicio_espera is not None:
+                self._tiempo_espera += time.monotonic() - inicio_espera
+            self._en_uso += 1
+
+        try:
+            if conexion is None:
+                conexion, creada_en = self._crear()
+            else:
+                conexion, creada_en = self._preparar(conexion, creada_en)
+        except Exception:
+            with self._condicion:
+                self._abiertas -= 1
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+
+        return ConexionPool(self, conexion, creada_en)
+
+    def _crear(self):
+        conexion = self._creador()
+        with self._condicion:
+            self._creadas += 1
+        return conexion, time.monotonic()
+
+    def _preparar(self, conexion, creada_en):
+        """Recicla conexiones viejas y verifica que la conexión siga viva"""
+        if self.reciclar and time.monotonic() - creada_en > self.reciclar:
+            self._cerrar_silencioso(conexion)
+            with self._condicion:
+                self._recicladas += 1
+            return self._crear()
+
+        if self.verificar:
+            try:
+                conexion.ping(reconnect=False)
+            except Exception:
+                self._cerrar_silencioso(conexion)
+                with self._condicion:
+                    self._descartadas += 1
+                return self._crear()
+
+        return conexion, creada_en
+
+    def _devolver(self, conexion, creada_en):
+        # Descartar cualquier transacción pendiente antes de reutilizarla
+        try:
+            conexion.rollback()
+        except Exception:
+            self._descartar(conexion)
+            return
+
+        with self._condicion:
+            self._en_uso -= 1
+            if len(self._inactivas) < self.tamano:
+                self._inactivas.append((conexion, creada_en))
+                conexion = None
+            else:
+                self._abiertas -= 1
+            self._condicion.notify()
+
+        if conexion is not None:
+            self._cerrar_silencioso(conexion)
+
+    def _descartar(self, conexion):
+        self._cerrar_silencioso(conexion)
+        with self._condicion:
+            self._en_uso -= 1
+            self._abiertas -= 1
+            self._descartadas += 1
+            self._condicion.notify()
+
+    @staticmethod
+    def _cerrar_silencioso(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def cerrar(self):
+        """Cierra todas las conexiones inactivas del pool"""
+        with self._condicion:
+            inactivas = list(self._inactivas)
+            self._inactivas.clear()
+            self._abiertas -= len(inactivas)
+        for conexion, _ in inactivas:
+            self._cerrar_silencioso(conexion)
+
+    def estadisticas(self) -> dict:
+        """Estado actual del pool"""
+        with self._condicion:
+            return {
+                "tamano": self.tamano,
+                "maxOverflow": self.max_overflow,
+                "abiertas": self._abiertas,
+                "enUso": self._en_uso,
+                "inactivas": len(self._inactivas),
+                "esperas": self._esperas,
+                "tiempoEsperaTotal": round(self._tiempo_espera, 6),
+                "timeouts": self._timeouts,
+                "creadas": self._creadas,
+                "recicladas": self._recicladas,
+                "descartadas": self._descartadas,
+            }
+
+def _crear_conexion():
+    """Abre una conexión física a la base de datos RDS"""
     try:
-        connection = pymysql.connect(
+        return pymysql.connect(
             host=os.getenv("DATABASE_URL", "localhost"),
             user=os.getenv("DB_USER", "root"),
             password=os.getenv("DB_PASSWORD", ""),
             database=os.getenv("DB_NAME", "test"),
             port=int(os.getenv("DB_PORT", "3306")),
-            cursorclass=pymysql.cursors.DictCursor
+            cursorclass=CursorInstrumentado
         )
-        return connection
     except Exception as e:
         print(f"Error conectando a RDS: {e}")
-        raise
\ No newline at end of file
+        raise
+
+# Instancia global
+db_pool = ConnectionPool(
+    _crear_conexion,
+    tamano=int(os.getenv("DB_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+    reciclar=int(os.getenv("DB_POOL_RECYCLE", "3600")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+    verificar=os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+)
+
+@metricas.colector
+def _metricas_pool() -> list:
+    estadisticas = db_pool.estadisticas()
+    return [
+        ("aquiestoy_db_pool_abiertas", "Conexiones abiertas del pool", estadisticas["abiertas"]),
+        ("aquiestoy_db_pool_en_uso", "Conexiones del pool en uso", estadisticas["enUso"]),
+        ("aquiestoy_db_pool_inactivas", "Conexiones inactivas en el pool", estadisticas["inactivas"])
+    ]
+
+def get_db():
+    """Toma una conexión del pool; llamar a close() la devuelve al pool"""
+    return db_pool.obtener()
+
+def obtener_db():
+    """Dependencia de FastAPI que entrega una conexión y la devuelve al terminar"""
+    conexion = get_db()
+    try:
+        yield conexion
+    finally:
+        conexion.close()
+
+# Executor dedicado para las llamadas bloqueantes de pymysql. Tiene tantos hilos
+# como conexiones admite el pool, y el semáforo evita que las tareas que esperan
+# una conexión ocupen los hilos que necesitan las que ya tienen una.
+_db_executor = ThreadPoolExecutor(max_workers=db_pool.maximo, thread_name_prefix="db")
+_limite_conexiones = asyncio.Semaphore(db_pool.maximo)
+
+async def _en_executor(funcion, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, lambda: funcion(*args, **kwargs))
+
+def _medir(funcion, *args, **kwargs):
+    """Ejecuta funcion y registra su duración (y si falló) bajo su nombre"""
+    operacion = getattr(funcion, "__name__", "desconocida")
+    inicio = time.perf_counter()
+    try:
+        return funcion(*args, **kwargs)
+    except Exception:
+        errores_db.incrementar(operacion)
+        raise
+    finally:
+        duracion_db.observar(operacion, valor=time.perf_counter() - inicio)
+
+class ConexionAsync:
+    """Conexión del pool cuyas operaciones se ejecutan fuera del event loop"""
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Ejecuta funcion(conexion, *args, **kwargs) en el executor de base de datos"""
+        return await _en_executor(_medir, funcion, self.conexion, *args, **kwargs)
+
+@asynccontextmanager
+async def conexion_db():
+    """Toma una conexión del pool sin bloquear el event loop y la devuelve al salir"""
+    inicio = time.perf_counter()
+    async with _limite_conexiones:
+        futuro = asyncio.get_running_loop().run_in_executor(_db_executor, get_db)
+        try:
+            conexion = await asyncio.shield(futuro)
+        except asyncio.CancelledError:
+            # La conexión puede llegar después de cancelar: devolverla al pool
+            futuro.add_done_callback(lambda f: f.exception() is None and f.result().close())
+            raise
+        espera_conexion_db.observar(valor=time.perf_counter() - inicio)
+
+        try:
+            yield ConexionAsync(conexion)
+        finally:
+            await _en_executor(conexion.close)
+
+async def ejecutar_db(funcion, *args, **kwargs):
+    """Ejecuta funcion(conexion, *args, **kwargs) con una conexión del pool, fuera del event loop"""
+    async with conexion_db() as conexion:
+        return await conexion.ejecutar(funcion, *args, **kwargs)
+
+def cerrar_executor():
+    """Detiene el executor de base de datos"""
+    _db_executor.shutdown(wait=False)
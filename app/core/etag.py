@@ -0,0 +1,19 @@
+# app/core/etag.py
+from typing import Optional
+from fastapi import Request, Response, status
+
+def etag_coincide(request: Request, etag: Optional[str]) -> bool:
+    """Indica si el If-None-Match de la petición incluye el ETag actual"""
+    if etag is None:
+        return False
+    encabezado = request.headers.get("if-none-match")
+    if not encabezado:
+        return False
+    if encabezado.strip() == "*":
+        return True
+    # If-None-Match usa comparación débil: W/"x" coincide con "x"
+    return etag in (valor.strip().removeprefix("W/") for valor in encabezado.split(","))
+
+def no_modificado(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
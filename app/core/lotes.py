@@ -0,0 +1,146 @@
+# app/core/lotes.py
+import codecs
+import csv
+from typing import AsyncIterator
+import orjson
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+
+# Cuerpos de las cargas masivas: un arreglo JSON de objetos o un CSV con
+# encabezado cuyas columnas son los campos del modelo. El CSV se lee del
+# stream de la petición, registro a registro, sin cargarlo completo.
+
+def cuerpo_lote_openapi(modelo: type) -> dict:
+    """Documenta en OpenAPI el cuerpo que se lee a mano desde la petición"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": modelo.model_json_schema()}},
+                "text/csv": {"schema": {"type": "string"}}
+            }
+        }
+    }
+
+async def _registros_csv(request: Request) -> AsyncIterator[str]:
+    """
+    Registros completos del CSV a medida que llegan. Un salto de línea solo
+    cierra el registro si las comillas vistas están balanceadas, así los
+    campos entrecomillados pueden contener saltos de línea.
+    """
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    pendiente = ""
+    registro = []
+    comillas = 0
+    async for bloque in request.stream():
+        pendiente += decodificador.decode(bloque)
+        *lineas, pendiente = pendiente.split("\n")
+        for linea in lineas:
+            registro.append(linea)
+            comillas += linea.count('"')
+            if comillas % 2 == 0:
+                yield "\n".join(registro)
+                registro, comillas = [], 0
+    pendiente += decodificador.decode(b"", final=True)
+    if pendiente or registro:
+        registro.append(pendiente)
+        yield "\n".join(registro)
+
+def _valores_csv(registro: str) -> list:
+    return next(csv.reader([registro]), [])
+
+class LectorLote:
+    """Filas (numero, dict) de una carga masiva, hasta max_filas"""
+
+    def __init__(self, request: Request, max_filas: int):
+        self.request = request
+        self.max_filas = max_filas
+        # True si el cuerpo traía más filas de las admitidas (las demás no se leen)
+        self.excedido = False
+
+    async def filas(self) -> AsyncIterator[tuple]:
+        tipo = self.request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+        if tipo in ("text/csv", "application/csv"):
+            filas = self._filas_csv()
+        elif tipo == "application/json":
+            filas = self._filas_json()
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Envía un arreglo JSON (application/json) o un CSV (text/csv)"
+            )
+        numero = 0
+        async for fila in filas:
+            if numero >= self.max_filas:
+                self.excedido = True
+                break
+            numero += 1
+            yield numero, fila
+
+    async def _filas_json(self) -> AsyncIterator[dict]:
+        try:
+            datos = orjson.loads(await self.request.body())
+        except orjson.JSONDecodeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"JSON inválido: {str(e)}"
+            )
+        if not isinstance(datos, list):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El cuerpo debe ser un arreglo JSON"
+            )
+        for fila in datos:
+            yield fila
+
+    async def _filas_csv(self) -> AsyncIterator[dict]:
+        cabecera = None
+        try:
+            async for registro in _registros_csv(self.request):
+                if not registro.strip():
+                    continue
+                try:
+                    valores = _valores_csv(registro)
+                except csv.Error as e:
+                    # Se marca la fila para que su resultado traiga el error de formato
+                    yield {"__csv__": str(e)}
+                    continue
+                if cabecera is None:
+                    cabecera = [columna.strip() for columna in valores]
+                    continue
+                if len(valores) != len(cabecera):
+                    yield {"__csv__": f"se esperaban {len(cabecera)} columnas y hay {len(valores)}"}
+                    continue
+                # Una celda vacía es un campo sin valor
+                yield {columna: (valor if valor != "" else None) for columna, valor in zip(cabecera, valores)}
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="El CSV debe estar codificado en UTF-8"
+            )
+
+def validar_fila(modelo: type, fila) -> tuple:
+    """Retorna (instancia, None) o (None, [errores legibles])"""
+    if isinstance(fila, dict) and "__csv__" in fila:
+        return None, [f"CSV: {fila['__csv__']}"]
+    try:
+        return modelo.model_validate(fila), None
+    except ValidationError as e:
+        return None, [
+            f"{'.'.join(str(parte) for parte in error['loc']) or 'fila'}: {error['msg']}"
+            for error in e.errors()
+        ]
+
+async def en_grupos(filas: AsyncIterator, tamano: int) -> AsyncIterator[list]:
+    """Agrupa un iterador asíncrono en listas de hasta `tamano` elementos"""
+    grupo = []
+    async for fila in filas:
+        grupo.append(fila)
+        if len(grupo) >= tamano:
+            yield grupo
+            grupo = []
+    if grupo:
+        yield grupo
+
+def resultado_fallido(numero: int, errores: list) -> dict:
+    return {"fila": numero, "success": False, "errores": errores}
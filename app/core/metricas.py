@@ -0,0 +1,189 @@
+# app/core/metricas.py
+import bisect
+import threading
+import time
+
+# Métricas en memoria del proceso, expuestas en el formato de texto de
+# Prometheus por GET /metrics. Cada worker tiene las suyas: Prometheus las
+# distingue por la instancia que scrapea.
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _etiquetas(nombres: tuple, valores: tuple, extra: str = "") -> str:
+    partes = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = ()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _encabezado(self) -> list:
+        return [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def exponer(self) -> list:
+        with self._lock:
+            series = list(self._series.items())
+        return self._encabezado() + [
+            f"{self.nombre}{_etiquetas(self.etiquetas, valores)} {_numero(valor)}"
+            for valores, valor in series
+        ]
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def incrementar(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def sumar(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+    def fijar(self, *valores, valor: float):
+        with self._lock:
+            self._series[valores] = valor
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, *valores, valor: float):
+        # El primer bucket con límite >= valor (los límites son inclusivos: le)
+        indice = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += valor
+
+    def exponer(self) -> list:
+        with self._lock:
+            series = [(valores, list(conteos), suma) for valores, (conteos, suma) in self._series.items()]
+        lineas = self._encabezado()
+        for valores, conteos, suma in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + ("+Inf",), conteos):
+                acumulado += conteo
+                le = limite if limite == "+Inf" else _numero(limite)
+                etiquetas = _etiquetas(self.etiquetas, valores, 'le="' + le + '"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {_numero(suma)}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {acumulado}")
+        return lineas
+
+class RegistroMetricas:
+    """Métricas registradas y colectores que leen valores al momento de exponer"""
+
+    def __init__(self):
+        self._metricas = []
+        self._colectores = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Contador:
+        return self._registrar(Contador(nombre, ayuda, etiquetas))
+
+    def medidor(self, nombre: str, ayuda: str, etiquetas: tuple = ()) -> Medidor:
+        return self._registrar(Medidor(nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: tuple = (), buckets: tuple = BUCKETS_LATENCIA) -> Histograma:
+        return self._registrar(Histograma(nombre, ayuda, etiquetas, buckets))
+
+    def colector(self, funcion):
+        """funcion() -> [(nombre, ayuda, valor)]: medidores leídos de otro componente al exponer"""
+        self._colectores.append(funcion)
+        return funcion
+
+    def exponer(self) -> str:
+        lineas = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        for colector in self._colectores:
+            for nombre, ayuda, valor in colector():
+                lineas.extend([f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge", f"{nombre} {_numero(valor)}"])
+        return "\n".join(lineas) + "\n"
+
+# Instancia global y métricas de la aplicación
+metricas = RegistroMetricas()
+
+peticiones_http = metricas.contador(
+    "aquiestoy_http_peticiones_total", "Peticiones HTTP atendidas", ("metodo", "ruta", "estado")
+)
+duracion_http = metricas.histograma(
+    "aquiestoy_http_duracion_segundos", "Duración de las peticiones HTTP hasta el último byte", ("metodo", "ruta")
+)
+peticiones_en_curso = metricas.medidor(
+    "aquiestoy_http_peticiones_en_curso", "Peticiones HTTP en curso"
+)
+espera_conexion_db = metricas.histograma(
+    "aquiestoy_db_espera_conexion_segundos", "Espera hasta obtener una conexión del pool"
+)
+duracion_db = metricas.histograma(
+    "aquiestoy_db_operacion_segundos", "Duración de cada función ejecutada con una conexión", ("operacion",)
+)
+errores_db = metricas.contador(
+    "aquiestoy_db_errores_total", "Funciones de base de datos que lanzaron una excepción", ("operacion",)
+)
+duracion_aws = metricas.histograma(
+    "aquiestoy_aws_duracion_segundos", "Latencia de las llamadas a AWS (sin la espera en cola)", ("operacion",)
+)
+errores_aws = metricas.contador(
+    "aquiestoy_aws_errores_total", "Llamadas a AWS que lanzaron una excepción", ("operacion",)
+)
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI: cuenta las peticiones y mide su duración por método y
+    plantilla de ruta (/casos/obtener/{caso_id}, no la URL), para que el
+    número de series no crezca con los IDs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        estado = 500
+        inicio = time.perf_counter()
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        peticiones_en_curso.sumar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            peticiones_en_curso.sumar(cantidad=-1)
+            ruta = scope.get("route")
+            plantilla = getattr(ruta, "path", None) or "sin_ruta"
+            duracion_http.observar(scope["method"], plantilla, valor=time.perf_counter() - inicio)
+            peticiones_http.incrementar(scope["method"], plantilla, str(estado))
@@ -0,0 +1,13 @@
+# app/core/procesos.py
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+def contexto_procesos() -> BaseContext:
+    """Contexto para los pools de procesos: forkserver si la plataforma lo tiene, si no spawn.
+
+    Un fork del servidor heredaría los locks de sus hilos (executor de la base,
+    gateway de AWS) y podría bloquearse; forkserver no existe en Windows.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
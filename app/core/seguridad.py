@@ -0,0 +1,272 @@
+# app/core/seguridad.py
+import asyncio
+import heapq
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.config import settings
+from app.core.procesos import contexto_procesos
+
+class HashSaturadoError(Exception):
+    """El pool de hashing tiene la cola llena; la petición debe reintentarse"""
+
+def _hashear(contrasena: bytes, rondas: int) -> str:
+    return bcrypt.hashpw(contrasena, bcrypt.gensalt(rondas)).decode('utf-8')
+
+def _hashear_varios(contrasenas: list, rondas: int) -> list:
+    return [_hashear(contrasena, rondas) for contrasena in contrasenas]
+
+def _verificar(contrasena: bytes, contrasena_hash: bytes) -> bool:
+    return bcrypt.checkpw(contrasena, contrasena_hash)
+
+def rondas_de_hash(contrasena_hash: str) -> int:
+    """Factor de costo de un hash bcrypt ($2b$<rondas>$...)"""
+    try:
+        return int(contrasena_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+# Contraseñas por tarea al hashear un lote: menos viajes entre procesos
+TAMANO_GRUPO_HASH = 8
+
+class HashPool:
+    """Hashing bcrypt en un pool de procesos con cola acotada y rechazo inmediato"""
+    
+    def __init__(self, procesos: int, max_cola: int, rondas: int):
+        self.procesos = procesos
+        self.max_cola = max_cola
+        self.rondas = rondas
+        self._executor = None
+        # Solo se modifican desde el event loop, no requieren lock
+        self._pendientes = 0
+        self._completadas = 0
+        self._fallidas = 0
+        self._rechazadas = 0
+    
+    def _pool(self) -> ProcessPoolExecutor:
+        # Se crea al primer uso para no lanzar procesos al importar el módulo
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                mp_context=contexto_procesos()
+            )
+        return self._executor
+    
+    async def _ejecutar(self, funcion, *args):
+        if self._pendientes >= self.procesos + self.max_cola:
+            self._rechazadas += 1
+            raise HashSaturadoError("Demasiadas solicitudes de autenticación en curso")
+        
+        self._pendientes += 1
+        try:
+            loop = asyncio.get_running_loop()
+            resultado = await loop.run_in_executor(self._pool(), funcion, *args)
+            self._completadas += 1
+            return resultado
+        except Exception:
+            self._fallidas += 1
+            raise
+        finally:
+            self._pendientes -= 1
+    
+    async def hashear(self, contrasena: str) -> str:
+        """Hashea una contraseña con el factor de costo configurado"""
+        return await self._ejecutar(_hashear, contrasena.encode('utf-8'), self.rondas)
+    
+    async def hashear_lote(self, contrasenas: list) -> list:
+        """
+        Hashea muchas contraseñas (importación de usuarios) en paralelo. Ocupa a
+        lo sumo procesos - 1 procesos para que los inicios de sesión no esperen
+        detrás de toda la importación.
+        """
+        grupos = [
+            [contrasena.encode('utf-8') for contrasena in contrasenas[i:i + TAMANO_GRUPO_HASH]]
+            for i in range(0, len(contrasenas), TAMANO_GRUPO_HASH)
+        ]
+        paralelos = asyncio.Semaphore(max(1, self.procesos - 1))
+        
+        async def hashear_grupo(grupo: list) -> list:
+            async with paralelos:
+                return await self._ejecutar(_hashear_varios, grupo, self.rondas)
+        
+        hashes = await asyncio.gather(*[hashear_grupo(grupo) for grupo in grupos])
+        return [contrasena_hash for grupo in hashes for contrasena_hash in grupo]
+    
+    async def verificar(self, contrasena: str, contrasena_hash: str) -> bool:
+        """Verifica una contraseña contra su hash bcrypt"""
+        return await self._ejecutar(_verificar, contrasena.encode('utf-8'), contrasena_hash.encode('utf-8'))
+    
+    def necesita_rehash(self, contrasena_hash: str) -> bool:
+        """True si el hash se generó con un factor de costo distinto al configurado"""
+        return rondas_de_hash(contrasena_hash) != self.rondas
+    
+    def estadisticas(self) -> dict:
+        return {
+            "procesos": self.procesos,
+            "maxCola": self.max_cola,
+            "rondas": self.rondas,
+            "pendientes": self._pendientes,
+            "completadas": self._completadas,
+            "fallidas": self._fallidas,
+            "rechazadas": self._rechazadas
+        }
+    
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+class TokenInvalidoError(Exception):
+    """Token ausente, mal firmado, expirado, revocado o de otro tipo"""
+
+class ListaRevocacion:
+    """
+    Identificadores (jti) de tokens revocados hasta su expiración. Cada jti se
+    guarda como 16 bytes y se descarta en cuanto el token habría expirado.
+    """
+    
+    def __init__(self):
+        self._revocados = {}
+        self._expiraciones = []
+        self._lock = threading.Lock()
+    
+    def _purgar(self, ahora: float):
+        while self._expiraciones and self._expiraciones[0][0] <= ahora:
+            _, clave = heapq.heappop(self._expiraciones)
+            self._revocados.pop(clave, None)
+    
+    def revocar(self, jti: str, expira_en: float):
+        clave = bytes.fromhex(jti)
+        with self._lock:
+            self._purgar(time.time())
+            if clave not in self._revocados:
+                self._revocados[clave] = expira_en
+                heapq.heappush(self._expiraciones, (expira_en, clave))
+    
+    def esta_revocado(self, jti: str) -> bool:
+        return bytes.fromhex(jti) in self._revocados
+    
+    def __len__(self):
+        with self._lock:
+            self._purgar(time.time())
+            return len(self._revocados)
+
+class GestorTokens:
+    """Emisión y verificación de JWT con caché de tokens ya verificados"""
+    
+    def __init__(self, secreto: str, algoritmo: str, minutos_acceso: int, dias_refresco: int, max_cache: int):
+        self.secreto = secreto
+        self.algoritmo = algoritmo
+        self.duracion_acceso = minutos_acceso * 60
+        self.duracion_refresco = dias_refresco * 24 * 3600
+        self.max_cache = max_cache
+        self.revocados = ListaRevocacion()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+    
+    def _emitir(self, usuario: dict, tipo: str, duracion: int) -> str:
+        ahora = int(time.time())
+        claims = {
+            "sub": str(usuario["id"]),
+            "tipo": tipo,
+            "idTipoUsuario": usuario.get("idTipoUsuario"),
+            "jti": uuid.uuid4().hex,
+            "iat": ahora,
+            "exp": ahora + duracion
+        }
+        return jwt.encode(claims, self.secreto, algorithm=self.algoritmo)
+    
+    def crear_tokens(self, usuario: dict) -> dict:
+        """Emite un token de acceso de vida corta y uno de refresco"""
+        return {
+            "acceso": self._emitir(usuario, "acceso", self.duracion_acceso),
+            "refresco": self._emitir(usuario, "refresco", self.duracion_refresco),
+            "tipo": "bearer",
+            "expiraEn": self.duracion_acceso
+        }
+    
+    def verificar(self, token: str, tipo: str = "acceso") -> dict:
+        """Retorna los claims del token o lanza TokenInvalidoError"""
+        ahora = time.time()
+        with self._lock:
+            claims = self._cache.get(token)
+            if claims is not None and claims["exp"] > ahora:
+                self._cache.move_to_end(token)
+                self._aciertos += 1
+            else:
+                claims = None
+                self._fallos += 1
+        
+        if claims is None:
+            try:
+                claims = jwt.decode(
+                    token,
+                    self.secreto,
+                    algorithms=[self.algoritmo],
+                    options={"require": ["exp", "jti", "sub"]}
+                )
+            except jwt.PyJWTError as e:
+                raise TokenInvalidoError(str(e))
+            
+            with self._lock:
+                self._cache[token] = claims
+                while len(self._cache) > self.max_cache:
+                    self._cache.popitem(last=False)
+        
+        if claims.get("tipo") != tipo:
+            raise TokenInvalidoError("Tipo de token incorrecto")
+        if self.revocados.esta_revocado(claims["jti"]):
+            raise TokenInvalidoError("Token revocado")
+        return claims
+    
+    def revocar(self, claims: dict):
+        """Revoca un token hasta su expiración"""
+        self.revocados.revocar(claims["jti"], claims["exp"])
+    
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "tokensEnCache": len(self._cache),
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasaAciertos": round(self._aciertos / consultas, 4) if consultas else None,
+                "revocados": len(self.revocados)
+            }
+
+# Instancia global
+hash_pool = HashPool(settings.HASH_PROCESOS, settings.HASH_MAX_COLA, settings.BCRYPT_ROUNDS)
+gestor_tokens = GestorTokens(
+    settings.JWT_SECRET,
+    settings.JWT_ALGORITMO,
+    settings.JWT_ACCESO_MINUTOS,
+    settings.JWT_REFRESCO_DIAS,
+    settings.JWT_CACHE_MAX
+)
+
+esquema_bearer = HTTPBearer(auto_error=False)
+
+async def usuario_actual(credenciales: HTTPAuthorizationCredentials = Depends(esquema_bearer)) -> dict:
+    """Dependencia que autentica la petición con el token de acceso, sin consultar la base de datos"""
+    if credenciales is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="No autenticado",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        return gestor_tokens.verificar(credenciales.credentials)
+    except TokenInvalidoError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
@@ -0,0 +1,86 @@
+# app/schemas/casos.py
+from datetime import datetime
+from typing import Dict, List, Optional
+from typing_extensions import TypedDict
+
+# Modelos de respuesta de los casos: la forma exacta del dict que produce
+# formatear_caso. Son TypedDict (no BaseModel) para que pydantic-core valide y
+# serialice los dicts directamente, sin crear un objeto por cada caso anidado.
+
+class ImagenesCaso(TypedDict):
+    imagen1: Optional[str]
+    imagen2: Optional[str]
+    imagen3: Optional[str]
+    imagen4: Optional[str]
+
+class UbicacionCaso(TypedDict):
+    latitud: float
+    longitud: float
+
+class EstadoCaso(TypedDict):
+    id: Optional[int]
+    nombre: str
+
+class EstadoAperturaCaso(TypedDict):
+    valor: Optional[int]
+    nombre: str
+
+class CategoriaCaso(TypedDict):
+    id: Optional[int]
+    nombre: Optional[str]
+
+class BeneficiarioCaso(TypedDict):
+    id: Optional[int]
+    nombres: Optional[str]
+    apellidoPaterno: Optional[str]
+    apellidoMaterno: Optional[str]
+    nombreCompleto: str
+    correo: Optional[str]
+    telefono: Optional[str]
+
+class Caso(TypedDict):
+    id: int
+    titulo: Optional[str]
+    descripcion: Optional[str]
+    montoObjetivo: Optional[float]
+    montoRecaudado: Optional[float]
+    entidad: Optional[str]
+    direccion: Optional[str]
+    ubicacion: Optional[UbicacionCaso]
+    fechaLimite: Optional[datetime]
+    fechaCreacion: Optional[datetime]
+    imagenes: ImagenesCaso
+    # Campo -> {original, medium, thumb}; None si la imagen no tiene variantes
+    imagenesVariantes: Dict[str, Optional[Dict[str, str]]]
+    estado: EstadoCaso
+    estadoApertura: EstadoAperturaCaso
+    categoria: CategoriaCaso
+    beneficiario: BeneficiarioCaso
+    # Cambia en cada escritura del caso; base de su ETag
+    version: Optional[int]
+
+class CasoBuscado(Caso):
+    puntaje: float
+
+class CasoCercano(Caso):
+    distanciaKm: float
+
+class ListaCasosResponse(TypedDict):
+    success: bool
+    total: int
+    data: List[Caso]
+    siguienteCursor: Optional[str]
+
+class BusquedaCasosResponse(TypedDict):
+    success: bool
+    total: int
+    data: List[CasoBuscado]
+
+class CasosCercanosResponse(TypedDict):
+    success: bool
+    total: int
+    data: List[CasoCercano]
+
+class CasoDetalleResponse(TypedDict):
+    success: bool
+    data: Caso
@@ -0,0 +1,276 @@
+# app/services/busqueda_service.py
+import asyncio
+import bisect
+import functools
+import heapq
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from app.core.config import settings
+from app.core.database import ejecutar_db
+
+logger = logging.getLogger(__name__)
+
+# Campos indexados y su peso en la puntuación
+CAMPOS_BUSQUEDA = {
+    "titulo": 3.0,
+    "entidad": 2.0,
+    "direccion": 1.0,
+    "descripcion": 1.0
+}
+
+PALABRAS_VACIAS = frozenset("""
+    a al algo ante como con contra cual de del desde donde durante e el ella ellas
+    ellos en entre era es esa ese eso esta este esto fue ha han hasta la las le les
+    lo los mas me mi mis muy no nos o para pero por que se sin sobre su sus te tu
+    un una uno unos unas y ya
+""".split())
+
+# Parámetros de BM25
+K1 = 1.2
+B = 0.75
+LONGITUD_PROMEDIO_INICIAL = 50.0
+
+# Una palabra de la consulta se expande como máximo a estos términos por prefijo
+MAX_EXPANSIONES_PREFIJO = 50
+PESO_PREFIJO = 0.9
+
+# Espera entre intentos si la construcción falla: se duplica hasta el máximo
+REINTENTO_INICIAL = 5
+REINTENTO_MAXIMO = 300
+
+_PALABRA = re.compile(r"\w+")
+
+# Atajo para los acentos del español; el resto de caracteres pasa por NFKD
+_SIN_ACENTOS = str.maketrans("áéíóúüñàèìòù", "aeiouunaeiou")
+
+def normalizar_texto(texto: str) -> str:
+    """Minúsculas y sin acentos (la ñ pasa a n)"""
+    texto = texto.lower().translate(_SIN_ACENTOS)
+    if texto.isascii():
+        return texto
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+# Las palabras se repiten mucho entre casos: normalizar cada una una sola vez
+_normalizar_palabra = functools.lru_cache(maxsize=100_000)(normalizar_texto)
+
+def tokenizar(texto: str) -> list:
+    """Palabras normalizadas, sin palabras vacías"""
+    if not texto:
+        return []
+    palabras = (_normalizar_palabra(palabra) for palabra in _PALABRA.findall(texto.lower()))
+    return [palabra for palabra in palabras if palabra not in PALABRAS_VACIAS]
+
+def _frecuencias(caso: dict) -> dict:
+    """Frecuencia ponderada de cada término en los campos indexados de un caso"""
+    frecuencias = {}
+    for campo, peso in CAMPOS_BUSQUEDA.items():
+        for termino in tokenizar(caso.get(campo)):
+            frecuencias[termino] = frecuencias.get(termino, 0.0) + peso
+    return frecuencias
+
+class IndiceBusqueda:
+    """
+    Índice invertido en memoria sobre los casos, con coincidencia por prefijo y
+    puntuación BM25. Se construye al iniciar, se actualiza en cada escritura de
+    este worker y se reconstruye periódicamente para incluir las de los demás.
+
+    Cada entrada guarda ya la parte de BM25 que depende del caso; para eso se usa
+    la longitud promedio de la última reconstrucción en lugar de la actual.
+    """
+
+    def __init__(self, longitud_promedio: float = LONGITUD_PROMEDIO_INICIAL):
+        self._lock = threading.Lock()
+        self._listas = {}
+        self._documentos = {}
+        self._vocabulario = []
+        self._longitud_promedio = longitud_promedio
+        self.listo = False
+        self.construido_en = None
+        self._construyendo = False
+        self._pendientes = []
+        self._consultas = 0
+        self._tiempo_consultas = 0.0
+
+    def _puntajes_caso(self, frecuencias: dict) -> dict:
+        """Término -> componente de BM25 por frecuencia y longitud del caso"""
+        norma = K1 * (1 - B + B * sum(frecuencias.values()) / self._longitud_promedio)
+        return {termino: frecuencia * (K1 + 1) / (frecuencia + norma) for termino, frecuencia in frecuencias.items()}
+
+    def _agregar(self, caso_id: int, frecuencias: dict, ordenar: bool = True):
+        self._quitar(caso_id)
+        if not frecuencias:
+            return
+        for termino, parcial in self._puntajes_caso(frecuencias).items():
+            lista = self._listas.get(termino)
+            if lista is None:
+                lista = self._listas[termino] = {}
+                if ordenar:
+                    bisect.insort(self._vocabulario, termino)
+            lista[caso_id] = parcial
+        self._documentos[caso_id] = tuple(frecuencias)
+
+    def _quitar(self, caso_id: int):
+        for termino in self._documentos.pop(caso_id, ()):
+            lista = self._listas[termino]
+            del lista[caso_id]
+            if not lista:
+                del self._listas[termino]
+                del self._vocabulario[bisect.bisect_left(self._vocabulario, termino)]
+
+    def indexar_caso(self, caso: dict):
+        """Agrega o reemplaza un caso (fila con id y los campos de CAMPOS_BUSQUEDA)"""
+        frecuencias = _frecuencias(caso)
+        with self._lock:
+            self._agregar(caso["id"], frecuencias)
+            if self._construyendo:
+                self._pendientes.append((caso["id"], frecuencias))
+
+    def eliminar_caso(self, caso_id: int):
+        with self._lock:
+            self._quitar(caso_id)
+            if self._construyendo:
+                self._pendientes.append((caso_id, None))
+
+    def iniciar_reconstruccion(self):
+        """
+        Marca el inicio de una reconstrucción, antes de leer los casos: las
+        escrituras desde este momento se aplican de nuevo sobre el índice nuevo.
+        """
+        with self._lock:
+            self._construyendo = True
+            self._pendientes = []
+
+    def cancelar_reconstruccion(self):
+        with self._lock:
+            self._construyendo = False
+            self._pendientes = []
+
+    def reconstruir(self, casos: list):
+        """Reemplaza el contenido del índice por los casos leídos tras iniciar_reconstruccion()"""
+        try:
+            frecuencias = [(caso["id"], _frecuencias(caso)) for caso in casos]
+            longitudes = [sum(f.values()) for _, f in frecuencias if f]
+            nuevo = IndiceBusqueda(sum(longitudes) / len(longitudes) if longitudes else LONGITUD_PROMEDIO_INICIAL)
+            for caso_id, frecuencias_caso in frecuencias:
+                nuevo._agregar(caso_id, frecuencias_caso, ordenar=False)
+            nuevo._vocabulario = sorted(nuevo._listas)
+        except Exception:
+            self.cancelar_reconstruccion()
+            raise
+
+        with self._lock:
+            for caso_id, frecuencias_caso in self._pendientes:
+                if frecuencias_caso is None:
+                    nuevo._quitar(caso_id)
+                else:
+                    nuevo._agregar(caso_id, frecuencias_caso)
+            self._listas = nuevo._listas
+            self._documentos = nuevo._documentos
+            self._vocabulario = nuevo._vocabulario
+            self._longitud_promedio = nuevo._longitud_promedio
+            self._pendientes = []
+            self._construyendo = False
+            self.listo = True
+            self.construido_en = time.monotonic()
+
+    def _expandir(self, palabra: str) -> list:
+        """Términos del vocabulario que empiezan por la palabra: [(termino, peso)]"""
+        inicio = bisect.bisect_left(self._vocabulario, palabra)
+        terminos = []
+        for termino in self._vocabulario[inicio:inicio + MAX_EXPANSIONES_PREFIJO]:
+            if not termino.startswith(palabra):
+                break
+            terminos.append((termino, 1.0 if termino == palabra else PESO_PREFIJO))
+        return terminos
+
+    def buscar(self, consulta: str, limite: int, desplazamiento: int = 0) -> tuple:
+        """Retorna (total, [(caso_id, puntaje)]) ordenados por relevancia"""
+        inicio = time.perf_counter()
+        palabras = list(dict.fromkeys(tokenizar(consulta)))
+        with self._lock:
+            total_documentos = len(self._documentos)
+            puntajes = {}
+            for palabra in palabras:
+                expansiones = self._expandir(palabra)
+                if len(expansiones) == 1:
+                    aportes = self._listas[expansiones[0][0]]
+                    factor = expansiones[0][1] * self._idf(len(aportes), total_documentos)
+                else:
+                    # Cada palabra aporta la mejor de sus expansiones en cada caso
+                    aportes = {}
+                    for termino, peso in expansiones:
+                        lista = self._listas[termino]
+                        idf = peso * self._idf(len(lista), total_documentos)
+                        for caso_id, parcial in lista.items():
+                            puntaje = idf * parcial
+                            if puntaje > aportes.get(caso_id, 0.0):
+                                aportes[caso_id] = puntaje
+                    factor = 1.0
+                for caso_id, parcial in aportes.items():
+                    puntajes[caso_id] = puntajes.get(caso_id, 0.0) + factor * parcial
+
+            # Solo se ordena la parte necesaria; a igual puntaje, los casos más recientes primero
+            mejores = heapq.nsmallest(desplazamiento + limite, puntajes.items(), key=lambda par: (-par[1], -par[0]))
+            self._consultas += 1
+            self._tiempo_consultas += time.perf_counter() - inicio
+        return len(puntajes), mejores[desplazamiento:]
+
+    @staticmethod
+    def _idf(casos_con_termino: int, total_documentos: int) -> float:
+        return math.log(1 + (total_documentos - casos_con_termino + 0.5) / (casos_con_termino + 0.5))
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "listo": self.listo,
+                "construyendo": self._construyendo,
+                "segundosDesdeConstruccion": round(time.monotonic() - self.construido_en) if self.construido_en else None,
+                "documentos": len(self._documentos),
+                "terminos": len(self._listas),
+                "consultas": self._consultas,
+                "latenciaPromedio": round(self._tiempo_consultas / self._consultas, 6) if self._consultas else None
+            }
+
+def _casos_para_indexar(conexion) -> list:
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT id, {', '.join(CAMPOS_BUSQUEDA)} FROM Casos")
+    return cursor.fetchall()
+
+async def construir_indice_busqueda():
+    """Carga todos los casos y reemplaza el contenido del índice"""
+    indice_busqueda.iniciar_reconstruccion()
+    try:
+        casos = await ejecutar_db(_casos_para_indexar)
+        inicio = time.perf_counter()
+        # Construir fuera del event loop: con muchos casos tarda segundos
+        await asyncio.to_thread(indice_busqueda.reconstruir, casos)
+    except BaseException:
+        indice_busqueda.cancelar_reconstruccion()
+        raise
+    logger.info("Índice de búsqueda construido: %s casos en %.2fs", len(casos), time.perf_counter() - inicio)
+
+async def reconstruir_periodicamente():
+    """
+    Tarea de fondo: construye el índice al iniciar y lo reconstruye cada
+    BUSQUEDA_RECONSTRUIR_SEGUNDOS. Si falla, reintenta con espera creciente;
+    mientras tanto se sigue usando el índice anterior (o 503 si no hay ninguno).
+    """
+    espera = REINTENTO_INICIAL
+    while True:
+        try:
+            await construir_indice_busqueda()
+        except Exception as e:
+            logger.warning("No se pudo construir el índice de búsqueda (reintento en %ss): %s", espera, e)
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, REINTENTO_MAXIMO)
+            continue
+        espera = REINTENTO_INICIAL
+        await asyncio.sleep(settings.BUSQUEDA_RECONSTRUIR_SEGUNDOS)
+
+# Instancia global
+indice_busqueda = IndiceBusqueda()
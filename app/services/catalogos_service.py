@@ -0,0 +1,135 @@
+# app/services/catalogos_service.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.database import ejecutar_db
+
+logger = logging.getLogger(__name__)
+
+# Un id desconocido (p. ej. una categoría recién creada) pide un refresco en
+# segundo plano, como mucho una vez en este intervalo
+INTERVALO_REFRESCO_POR_FALTANTE = 30
+
+# Los estados de un caso no tienen tabla: son fijos
+ESTADOS_CASO = {
+    1: "Activo",
+    2: "En Revisión",
+    3: "Pausado",
+    4: "Rechazado",
+    5: "Concluido"
+}
+
+def _etag(datos) -> str:
+    """ETag fuerte: hash del contenido serializado de forma estable"""
+    contenido = json.dumps(datos, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return f'"{hashlib.sha1(contenido).hexdigest()}"'
+
+def _leer_catalogos(conexion) -> tuple:
+    cursor = conexion.cursor()
+    cursor.execute("SELECT id, nombre FROM Categorias ORDER BY id")
+    categorias = {fila["id"]: fila["nombre"] for fila in cursor.fetchall()}
+    cursor.execute("SELECT id, nombre FROM TipoUsuario ORDER BY id")
+    tipos_usuario = {fila["id"]: fila["nombre"] for fila in cursor.fetchall()}
+    return categorias, tipos_usuario
+
+class Catalogos:
+    """
+    Tablas de referencia (Categorias, TipoUsuario) y estados de caso en memoria.
+    Se cargan al iniciar y se refrescan cada CATALOGOS_TTL o a petición; las
+    lecturas nunca van a la base de datos.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._categorias = {}
+        self._tipos_usuario = {}
+        self._etags = {"estados": _etag(ESTADOS_CASO)}
+        self._cargado_en = None
+        self._refrescando = asyncio.Lock()
+        self._refrescos = 0
+        self._refresco_pedido_en = None
+        self._tarea_refresco = None
+
+    @property
+    def cargado(self) -> bool:
+        return self._cargado_en is not None
+
+    async def refrescar(self):
+        """Recarga los catálogos desde la base de datos"""
+        async with self._refrescando:
+            categorias, tipos_usuario = await ejecutar_db(_leer_catalogos)
+            # Reemplazo atómico: los lectores ven el catálogo anterior o el nuevo
+            self._categorias, self._tipos_usuario = categorias, tipos_usuario
+            self._etags = {
+                "categorias": _etag(categorias),
+                "tiposUsuario": _etag(tipos_usuario),
+                "estados": self._etags["estados"]
+            }
+            self._cargado_en = time.monotonic()
+            self._refrescos += 1
+
+    async def asegurar_vigente(self):
+        """Refresca si los catálogos no se han cargado o ya expiraron"""
+        if not self.cargado or time.monotonic() - self._cargado_en > self.ttl:
+            await self.refrescar()
+
+    def _pedir_refresco(self):
+        ahora = time.monotonic()
+        if self._refresco_pedido_en is not None and ahora - self._refresco_pedido_en < INTERVALO_REFRESCO_POR_FALTANTE:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._refresco_pedido_en = ahora
+        self._tarea_refresco = loop.create_task(self.refrescar())
+        self._tarea_refresco.add_done_callback(lambda tarea: tarea.cancelled() or tarea.exception())
+
+    def nombre_categoria(self, id_categoria: Optional[int]) -> Optional[str]:
+        nombre = self._categorias.get(id_categoria)
+        if nombre is None and id_categoria is not None:
+            self._pedir_refresco()
+        return nombre
+
+    def nombre_estado(self, id_estado: Optional[int]) -> str:
+        return ESTADOS_CASO.get(id_estado, "Desconocido")
+
+    def nombre_tipo_usuario(self, id_tipo: Optional[int]) -> Optional[str]:
+        return self._tipos_usuario.get(id_tipo)
+
+    def listar(self, catalogo: str) -> tuple:
+        """Retorna ([{id, nombre}], etag) de categorias, tiposUsuario o estados"""
+        datos = {
+            "categorias": self._categorias,
+            "tiposUsuario": self._tipos_usuario,
+            "estados": ESTADOS_CASO
+        }[catalogo]
+        return [{"id": id_, "nombre": nombre} for id_, nombre in datos.items()], self.etag(catalogo)
+
+    def etag(self, catalogo: str) -> Optional[str]:
+        return self._etags.get(catalogo)
+
+    def estadisticas(self) -> dict:
+        return {
+            "categorias": len(self._categorias),
+            "tiposUsuario": len(self._tipos_usuario),
+            "ttl": self.ttl,
+            "edad": round(time.monotonic() - self._cargado_en, 1) if self.cargado else None,
+            "refrescos": self._refrescos
+        }
+
+async def refrescar_periodicamente():
+    """Tarea de fondo: carga los catálogos al iniciar y los refresca cada CATALOGOS_TTL"""
+    while True:
+        try:
+            await catalogos.refrescar()
+        except Exception as e:
+            logger.warning("No se pudieron cargar los catálogos: %s", e)
+        await asyncio.sleep(catalogos.ttl if catalogos.cargado else 5)
+
+# Instancia global
+catalogos = Catalogos(settings.CATALOGOS_TTL)
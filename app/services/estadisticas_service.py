@@ -0,0 +1,191 @@
+# app/services/estadisticas_service.py
+import asyncio
+import logging
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+from app.core.config import settings
+from app.core.database import ejecutar_db
+
+logger = logging.getLogger(__name__)
+
+def _decimal(valor) -> Decimal:
+    if valor is None:
+        return Decimal(0)
+    return valor if isinstance(valor, Decimal) else Decimal(str(valor))
+
+def _resumen_caso(caso: dict) -> tuple:
+    """Lo que aporta un caso a los agregados"""
+    return (
+        caso.get("idEstado"),
+        caso.get("estaAbierto"),
+        caso.get("idCategoria"),
+        caso.get("entidad"),
+        _decimal(caso.get("montoObjetivo")),
+        _decimal(caso.get("montoRecaudado"))
+    )
+
+class EstadisticasCasos:
+    """
+    Conteos por estado, categoría y entidad y sumas de montos, mantenidos en
+    cada escritura. Se guarda lo que aporta cada caso para poder restarlo al
+    actualizarlo o eliminarlo; la conciliación periódica corrige los cambios
+    hechos fuera de esta API.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._casos = {}
+        self._por_estado = Counter()
+        self._por_categoria = Counter()
+        self._por_entidad = Counter()
+        self._abiertos = 0
+        self._monto_objetivo = Decimal(0)
+        self._monto_recaudado = Decimal(0)
+        self.listo = False
+        self._construyendo = False
+        self._pendientes = []
+        self._conciliaciones = 0
+        self._diferencias = 0
+        self._ultima_conciliacion = None
+
+    def _sumar(self, resumen: tuple, signo: int):
+        id_estado, esta_abierto, id_categoria, entidad, monto_objetivo, monto_recaudado = resumen
+        self._por_estado[id_estado] += signo
+        self._por_categoria[id_categoria] += signo
+        self._por_entidad[entidad] += signo
+        self._abiertos += signo if esta_abierto == 1 else 0
+        self._monto_objetivo += signo * monto_objetivo
+        self._monto_recaudado += signo * monto_recaudado
+
+    def _quitar(self, caso_id: int):
+        resumen = self._casos.pop(caso_id, None)
+        if resumen is not None:
+            self._sumar(resumen, -1)
+
+    def _agregar(self, caso_id: int, resumen: tuple):
+        self._quitar(caso_id)
+        self._casos[caso_id] = resumen
+        self._sumar(resumen, 1)
+
+    def actualizar_caso(self, caso: dict):
+        """Aplica un caso creado o actualizado (fila de QUERY_CASO_COMPLETO)"""
+        resumen = _resumen_caso(caso)
+        with self._lock:
+            self._agregar(caso["id"], resumen)
+            if self._construyendo:
+                self._pendientes.append((caso["id"], resumen))
+
+    def eliminar_caso(self, caso_id: int):
+        with self._lock:
+            self._quitar(caso_id)
+            if self._construyendo:
+                self._pendientes.append((caso_id, None))
+
+    def iniciar_reconstruccion(self):
+        """Antes de leer los casos: las escrituras desde aquí se reaplican al reconstruir"""
+        with self._lock:
+            self._construyendo = True
+            self._pendientes = []
+
+    def cancelar_reconstruccion(self):
+        with self._lock:
+            self._construyendo = False
+            self._pendientes = []
+
+    def reconstruir(self, casos: list):
+        """Reemplaza los agregados por los de SQL; retorna cuántos casos diferían"""
+        nuevo = EstadisticasCasos()
+        for caso in casos:
+            nuevo._agregar(caso["id"], _resumen_caso(caso))
+
+        with self._lock:
+            for caso_id, resumen in self._pendientes:
+                if resumen is None:
+                    nuevo._quitar(caso_id)
+                else:
+                    nuevo._agregar(caso_id, resumen)
+
+            diferencias = 0
+            if self.listo:
+                diferencias = sum(
+                    1 for caso_id in self._casos.keys() | nuevo._casos.keys()
+                    if self._casos.get(caso_id) != nuevo._casos.get(caso_id)
+                )
+
+            self._casos = nuevo._casos
+            self._por_estado = nuevo._por_estado
+            self._por_categoria = nuevo._por_categoria
+            self._por_entidad = nuevo._por_entidad
+            self._abiertos = nuevo._abiertos
+            self._monto_objetivo = nuevo._monto_objetivo
+            self._monto_recaudado = nuevo._monto_recaudado
+            self._pendientes = []
+            self._construyendo = False
+            self._conciliaciones += 1
+            self._diferencias += diferencias
+            self._ultima_conciliacion = time.time()
+            self.listo = True
+        return diferencias
+
+    def resumen(self) -> dict:
+        """Agregados actuales: conteos como dict id -> casos (sin grupos vacíos)"""
+        with self._lock:
+            return {
+                "total": len(self._casos),
+                "abiertos": self._abiertos,
+                "montoObjetivo": self._monto_objetivo,
+                "montoRecaudado": self._monto_recaudado,
+                "porEstado": {clave: casos for clave, casos in self._por_estado.items() if casos},
+                "porCategoria": {clave: casos for clave, casos in self._por_categoria.items() if casos},
+                "porEntidad": {clave: casos for clave, casos in self._por_entidad.items() if casos},
+                "ultimaConciliacion": self._ultima_conciliacion
+            }
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "listo": self.listo,
+                "casos": len(self._casos),
+                "conciliaciones": self._conciliaciones,
+                "diferenciasCorregidas": self._diferencias,
+                "ultimaConciliacion": self._ultima_conciliacion
+            }
+
+def _leer_agregables(conexion) -> list:
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT c.id, c.idEstado, c.estaAbierto, cc.idCategoria, c.entidad, c.montoObjetivo, c.montoRecaudado
+        FROM Casos c
+        LEFT JOIN CasoCategorias cc ON c.id = cc.idCaso
+    """)
+    return cursor.fetchall()
+
+_sincronizando = asyncio.Lock()
+
+async def conciliar_estadisticas() -> int:
+    """Recalcula los agregados desde SQL; retorna cuántos casos estaban desfasados"""
+    async with _sincronizando:
+        estadisticas_casos.iniciar_reconstruccion()
+        try:
+            casos = await ejecutar_db(_leer_agregables)
+            diferencias = await asyncio.to_thread(estadisticas_casos.reconstruir, casos)
+        except BaseException:
+            estadisticas_casos.cancelar_reconstruccion()
+            raise
+        if diferencias:
+            logger.warning("Conciliación de estadísticas: %s casos desfasados corregidos", diferencias)
+        return diferencias
+
+async def conciliar_periodicamente():
+    """Tarea de fondo: construye los agregados al iniciar y los concilia cada cierto tiempo"""
+    while True:
+        try:
+            await conciliar_estadisticas()
+        except Exception as e:
+            logger.warning("No se pudieron conciliar las estadísticas de casos: %s", e)
+        await asyncio.sleep(settings.ESTADISTICAS_CONCILIACION_SEGUNDOS)
+
+# Instancia global
+estadisticas_casos = EstadisticasCasos()
@@ -0,0 +1,224 @@
+# app/services/geo_service.py
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Optional
+from app.core.config import settings
+from app.core.database import ejecutar_db
+
+logger = logging.getLogger(__name__)
+
+RADIO_TIERRA_KM = 6371.0088
+KM_POR_GRADO = math.pi * RADIO_TIERRA_KM / 180
+
+# Lado de cada celda de la rejilla en grados (~11 km de latitud)
+TAMANO_CELDA = 0.1
+
+# Espera entre intentos si la construcción falla: se duplica hasta el máximo
+REINTENTO_INICIAL = 5
+REINTENTO_MAXIMO = 300
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia de gran círculo (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def caja_de_radio(latitud: float, longitud: float, radio_km: float) -> tuple:
+    """Caja (sur, oeste, norte, este) que contiene el círculo; no cruza el antimeridiano"""
+    delta_lat = radio_km / KM_POR_GRADO
+    if abs(latitud) + delta_lat >= 90.0:
+        # El círculo contiene un polo: abarca todas las longitudes
+        delta_lon = 180.0
+    else:
+        # Más ancho que radio / cos(latitud) grados: el punto más al este del
+        # círculo está al norte (o al sur) del centro
+        delta_lon = math.degrees(math.asin(math.sin(radio_km / RADIO_TIERRA_KM) / math.cos(math.radians(latitud))))
+    return (
+        max(-90.0, latitud - delta_lat),
+        max(-180.0, longitud - delta_lon),
+        min(90.0, latitud + delta_lat),
+        min(180.0, longitud + delta_lon)
+    )
+
+def _celda(latitud: float, longitud: float) -> tuple:
+    return math.floor(latitud / TAMANO_CELDA), math.floor(longitud / TAMANO_CELDA)
+
+class IndiceGeografico:
+    """
+    Rejilla en memoria de la ubicación de los casos: cada celda guarda los IDs
+    de los casos que caen en ella, así una consulta solo revisa las celdas de su caja.
+    Solo ve al instante las escrituras de este worker: las demás llegan con la
+    reconstrucción periódica.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._celdas = {}
+        self._posiciones = {}
+        self.listo = False
+        self.construido_en = None
+        self._construyendo = False
+        self._pendientes = []
+
+    def _quitar(self, caso_id: int):
+        posicion = self._posiciones.pop(caso_id, None)
+        if posicion is None:
+            return
+        celda = _celda(*posicion)
+        casos = self._celdas[celda]
+        casos.discard(caso_id)
+        if not casos:
+            del self._celdas[celda]
+
+    def _agregar(self, caso_id: int, latitud: Optional[float], longitud: Optional[float]):
+        self._quitar(caso_id)
+        if latitud is None or longitud is None:
+            return
+        posicion = (float(latitud), float(longitud))
+        self._posiciones[caso_id] = posicion
+        self._celdas.setdefault(_celda(*posicion), set()).add(caso_id)
+
+    def actualizar_caso(self, caso: dict):
+        """Agrega, mueve o quita (sin coordenadas) un caso"""
+        with self._lock:
+            self._agregar(caso["id"], caso.get("latitud"), caso.get("longitud"))
+            if self._construyendo:
+                self._pendientes.append((caso["id"], caso.get("latitud"), caso.get("longitud")))
+
+    def eliminar_caso(self, caso_id: int):
+        with self._lock:
+            self._quitar(caso_id)
+            if self._construyendo:
+                self._pendientes.append((caso_id, None, None))
+
+    def iniciar_reconstruccion(self):
+        """Antes de leer las ubicaciones: las escrituras desde aquí se reaplican al reconstruir"""
+        with self._lock:
+            self._construyendo = True
+            self._pendientes = []
+
+    def cancelar_reconstruccion(self):
+        with self._lock:
+            self._construyendo = False
+            self._pendientes = []
+
+    def reconstruir(self, casos: list):
+        with self._lock:
+            self._celdas = {}
+            self._posiciones = {}
+            for caso in casos:
+                self._agregar(caso["id"], caso["latitud"], caso["longitud"])
+            for caso_id, latitud, longitud in self._pendientes:
+                self._agregar(caso_id, latitud, longitud)
+            self._pendientes = []
+            self._construyendo = False
+            self.listo = True
+            self.construido_en = time.monotonic()
+
+    def vigente(self, max_edad: float) -> bool:
+        """Listo y reconstruido hace menos de max_edad segundos"""
+        return self.listo and time.monotonic() - self.construido_en <= max_edad
+
+    def en_caja(self, sur: float, oeste: float, norte: float, este: float) -> list:
+        """[(caso_id, latitud, longitud)] de los casos dentro de la caja"""
+        (celda_sur, celda_oeste), (celda_norte, celda_este) = _celda(sur, oeste), _celda(norte, este)
+        with self._lock:
+            # Con cajas enormes es más barato recorrer todas las posiciones
+            if (celda_norte - celda_sur + 1) * (celda_este - celda_oeste + 1) > len(self._celdas):
+                candidatos = self._posiciones.keys()
+            else:
+                candidatos = [
+                    caso_id
+                    for fila in range(celda_sur, celda_norte + 1)
+                    for columna in range(celda_oeste, celda_este + 1)
+                    for caso_id in self._celdas.get((fila, columna), ())
+                ]
+            return [
+                (caso_id, *self._posiciones[caso_id])
+                for caso_id in candidatos
+                if sur <= self._posiciones[caso_id][0] <= norte and oeste <= self._posiciones[caso_id][1] <= este
+            ]
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "listo": self.listo,
+                "segundosDesdeConstruccion": round(time.monotonic() - self.construido_en) if self.construido_en else None,
+                "casos": len(self._posiciones),
+                "celdas": len(self._celdas),
+                "tamanoCelda": TAMANO_CELDA
+            }
+
+def _casos_en_caja_sql(conexion, sur: float, oeste: float, norte: float, este: float) -> list:
+    """Respaldo mientras el índice en memoria no está listo o vigente (usa idx_casos_ubicacion)"""
+    cursor = conexion.cursor()
+    cursor.execute(
+        """
+            SELECT id, latitud, longitud FROM Casos
+            WHERE latitud BETWEEN %s AND %s AND longitud BETWEEN %s AND %s
+        """,
+        (sur, norte, oeste, este)
+    )
+    return [(fila["id"], float(fila["latitud"]), float(fila["longitud"])) for fila in cursor.fetchall()]
+
+async def casos_cercanos(latitud: float, longitud: float, caja: tuple, radio_km: Optional[float] = None) -> list:
+    """
+    [(caso_id, distancia_km)] de los casos dentro de la caja (y del radio, si se
+    indica), ordenados por distancia al punto.
+    """
+    # Si las reconstrucciones vienen fallando, la rejilla no ve las escrituras
+    # de otros workers: mejor consultar la base
+    if indice_geografico.vigente(2 * settings.GEO_RECONSTRUIR_SEGUNDOS):
+        candidatos = indice_geografico.en_caja(*caja)
+    else:
+        candidatos = await ejecutar_db(_casos_en_caja_sql, *caja)
+
+    resultados = []
+    for caso_id, lat, lon in candidatos:
+        distancia = distancia_km(latitud, longitud, lat, lon)
+        if radio_km is None or distancia <= radio_km:
+            resultados.append((caso_id, distancia))
+    resultados.sort(key=lambda par: (par[1], par[0]))
+    return resultados
+
+def _ubicaciones_casos(conexion) -> list:
+    cursor = conexion.cursor()
+    cursor.execute("SELECT id, latitud, longitud FROM Casos WHERE latitud IS NOT NULL AND longitud IS NOT NULL")
+    return cursor.fetchall()
+
+async def construir_indice_geografico():
+    """Carga las ubicaciones de los casos y reemplaza el contenido de la rejilla"""
+    indice_geografico.iniciar_reconstruccion()
+    try:
+        casos = await ejecutar_db(_ubicaciones_casos)
+        await asyncio.to_thread(indice_geografico.reconstruir, casos)
+    except BaseException:
+        indice_geografico.cancelar_reconstruccion()
+        raise
+    logger.info("Índice geográfico construido: %s casos", len(casos))
+
+async def reconstruir_periodicamente():
+    """
+    Tarea de fondo: construye la rejilla al iniciar y la reconstruye cada
+    GEO_RECONSTRUIR_SEGUNDOS. Si falla, reintenta con espera creciente; las
+    consultas usan SQL hasta que haya una rejilla vigente.
+    """
+    espera = REINTENTO_INICIAL
+    while True:
+        try:
+            await construir_indice_geografico()
+        except Exception as e:
+            logger.warning("No se pudo construir el índice geográfico (reintento en %ss): %s", espera, e)
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, REINTENTO_MAXIMO)
+            continue
+        espera = REINTENTO_INICIAL
+        await asyncio.sleep(settings.GEO_RECONSTRUIR_SEGUNDOS)
+
+# Instancia global
+indice_geografico = IndiceGeografico()
@@ -0,0 +1,172 @@
+# app/services/imagen_service.py
+import asyncio
+import io
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from PIL import Image, ImageOps
+from app.core.config import settings
+from app.core.procesos import contexto_procesos
+
+# Lado máximo en píxeles de cada variante
+VARIANTES = {
+    "medium": 1024,
+    "thumb": 320
+}
+
+# La imagen principal se guarda en JPEG porque Rekognition no acepta WebP
+FORMATO_ORIGINAL = "JPEG"
+
+FORMATOS = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "WEBP": ("webp", "image/webp")
+}
+
+def _codificar(imagen: Image.Image, formato: str, calidad: int) -> bytes:
+    """Codifica la imagen sin metadatos (Pillow no copia EXIF salvo que se pida)"""
+    if formato == "JPEG" and imagen.mode != "RGB":
+        imagen = imagen.convert("RGB")
+    salida = io.BytesIO()
+    imagen.save(salida, format=formato, quality=calidad, optimize=True)
+    return salida.getvalue()
+
+def normalizar_imagen(datos: bytes, max_dimension: int, formato_variantes: str, calidad: int) -> dict:
+    """
+    Aplica la orientación EXIF, limita la resolución y recodifica la imagen y sus
+    variantes. Se ejecuta en un proceso del pool; retorna nombre -> bytes.
+    """
+    with Image.open(io.BytesIO(datos)) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA" if "A" in imagen.getbands() else "RGB")
+        imagen.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        resultado = {"original": _codificar(imagen, FORMATO_ORIGINAL, calidad)}
+        for nombre, lado in VARIANTES.items():
+            variante = imagen.copy()
+            variante.thumbnail((lado, lado), Image.LANCZOS)
+            resultado[nombre] = _codificar(variante, formato_variantes, calidad)
+        return resultado
+
+# Formatos que Rekognition acepta como bytes
+FORMATOS_REKOGNITION = ("JPEG", "PNG")
+
+def preparar_para_rekognition(datos: bytes, max_dimension: int, calidad: int) -> tuple:
+    """
+    Orienta y reduce una imagen antes de enviarla a Rekognition. Retorna
+    (bytes, ancho, alto), con las dimensiones de la imagen orientada sin reducir.
+    Si ya cabe en max_dimension y no necesita rotarse, se envían los bytes originales.
+    """
+    with Image.open(io.BytesIO(datos)) as imagen:
+        orientacion = imagen.getexif().get(0x0112, 1)
+        formato = imagen.format
+        imagen = ImageOps.exif_transpose(imagen)
+        ancho, alto = imagen.size
+        if orientacion == 1 and max(ancho, alto) <= max_dimension and formato in FORMATOS_REKOGNITION:
+            return datos, ancho, alto
+
+        imagen.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        return _codificar(imagen, "JPEG", calidad), ancho, alto
+
+def _formato(nombre: str) -> str:
+    return FORMATO_ORIGINAL if nombre == "original" else settings.IMAGENES_FORMATO_VARIANTES
+
+def archivo_variante(nombre: str) -> str:
+    """Nombre del objeto de una variante dentro de la carpeta de la imagen"""
+    return f"{nombre}.{FORMATOS[_formato(nombre)][0]}"
+
+def tipo_contenido_variante(nombre: str) -> str:
+    return FORMATOS[_formato(nombre)][1]
+
+def urls_variantes(url: Optional[str]) -> Optional[dict]:
+    """
+    URLs de las variantes de una imagen normalizada, derivadas de la URL de su
+    original (.../imagen_N_<uuid>/original.jpg). None si la imagen no tiene variantes.
+    """
+    if not url:
+        return None
+    base, _, archivo = url.rpartition('/')
+    if not archivo.startswith("original."):
+        return None
+    variantes = {"original": url}
+    for nombre in VARIANTES:
+        variantes[nombre] = f"{base}/{archivo_variante(nombre)}"
+    return variantes
+
+class ImagenService:
+    """Normalización de imágenes en un pool de procesos"""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._preparadas = 0
+        self._bytes_recibidos = 0
+        self._bytes_enviados = 0
+        self._tiempo_preparacion = 0.0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Se crea al primer uso para no lanzar procesos al importar el módulo
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGENES_PROCESOS,
+                mp_context=contexto_procesos()
+            )
+        return self._executor
+
+    async def normalizar(self, datos: bytes) -> dict:
+        """Retorna los bytes de la imagen normalizada y de cada variante"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._pool(),
+            normalizar_imagen,
+            datos,
+            settings.IMAGENES_MAX_DIMENSION,
+            settings.IMAGENES_FORMATO_VARIANTES,
+            settings.IMAGENES_CALIDAD
+        )
+
+    async def preparar_rekognition(self, datos: bytes) -> tuple:
+        """
+        Retorna (bytes, ancho, alto) listos para Rekognition. Sin
+        REKOGNITION_PREPROCESAR los bytes se envían tal cual y las dimensiones son None.
+        """
+        if not settings.REKOGNITION_PREPROCESAR:
+            return datos, None, None
+
+        inicio = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        resultado = await loop.run_in_executor(
+            self._pool(),
+            preparar_para_rekognition,
+            datos,
+            settings.REKOGNITION_MAX_DIMENSION,
+            settings.REKOGNITION_CALIDAD
+        )
+        with self._lock:
+            self._preparadas += 1
+            self._bytes_recibidos += len(datos)
+            self._bytes_enviados += len(resultado[0])
+            self._tiempo_preparacion += time.perf_counter() - inicio
+        return resultado
+
+    def estadisticas(self) -> dict:
+        """Bytes recibidos frente a bytes enviados a Rekognition y tiempo de preparación"""
+        with self._lock:
+            return {
+                "activo": settings.REKOGNITION_PREPROCESAR,
+                "maxDimension": settings.REKOGNITION_MAX_DIMENSION,
+                "imagenes": self._preparadas,
+                "bytesRecibidos": self._bytes_recibidos,
+                "bytesEnviados": self._bytes_enviados,
+                "reduccion": round(1 - self._bytes_enviados / self._bytes_recibidos, 4) if self._bytes_recibidos else None,
+                "tiempoPromedio": round(self._tiempo_preparacion / self._preparadas, 6) if self._preparadas else None
+            }
+
+    def cerrar(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Instancia global
+imagen_service = ImagenService()
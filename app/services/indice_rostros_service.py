@@ -0,0 +1,279 @@
+# app/services/indice_rostros_service.py
+import asyncio
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+from app.core.aws_clients import aws_clients, aws_gateway
+from app.core.config import settings
+from app.core.database import ejecutar_db
+
+logger = logging.getLogger(__name__)
+
+def _id_externo(caso_id: int, campo: str) -> str:
+    return f"caso_{caso_id}_{campo}"
+
+def _caso_desde_id_externo(id_externo: str) -> tuple:
+    """caso_<id>_<campo> -> (id, campo)"""
+    _, caso_id, campo = id_externo.split('_', 2)
+    return int(caso_id), campo
+
+def _clave_s3(url: str) -> str:
+    return urlparse(url).path.lstrip('/')
+
+def _agrupar_por_caso(coincidencias: list, max_resultados: int) -> list:
+    """Conserva la mejor coincidencia de cada caso, ordenadas por similitud"""
+    mejores = {}
+    for caso_id, campo, similitud in coincidencias:
+        if caso_id not in mejores or similitud > mejores[caso_id]["similitud"]:
+            mejores[caso_id] = {"caso_id": caso_id, "imagen": campo, "similitud": round(similitud, 2)}
+    return sorted(mejores.values(), key=lambda c: c["similitud"], reverse=True)[:max_resultados]
+
+class IndiceRostros(ABC):
+    """Interfaz del índice de rostros de las imágenes de los casos"""
+
+    @abstractmethod
+    async def indexar_caso(self, caso_id: int, imagenes: dict) -> int:
+        """(Re)indexa las imágenes de un caso (campo -> URL); retorna los rostros indexados"""
+
+    @abstractmethod
+    async def eliminar_caso(self, caso_id: int):
+        """Quita del índice todos los rostros de un caso"""
+
+    @abstractmethod
+    async def buscar(self, imagen: bytes, umbral: float, max_resultados: int) -> list:
+        """Casos cuyas imágenes contienen el rostro de `imagen`, ordenados por similitud"""
+
+class IndiceRostrosRekognition(IndiceRostros):
+    """
+    Índice sobre una colección de Rekognition. La relación caso -> FaceId se
+    guarda en la tabla CasoRostros para poder eliminar rostros sin listar la colección.
+    """
+
+    def __init__(self, coleccion: str):
+        self.coleccion = coleccion
+        self.cliente = aws_clients.rekognition
+        self._coleccion_lista = False
+
+    async def _asegurar_coleccion(self):
+        if self._coleccion_lista:
+            return
+        try:
+            await aws_gateway.ejecutar(
+                "rekognition.create_collection",
+                self.cliente.create_collection,
+                CollectionId=self.coleccion
+            )
+        except self.cliente.exceptions.ResourceAlreadyExistsException:
+            pass
+        self._coleccion_lista = True
+
+    @staticmethod
+    def _guardar_rostros(conexion, caso_id: int, rostros: list):
+        cursor = conexion.cursor()
+        cursor.executemany(
+            "INSERT INTO CasoRostros (faceId, idCaso, campo) VALUES (%s, %s, %s)",
+            [(face_id, caso_id, campo) for face_id, campo in rostros]
+        )
+        conexion.commit()
+
+    @staticmethod
+    def _rostros_de_caso(conexion, caso_id: int) -> list:
+        cursor = conexion.cursor()
+        cursor.execute("SELECT faceId FROM CasoRostros WHERE idCaso = %s", (caso_id,))
+        return [fila["faceId"] for fila in cursor.fetchall()]
+
+    @staticmethod
+    def _quitar_rostros(conexion, face_ids: list):
+        cursor = conexion.cursor()
+        cursor.execute(
+            f"DELETE FROM CasoRostros WHERE faceId IN ({', '.join(['%s'] * len(face_ids))})",
+            face_ids
+        )
+        conexion.commit()
+
+    async def _borrar_de_coleccion(self, face_ids: list):
+        await aws_gateway.ejecutar(
+            "rekognition.delete_faces",
+            self.cliente.delete_faces,
+            CollectionId=self.coleccion,
+            FaceIds=face_ids
+        )
+
+    async def _descartar_indexados(self, face_ids: list):
+        """Borra rostros recién indexados que no llegaron a CasoRostros: sin la fila nadie los borraría"""
+        try:
+            await self._borrar_de_coleccion(face_ids)
+        except Exception as e:
+            logger.warning("Quedaron %s rostros sin registrar en la colección: %s", len(face_ids), e)
+
+    async def indexar_caso(self, caso_id: int, imagenes: dict) -> int:
+        await self._asegurar_coleccion()
+        await self.eliminar_caso(caso_id)
+
+        async def indexar(campo: str, url: str) -> list:
+            respuesta = await aws_gateway.ejecutar(
+                "rekognition.index_faces",
+                self.cliente.index_faces,
+                CollectionId=self.coleccion,
+                Image={"S3Object": {"Bucket": settings.S3_BUCKET_NAME, "Name": _clave_s3(url)}},
+                ExternalImageId=_id_externo(caso_id, campo),
+                MaxFaces=settings.INDICE_ROSTROS_MAX_POR_IMAGEN,
+                QualityFilter="AUTO"
+            )
+            return [(registro["Face"]["FaceId"], campo) for registro in respuesta["FaceRecords"]]
+
+        resultados = await asyncio.gather(
+            *[indexar(campo, url) for campo, url in imagenes.items() if url],
+            return_exceptions=True
+        )
+        rostros = [rostro for resultado in resultados if isinstance(resultado, list) for rostro in resultado]
+        error = next((resultado for resultado in resultados if isinstance(resultado, BaseException)), None)
+        try:
+            if error is not None:
+                raise error
+            if rostros:
+                await ejecutar_db(self._guardar_rostros, caso_id, rostros)
+        except BaseException:
+            if rostros:
+                await self._descartar_indexados([face_id for face_id, _ in rostros])
+            raise
+        return len(rostros)
+
+    async def eliminar_caso(self, caso_id: int):
+        # Las filas se borran solo si Rekognition borró los rostros: si falla,
+        # siguen ahí para reintentar
+        face_ids = await ejecutar_db(self._rostros_de_caso, caso_id)
+        if face_ids:
+            await self._borrar_de_coleccion(face_ids)
+            await ejecutar_db(self._quitar_rostros, face_ids)
+
+    async def buscar(self, imagen: bytes, umbral: float, max_resultados: int) -> list:
+        await self._asegurar_coleccion()
+        try:
+            respuesta = await aws_gateway.ejecutar(
+                "rekognition.search_faces_by_image",
+                self.cliente.search_faces_by_image,
+                CollectionId=self.coleccion,
+                Image={"Bytes": imagen},
+                FaceMatchThreshold=umbral,
+                # Un caso puede aportar varios rostros; se piden de más antes de agrupar
+                MaxFaces=min(max_resultados * 4, 4096)
+            )
+        except self.cliente.exceptions.InvalidParameterException:
+            # La imagen no contiene ningún rostro
+            return []
+
+        coincidencias = [
+            (*_caso_desde_id_externo(match["Face"]["ExternalImageId"]), match["Similarity"])
+            for match in respuesta["FaceMatches"]
+        ]
+        return _agrupar_por_caso(coincidencias, max_resultados)
+
+class IndiceRostrosLocal(IndiceRostros):
+    """
+    Sustituto en memoria para desarrollo y pruebas: un "rostro" es el hash del
+    contenido de la imagen, así que solo coinciden imágenes idénticas.
+    """
+
+    def __init__(self):
+        self._por_hash = {}
+        self._por_caso = {}
+
+    async def _leer_imagen(self, url: str) -> bytes:
+        respuesta = await aws_gateway.ejecutar(
+            "s3.get_object",
+            aws_clients.s3.get_object,
+            Bucket=settings.S3_BUCKET_NAME,
+            Key=_clave_s3(url)
+        )
+        return await asyncio.to_thread(respuesta["Body"].read)
+
+    async def indexar_caso(self, caso_id: int, imagenes: dict) -> int:
+        await self.eliminar_caso(caso_id)
+        entradas = []
+        for campo, url in imagenes.items():
+            if url:
+                huella = hashlib.sha256(await self._leer_imagen(url)).hexdigest()
+                self._por_hash.setdefault(huella, set()).add((caso_id, campo))
+                entradas.append((huella, campo))
+        self._por_caso[caso_id] = entradas
+        return len(entradas)
+
+    async def eliminar_caso(self, caso_id: int):
+        for huella, campo in self._por_caso.pop(caso_id, []):
+            casos = self._por_hash.get(huella, set())
+            casos.discard((caso_id, campo))
+            if not casos:
+                self._por_hash.pop(huella, None)
+
+    async def buscar(self, imagen: bytes, umbral: float, max_resultados: int) -> list:
+        huella = hashlib.sha256(imagen).hexdigest()
+        coincidencias = [(caso_id, campo, 100.0) for caso_id, campo in self._por_hash.get(huella, ())]
+        return _agrupar_por_caso(coincidencias, max_resultados)
+
+def crear_indice_rostros() -> IndiceRostros:
+    """Crea el índice configurado en INDICE_ROSTROS"""
+    if settings.INDICE_ROSTROS == "local":
+        return IndiceRostrosLocal()
+    return IndiceRostrosRekognition(settings.REKOGNITION_COLECCION)
+
+def _casos_existentes(conexion, caso_ids: list) -> set:
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT id FROM Casos WHERE id IN ({', '.join(['%s'] * len(caso_ids))})", caso_ids)
+    return {fila["id"] for fila in cursor.fetchall()}
+
+async def buscar_rostro(imagen: bytes, umbral: float, max_resultados: int) -> tuple:
+    """
+    Busca en el índice y descarta los casos que ya no existen (rostros que
+    quedaron en el índice tras un borrado fallido). Retorna
+    (coincidencias, IDs de casos eliminados que siguen indexados).
+    """
+    coincidencias = await indice_rostros.buscar(imagen, umbral, max_resultados)
+    if not coincidencias:
+        return coincidencias, []
+    existentes = await ejecutar_db(_casos_existentes, [c["caso_id"] for c in coincidencias])
+    return (
+        [c for c in coincidencias if c["caso_id"] in existentes],
+        [c["caso_id"] for c in coincidencias if c["caso_id"] not in existentes]
+    )
+
+# Locks de los casos con una operación del índice en curso. Dos reindexaciones
+# simultáneas del mismo caso leerían los mismos rostros viejos y dejarían en la
+# colección los de una de ellas sin fila en CasoRostros
+_bloqueos_caso = {}
+
+@asynccontextmanager
+async def _bloqueo_caso(caso_id: int):
+    """Serializa las operaciones del índice sobre un caso (en este proceso)"""
+    entrada = _bloqueos_caso.get(caso_id)
+    if entrada is None:
+        entrada = _bloqueos_caso[caso_id] = [asyncio.Lock(), 0]
+    entrada[1] += 1
+    try:
+        async with entrada[0]:
+            yield
+    finally:
+        entrada[1] -= 1
+        if not entrada[1]:
+            del _bloqueos_caso[caso_id]
+
+async def reindexar_caso(caso_id: int, imagenes: dict):
+    """Tarea en segundo plano: reindexa un caso; los errores solo se registran"""
+    try:
+        async with _bloqueo_caso(caso_id):
+            await indice_rostros.indexar_caso(caso_id, imagenes)
+    except Exception as e:
+        logger.warning("No se pudo indexar los rostros del caso %s: %s", caso_id, e)
+
+async def desindexar_caso(caso_id: int):
+    """Tarea en segundo plano: quita un caso del índice; los errores solo se registran"""
+    try:
+        async with _bloqueo_caso(caso_id):
+            await indice_rostros.eliminar_caso(caso_id)
+    except Exception as e:
+        logger.warning("No se pudo quitar del índice el caso %s: %s", caso_id, e)
+
+# Instancia global
+indice_rostros = crear_indice_rostros()
@@ -1,40 +1,127 @@
 # app/services/rekognition_service.py
+import asyncio
+import hashlib
 from fastapi import UploadFile
-from app.core.aws_clients import aws_clients
+from app.core.aws_clients import aws_clients, aws_gateway
+from app.core.cache import MemoriaLRU
+from app.core.config import settings
+from app.services.imagen_service import imagen_service
+
+# Resultados de Rekognition por hash del contenido de las imágenes
+cache_rekognition = MemoriaLRU(settings.REKOGNITION_CACHE_MAX_ENTRADAS)
+
+def huella_imagen(image_bytes: bytes) -> str:
+    """Hash del contenido de una imagen"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+def _caja_en_pixeles(caja: dict, ancho: int, alto: int) -> dict:
+    return {
+        "Left": round(caja["Left"] * ancho),
+        "Top": round(caja["Top"] * alto),
+        "Width": round(caja["Width"] * ancho),
+        "Height": round(caja["Height"] * alto)
+    }
+
+def agregar_cajas_en_pixeles(rostros: list, ancho: int, alto: int):
+    """
+    Agrega BoundingBoxPixeles a cada rostro. Rekognition da las cajas como
+    proporciones de la imagen enviada; la reducción conserva la relación de
+    aspecto, así que valen igual para la imagen original (ya orientada).
+    """
+    if ancho is None:
+        return
+    for rostro in rostros:
+        if rostro and "BoundingBox" in rostro:
+            rostro["BoundingBoxPixeles"] = _caja_en_pixeles(rostro["BoundingBox"], ancho, alto)
 
 class RekognitionService:
     """Servicio para operaciones con Rekognition"""
     
     def __init__(self):
         self.rekognition_client = aws_clients.rekognition
+        self.cache = cache_rekognition
+        self.cache_ttl = settings.REKOGNITION_CACHE_TTL
     
-    async def detect_faces(self, file: UploadFile) -> dict:
-        """Detectar rostros en una imagen"""
+    async def detect_faces(self, file: UploadFile, atributos: tuple = ('ALL',)) -> dict:
+        """Detectar rostros en una imagen; `atributos` son los Attributes de DetectFaces"""
         try:
             image_bytes = await file.read()
+            atributos = list(atributos)
             
-            response = self.rekognition_client.detect_faces(
-                Image={'Bytes': image_bytes},
-                Attributes=['ALL']
-            )
+            clave = f"detect:{huella_imagen(image_bytes)}:{','.join(sorted(atributos))}"
+            encontrado, face_details = self.cache.obtener(clave)
+            if not encontrado:
+                enviados, ancho, alto = await imagen_service.preparar_rekognition(image_bytes)
+                response = await aws_gateway.ejecutar(
+                    "rekognition.detect_faces",
+                    self.rekognition_client.detect_faces,
+                    Image={'Bytes': enviados},
+                    Attributes=atributos
+                )
+                face_details = response['FaceDetails']
+                agregar_cajas_en_pixeles(face_details, ancho, alto)
+                self.cache.guardar(clave, face_details, self.cache_ttl)
             
             return {
-                "faces_count": len(response['FaceDetails']),
-                "faces": response['FaceDetails']
+                "faces_count": len(face_details),
+                "faces": face_details
             }
         except Exception as e:
             raise Exception(f"Error al detectar rostros: {str(e)}")
     
+    async def compare_faces_s3(self, source_bytes: bytes, source_hash: str, target_key: str, umbral: float) -> dict:
+        """
+        Comparar un rostro contra una imagen del bucket. Las claves de S3 de los
+        casos son únicas, así que el resultado se guarda en caché por clave.
+        `source_bytes` ya debe venir preparado y `source_hash` es el de la imagen recibida.
+        """
+        clave = f"compare-s3:{source_hash}:{target_key}:{umbral}"
+        encontrado, response = self.cache.obtener(clave)
+        if encontrado:
+            return response
+        
+        try:
+            response = await aws_gateway.ejecutar(
+                "rekognition.compare_faces",
+                self.rekognition_client.compare_faces,
+                SourceImage={'Bytes': source_bytes},
+                TargetImage={'S3Object': {'Bucket': settings.S3_BUCKET_NAME, 'Name': target_key}},
+                SimilarityThreshold=umbral
+            )
+            response.pop('ResponseMetadata', None)
+        except self.rekognition_client.exceptions.InvalidParameterException:
+            # Sin rostros detectables en alguna de las imágenes
+            response = {'FaceMatches': [], 'UnmatchedFaces': []}
+        
+        self.cache.guardar(clave, response, self.cache_ttl)
+        return response
+    
     async def compare_faces(self, source_image: UploadFile, target_image: UploadFile) -> dict:
         """Comparar dos rostros"""
         try:
             source_bytes = await source_image.read()
             target_bytes = await target_image.read()
             
-            response = self.rekognition_client.compare_faces(
-                SourceImage={'Bytes': source_bytes},
-                TargetImage={'Bytes': target_bytes}
-            )
+            clave = f"compare:{huella_imagen(source_bytes)}:{huella_imagen(target_bytes)}"
+            encontrado, response = self.cache.obtener(clave)
+            if not encontrado:
+                (source_enviados, source_ancho, source_alto), (target_enviados, target_ancho, target_alto) = await asyncio.gather(
+                    imagen_service.preparar_rekognition(source_bytes),
+                    imagen_service.preparar_rekognition(target_bytes)
+                )
+                response = await aws_gateway.ejecutar(
+                    "rekognition.compare_faces",
+                    self.rekognition_client.compare_faces,
+                    SourceImage={'Bytes': source_enviados},
+                    TargetImage={'Bytes': target_enviados}
+                )
+                response.pop('ResponseMetadata', None)
+                agregar_cajas_en_pixeles([response.get('SourceImageFace')], source_ancho, source_alto)
+                agregar_cajas_en_pixeles(
+                    [match['Face'] for match in response.get('FaceMatches', [])] + response.get('UnmatchedFaces', []),
+                    target_ancho, target_alto
+                )
+                self.cache.guardar(clave, response, self.cache_ttl)
             
             return response
         except Exception as e:
@@ -0,0 +1,109 @@
+# app/services/revocacion_service.py
+import asyncio
+import logging
+from datetime import timedelta
+import pymysql
+from app.core.config import settings
+from app.core.database import ejecutar_db
+from app.core.seguridad import gestor_tokens
+
+logger = logging.getLogger(__name__)
+
+# Tokens revocados compartidos entre workers (sql/005_tokens_revocados.sql).
+# La tabla es la fuente de verdad; la ListaRevocacion de gestor_tokens es su
+# copia en memoria, para que verificar un token de acceso no consulte la base.
+
+# Cada sincronización relee también las filas de este margen anterior: una
+# transacción que tardó en confirmarse no se pierde
+MARGEN_SINCRONIZACION = timedelta(seconds=30)
+
+def _insertar_revocado(cursor, claims: dict) -> bool:
+    """True si el jti no estaba registrado"""
+    try:
+        cursor.execute(
+            "INSERT INTO TokensRevocados (jti, expira) VALUES (%s, FROM_UNIXTIME(%s))",
+            (bytes.fromhex(claims["jti"]), claims["exp"])
+        )
+        return True
+    except pymysql.err.IntegrityError:
+        return False
+
+def _revocar(conexion, claims_tokens: list):
+    cursor = conexion.cursor()
+    for claims in claims_tokens:
+        _insertar_revocado(cursor, claims)
+    conexion.commit()
+
+def _consumir_refresco(conexion, claims: dict) -> tuple:
+    """Marca el token de refresco como usado y lee el estado del usuario"""
+    cursor = conexion.cursor()
+    if not _insertar_revocado(cursor, claims):
+        conexion.rollback()
+        return False, None
+    conexion.commit()
+    cursor.execute("SELECT id, idTipoUsuario, estaActivo FROM Usuarios WHERE id = %s", (int(claims["sub"]),))
+    return True, cursor.fetchone()
+
+def _leer_revocados(conexion, desde) -> tuple:
+    cursor = conexion.cursor()
+    cursor.execute("SELECT NOW(3) AS ahora")
+    ahora = cursor.fetchone()["ahora"]
+    if desde is None:
+        cursor.execute(
+            "SELECT HEX(jti) AS jti, UNIX_TIMESTAMP(expira) AS expira FROM TokensRevocados WHERE expira > NOW()"
+        )
+    else:
+        cursor.execute(
+            "SELECT HEX(jti) AS jti, UNIX_TIMESTAMP(expira) AS expira FROM TokensRevocados "
+            "WHERE revocadoEn >= %s AND expira > NOW()",
+            (desde,)
+        )
+    filas = cursor.fetchall()
+    # Las filas vencidas ya no sirven: el token sería rechazado por su exp
+    cursor.execute("DELETE FROM TokensRevocados WHERE expira < NOW() - INTERVAL 1 HOUR LIMIT 1000")
+    conexion.commit()
+    return ahora, filas
+
+async def revocar_tokens(*claims_tokens: dict):
+    """Revoca los tokens en la tabla compartida y en la copia local"""
+    await ejecutar_db(_revocar, list(claims_tokens))
+    for claims in claims_tokens:
+        gestor_tokens.revocar(claims)
+
+async def consumir_refresco(claims: dict) -> tuple:
+    """
+    Usa un token de refresco una sola vez: el INSERT del jti es atómico, así
+    que de dos refrescos simultáneos con el mismo token solo uno gana.
+    Retorna (usado_ahora, usuario); usado_ahora es False si ya se había usado.
+    """
+    resultado = await ejecutar_db(_consumir_refresco, claims)
+    gestor_tokens.revocar(claims)
+    return resultado
+
+class SincronizadorRevocaciones:
+    """Copia a la lista en memoria los tokens revocados desde otros workers"""
+
+    def __init__(self, intervalo: float):
+        self.intervalo = intervalo
+        self._desde = None
+        self.sincronizaciones = 0
+
+    async def sincronizar(self) -> int:
+        ahora, filas = await ejecutar_db(_leer_revocados, self._desde)
+        for fila in filas:
+            gestor_tokens.revocados.revocar(fila["jti"], float(fila["expira"]))
+        self._desde = ahora - MARGEN_SINCRONIZACION
+        self.sincronizaciones += 1
+        return len(filas)
+
+async def sincronizar_periodicamente():
+    """Tarea de fondo: carga los revocados al iniciar y trae los nuevos cada intervalo"""
+    while True:
+        try:
+            await sincronizador_revocaciones.sincronizar()
+        except Exception as e:
+            logger.warning("No se pudieron sincronizar los tokens revocados: %s", e)
+        await asyncio.sleep(sincronizador_revocaciones.intervalo)
+
+# Instancia global
+sincronizador_revocaciones = SincronizadorRevocaciones(settings.REVOCACION_SINCRONIZAR_SEGUNDOS)
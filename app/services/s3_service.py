@@ -1,7 +1,13 @@
 # app/services/s3_service.py
+import asyncio
+import logging
+import os
 from fastapi import UploadFile
-from app.core.aws_clients import aws_clients
+from app.core.aws_clients import aws_clients, aws_gateway
 from app.core.config import settings
+from app.services.imagen_service import imagen_service, archivo_variante, tipo_contenido_variante
+
+logger = logging.getLogger(__name__)
 
 class S3Service:
     """Servicio para operaciones con S3"""
@@ -10,24 +16,86 @@ class S3Service:
         self.s3_client = aws_clients.s3
         self.bucket_name = settings.S3_BUCKET_NAME
     
+    def get_url(self, key: str) -> str:
+        """URL pública de un objeto del bucket"""
+        return f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{key}"
+    
+    async def upload_image(self, file: UploadFile, key_base: str) -> str:
+        """
+        Normaliza una imagen y sube el original junto a sus variantes en la
+        carpeta key_base/. Retorna la URL del original. Si alguna subida falla se
+        eliminan las que sí se completaron: sin URL, nadie más podría borrarlas.
+        """
+        try:
+            variantes = await imagen_service.normalizar(await file.read())
+            claves = [f"{key_base}/{archivo_variante(nombre)}" for nombre in variantes]
+            
+            resultados = await asyncio.gather(*[
+                aws_gateway.ejecutar(
+                    "s3.put_object",
+                    self.s3_client.put_object,
+                    Bucket=self.bucket_name,
+                    Key=clave,
+                    Body=datos,
+                    ContentType=tipo_contenido_variante(nombre)
+                )
+                for clave, (nombre, datos) in zip(claves, variantes.items())
+            ], return_exceptions=True)
+            
+            errores = [resultado for resultado in resultados if isinstance(resultado, BaseException)]
+            if errores:
+                await self._eliminar_subidas([
+                    clave for clave, resultado in zip(claves, resultados)
+                    if not isinstance(resultado, BaseException)
+                ])
+                raise errores[0]
+            
+            return self.get_url(f"{key_base}/{archivo_variante('original')}")
+        except Exception as e:
+            raise Exception(f"Error al subir imagen a S3: {str(e)}")
+    
+    async def _eliminar_subidas(self, claves: list):
+        """Compensación de una subida parcial; los errores solo se registran"""
+        async def eliminar(clave):
+            try:
+                await aws_gateway.ejecutar(
+                    "s3.delete_object",
+                    self.s3_client.delete_object,
+                    Bucket=self.bucket_name,
+                    Key=clave
+                )
+            except Exception as e:
+                logger.warning("No se pudo eliminar la variante huérfana %s: %s", clave, e)
+        
+        await asyncio.gather(*[eliminar(clave) for clave in claves])
+    
     async def upload_file(self, file: UploadFile) -> str:
         """Subir archivo a S3 y retornar la URL"""
+        if settings.IMAGENES_NORMALIZAR and (file.content_type or "").startswith("image/"):
+            return await self.upload_image(file, os.path.splitext(file.filename)[0])
+        
         try:
-            self.s3_client.upload_fileobj(
+            await aws_gateway.ejecutar(
+                "s3.upload_fileobj",
+                self.s3_client.upload_fileobj,
                 file.file,
                 self.bucket_name,
                 file.filename
             )
             
-            file_url = f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{file.filename}"
-            return file_url
+            return self.get_url(file.filename)
         except Exception as e:
             raise Exception(f"Error al subir archivo a S3: {str(e)}")
     
     async def delete_file(self, filename: str) -> bool:
         """Eliminar archivo de S3"""
         try:
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=filename)
+            await aws_gateway.ejecutar(
+                "s3.delete_object",
+                self.s3_client.delete_object,
+                Bucket=self.bucket_name,
+                Key=filename
+            )
             return True
         except Exception as e:
             raise Exception(f"Error al eliminar archivo de S3: {str(e)}")
@@ -0,0 +1,65 @@
+# app/services/versiones_service.py
+import logging
+from typing import Optional
+from app.services.catalogos_service import catalogos
+
+logger = logging.getLogger(__name__)
+
+# Versiones de los casos para los ETag de las respuestas (sql/004_versiones_casos.sql).
+# La versión de cada caso cambia dentro de la transacción de la escritura; la
+# de la colección, después de su commit.
+
+def incrementar_version_coleccion(conexion):
+    """
+    Marca que cambió algún caso: invalida los ETag de los listados. Se llama
+    después del commit de la escritura, en una transacción propia de una sola
+    sentencia: la fila es única para todos los casos y bloquearla durante cada
+    escritura (incluidos los grupos de /crear-lote) las serializaba. listar lee
+    la versión antes que la página, así que entre ambos commits a lo sumo
+    responde 304 a quien ya tenía la página anterior.
+    """
+    try:
+        conexion.cursor().execute("UPDATE VersionesColeccion SET version = version + 1 WHERE nombre = 'casos'")
+        conexion.commit()
+    except Exception as e:
+        # La escritura ya está confirmada: no se reporta como fallida
+        logger.error("No se pudo incrementar la versión de la colección de casos: %s", e)
+
+def incrementar_versiones_beneficiario(cursor, usuario_id: int) -> list:
+    """
+    Los datos del beneficiario forman parte de sus casos. Retorna los IDs de
+    los casos afectados para invalidar su caché y la versión de la colección
+    tras el commit.
+    """
+    cursor.execute("SELECT id FROM Casos WHERE idBeneficiario = %s FOR UPDATE", (usuario_id,))
+    ids = [fila["id"] for fila in cursor.fetchall()]
+    if ids:
+        cursor.execute("UPDATE Casos SET version = version + 1 WHERE idBeneficiario = %s", (usuario_id,))
+    return ids
+
+def leer_version_caso(conexion, caso_id: int) -> Optional[int]:
+    cursor = conexion.cursor()
+    cursor.execute("SELECT version FROM Casos WHERE id = %s", (caso_id,))
+    fila = cursor.fetchone()
+    return fila["version"] if fila else None
+
+def leer_version_coleccion(conexion) -> Optional[int]:
+    cursor = conexion.cursor()
+    cursor.execute("SELECT version FROM VersionesColeccion WHERE nombre = 'casos'")
+    fila = cursor.fetchone()
+    return fila["version"] if fila else None
+
+def _sufijo_catalogo() -> str:
+    # El nombre de la categoría sale del catálogo: si cambia, cambia la respuesta
+    etag = catalogos.etag("categorias")
+    return etag.strip('"')[:8] if etag else "0"
+
+def etag_caso(caso_id: int, version: Optional[int]) -> Optional[str]:
+    if version is None:
+        return None
+    return f'"caso-{caso_id}-{version}-{_sufijo_catalogo()}"'
+
+def etag_coleccion(version: Optional[int]) -> Optional[str]:
+    if version is None:
+        return None
+    return f'"casos-{version}-{_sufijo_catalogo()}"'
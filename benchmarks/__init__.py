@@ -0,0 +1,5 @@
+# benchmarks/__init__.py
+# Micro-benchmarks de los cambios de rendimiento. No necesitan MySQL ni AWS:
+# usan conexiones simuladas y datos sintéticos (benchmarks/datos.py).
+# Se ejecutan desde la raíz del proyecto, por ejemplo:
+#   python -m benchmarks.busqueda
@@ -0,0 +1,40 @@
+# benchmarks/asgi.py
+import asyncio
+
+# Petición directa a una aplicación ASGI, sin servidor ni cliente HTTP: lo que
+# se mide es solo el trabajo de la aplicación y sus middlewares.
+
+async def llamar(app, ruta: str, headers: dict = None) -> tuple:
+    """Retorna (status, headers, cuerpo) de un GET a `ruta`"""
+    camino, _, consulta = ruta.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": camino,
+        "raw_path": camino.encode(),
+        "query_string": consulta.encode(),
+        "root_path": "",
+        "headers": [(nombre.lower().encode(), valor.encode()) for nombre, valor in (headers or {}).items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000)
+    }
+    respuesta = {"status": None, "headers": [], "cuerpo": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensaje):
+        if mensaje["type"] == "http.response.start":
+            respuesta["status"] = mensaje["status"]
+            respuesta["headers"] = mensaje.get("headers", [])
+        elif mensaje["type"] == "http.response.body":
+            respuesta["cuerpo"].append(mensaje.get("body", b""))
+
+    await app(scope, receive, send)
+    return respuesta["status"], dict(respuesta["headers"]), b"".join(respuesta["cuerpo"])
+
+def llamar_sincrono(app, ruta: str, headers: dict = None) -> tuple:
+    return asyncio.run(llamar(app, ruta, headers))
@@ -0,0 +1,120 @@
+# benchmarks/base_datos.py
+import argparse
+import asyncio
+import statistics
+import time
+from app.core import database
+from app.core.database import ConnectionPool, ejecutar_db
+
+# Peticiones por segundo con 1, 16 y 128 clientes simultáneos que hacen una
+# consulta lenta, con y sin el executor de base de datos. Es una simulación:
+# las conexiones son falsas y cada consulta es un time.sleep que retiene el
+# hilo, como pymysql mientras espera al servidor. Mientras tanto una tarea mide
+# cuánto se retrasa el event loop: ese retraso lo sufren todas las demás
+# peticiones del worker.
+
+INTERVALO_MONITOR = 0.005
+
+class _CursorLento:
+    def __init__(self, duracion: float):
+        self.duracion = duracion
+
+    def execute(self, consulta, parametros=None):
+        # Igual que pymysql: espera la respuesta del servidor sin soltar el hilo
+        time.sleep(self.duracion)
+
+    def fetchone(self):
+        return {"id": 1}
+
+class _ConexionLenta:
+    def __init__(self, duracion: float):
+        self.duracion = duracion
+
+    def cursor(self):
+        return _CursorLento(self.duracion)
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+def _consulta(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT id FROM Casos WHERE id = %s", (1,))
+    return cursor.fetchone()
+
+async def _bloqueando():
+    conexion = database.get_db()
+    try:
+        return _consulta(conexion)
+    finally:
+        conexion.close()
+
+async def _en_executor():
+    return await ejecutar_db(_consulta)
+
+async def _monitor(retrasos: list):
+    while True:
+        inicio = time.perf_counter()
+        await asyncio.sleep(INTERVALO_MONITOR)
+        retrasos.append(time.perf_counter() - inicio - INTERVALO_MONITOR)
+
+async def _escenario(peticion, clientes: int, peticiones: int) -> tuple:
+    """Cada cliente repite peticiones hasta completar `peticiones` entre todos"""
+    restantes = peticiones
+    retrasos = []
+
+    async def cliente():
+        nonlocal restantes
+        while restantes > 0:
+            restantes -= 1
+            await peticion()
+
+    monitor = asyncio.create_task(_monitor(retrasos))
+    await asyncio.sleep(INTERVALO_MONITOR * 2)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    total = time.perf_counter() - inicio
+    # Dejar que el monitor registre la espera que estaba en curso
+    await asyncio.sleep(INTERVALO_MONITOR * 2)
+    monitor.cancel()
+    return peticiones / total, retrasos
+
+async def _medir(niveles: list, peticiones: int):
+    # Un solo event loop: el semáforo de conexiones queda ligado al primero que lo usa
+    for clientes in niveles:
+        for nombre, peticion in (("en el event loop", _bloqueando), ("ejecutar_db", _en_executor)):
+            por_segundo, retrasos = await _escenario(peticion, clientes, peticiones)
+            print(
+                f"{clientes:>4} clientes, {nombre:>16}: {por_segundo:7.1f} peticiones/s, retraso del loop "
+                f"p50 {statistics.median(retrasos) * 1000:6.1f} ms, máximo {max(retrasos) * 1000:6.1f} ms"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="Consultas lentas con y sin el executor de base de datos")
+    parser.add_argument("--clientes", default="1,16,128", help="niveles de concurrencia separados por comas")
+    parser.add_argument("--peticiones", type=int, default=200, help="peticiones por nivel y camino")
+    parser.add_argument("--duracion-ms", type=float, default=10.0)
+    argumentos = parser.parse_args()
+
+    duracion = argumentos.duracion_ms / 1000
+    # Mismo tamaño que el pool configurado; el executor y el semáforo ya se dimensionaron con él
+    database.db_pool = ConnectionPool(
+        lambda: _ConexionLenta(duracion),
+        tamano=database.db_pool.tamano,
+        max_overflow=database.db_pool.max_overflow
+    )
+    print(
+        f"simulación: consultas de {argumentos.duracion_ms:.0f} ms, pool de {database.db_pool.maximo} conexiones, "
+        f"{argumentos.peticiones} peticiones por medición"
+    )
+    niveles = [int(nivel) for nivel in argumentos.clientes.split(",")]
+    asyncio.run(_medir(niveles, argumentos.peticiones))
+    database.cerrar_executor()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/busqueda.py
+import argparse
+import statistics
+import time
+from app.services.busqueda_service import IndiceBusqueda
+from benchmarks.datos import FRACCION_COMUN, PALABRAS_FRECUENTES, TERMINO_COMUN, generar_casos
+
+# Construcción del índice de búsqueda y latencia de consultas sobre casos
+# sintéticos: términos raros, términos frecuentes y prefijos.
+
+def _medir(indice: IndiceBusqueda, consulta: str, repeticiones: int) -> tuple:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        total, _ = indice.buscar(consulta, limite=20)
+        tiempos.append(time.perf_counter() - inicio)
+    return total, statistics.median(tiempos)
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de búsqueda en memoria")
+    parser.add_argument("--casos", type=int, default=100_000)
+    parser.add_argument("--repeticiones", type=int, default=20)
+    argumentos = parser.parse_args()
+
+    casos = generar_casos(argumentos.casos)
+    indice = IndiceBusqueda()
+    inicio = time.perf_counter()
+    indice.iniciar_reconstruccion()
+    indice.reconstruir(casos)
+    construccion = time.perf_counter() - inicio
+    estadisticas = indice.estadisticas()
+    print(f"construcción: {argumentos.casos} casos, {estadisticas['terminos']} términos en {construccion:.2f} s")
+
+    # Las palabras del vocabulario aparecen en pocos casos; las frecuentes en muchos
+    rara = next(
+        palabra for palabra in casos[len(casos) // 2]["descripcion"].split()
+        if palabra not in PALABRAS_FRECUENTES and palabra != TERMINO_COMUN
+    )
+    consultas = [
+        (f"rara ({rara})", rara),
+        (f"común ({TERMINO_COMUN}, ~{FRACCION_COMUN:.0%})", TERMINO_COMUN),
+        ("dos frecuentes", f"{PALABRAS_FRECUENTES[1]} {PALABRAS_FRECUENTES[3]}"),
+        ("prefijo (hosp)", "hosp"),
+        ("prefijo corto (re)", "re")
+    ]
+    for nombre, consulta in consultas:
+        total, mediana = _medir(indice, consulta, argumentos.repeticiones)
+        print(f"{nombre:>24}: {total:7d} coincidencias, mediana {mediana * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
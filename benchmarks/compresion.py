@@ -0,0 +1,52 @@
+# benchmarks/compresion.py
+import argparse
+import statistics
+import time
+import orjson
+from app.api.routes.casos import _caso_a_json, formatear_caso, serializar_valor
+from app.core.compresion import COMPRESORES
+from benchmarks.datos import cargar_catalogos, generar_casos
+
+# Tamaño y CPU de comprimir una página de /casos/listar con cada algoritmo
+# disponible, completa y como NDJSON transmitido caso por caso (cada fragmento
+# se vacía del compresor, como en CompresionMiddleware).
+
+def _medir(comprimir, repeticiones: int) -> tuple:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.thread_time()
+        comprimido = comprimir()
+        tiempos.append(time.thread_time() - inicio)
+    return len(comprimido), statistics.median(tiempos)
+
+def _transmitido(algoritmo: str, lineas: list) -> bytes:
+    compresor = COMPRESORES[algoritmo]()
+    partes = [compresor.parte(linea) for linea in lineas[:-1]]
+    partes.append(compresor.final(lineas[-1]))
+    return b"".join(partes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compresión de respuestas")
+    parser.add_argument("--casos", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=50)
+    argumentos = parser.parse_args()
+
+    cargar_catalogos()
+    casos = generar_casos(argumentos.casos)
+    pagina = orjson.dumps(
+        {"success": True, "total": len(casos), "data": [formatear_caso(caso) for caso in casos], "siguienteCursor": None},
+        default=serializar_valor
+    )
+    lineas = [_caso_a_json(caso) + b"\n" for caso in casos]
+    print(f"página de {argumentos.casos} casos: {len(pagina) / 1024:.1f} KB; algoritmos disponibles: {', '.join(COMPRESORES)}")
+
+    for algoritmo in COMPRESORES:
+        tamano, cpu = _medir(lambda: COMPRESORES[algoritmo]().final(pagina), argumentos.repeticiones)
+        tamano_transmitido, cpu_transmitido = _medir(lambda: _transmitido(algoritmo, lineas), argumentos.repeticiones)
+        print(
+            f"{algoritmo:>5}: completa {tamano / 1024:6.1f} KB ({1 - tamano / len(pagina):.0%} menos) en {cpu * 1000:5.2f} ms; "
+            f"NDJSON por caso {tamano_transmitido / 1024:6.1f} KB en {cpu_transmitido * 1000:5.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# benchmarks/consultas.py
+import argparse
+import time
+from app.api.routes.casos import QUERY_CASO_COMPLETO
+from app.core.consultas import RegistroConsultas, _CursorInstrumentado, _normalizar
+
+# Costo de instrumentar cada cursor.execute: el registro con la huella ya en
+# caché, la normalización de una consulta nueva, y el execute completo sobre
+# un cursor que no va a la base.
+
+CONSULTA = QUERY_CASO_COMPLETO + " WHERE c.idEstado = %s AND c.fechaCreacion < %s ORDER BY c.fechaCreacion DESC LIMIT %s"
+
+class _CursorSinBase:
+    def execute(self, query, args=None):
+        return 0
+
+class _CursorMedido(_CursorInstrumentado, _CursorSinBase):
+    pass
+
+def _por_llamada(funcion, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for numero in range(repeticiones):
+        funcion(numero)
+    return (time.perf_counter() - inicio) / repeticiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo del registro de consultas")
+    parser.add_argument("--repeticiones", type=int, default=100_000)
+    argumentos = parser.parse_args()
+    repeticiones = argumentos.repeticiones
+
+    registro = RegistroConsultas(umbral_lenta=10.0)
+    sin_instrumentar = _CursorSinBase()
+    cursor = _CursorMedido()
+    parametros = (1, "2024-05-01", 20)
+    # Consultas distintas en cada llamada: ninguna está en la caché de huella
+    nuevas = [
+        f"{CONSULTA} /* {numero} */ AND c.id IN ({', '.join(['%s'] * (numero % 50 + 1))})"
+        for numero in range(repeticiones // 10)
+    ]
+
+    mediciones = [
+        ("execute sin instrumentar", lambda numero: sin_instrumentar.execute(CONSULTA, parametros)),
+        ("execute instrumentado", lambda numero: cursor.execute(CONSULTA, parametros)),
+        ("registrar (huella en caché)", lambda numero: registro.registrar(None, CONSULTA, parametros, 0.001))
+    ]
+    for nombre, funcion in mediciones:
+        print(f"{nombre:>28}: {_por_llamada(funcion, repeticiones) * 1e6:6.2f} us por consulta")
+    normalizar = _por_llamada(lambda numero: _normalizar(nuevas[numero]), len(nuevas))
+    print(f"{'huella de una consulta nueva':>28}: {normalizar * 1e6:6.2f} us por consulta")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/datos.py
+import asyncio
+import random
+import string
+from datetime import datetime, timedelta
+from decimal import Decimal
+from app.services import catalogos_service
+
+# Casos sintéticos con la forma de las filas de QUERY_CASO_COMPLETO. Son
+# deterministas (semilla fija) para que dos corridas midan lo mismo.
+
+PALABRAS_FRECUENTES = [
+    "familia", "ayuda", "tratamiento", "medicinas", "escuela", "vivienda",
+    "comunidad", "alimentos", "urgente", "niños", "hospital", "operación", "beca",
+    "silla", "ruedas", "reconstrucción", "incendio", "inundación", "útiles"
+]
+ENTIDADES = ["Ciudad de México", "Jalisco", "Nuevo León", "Puebla", "Yucatán", "Oaxaca", "Chiapas", "Sonora"]
+CALLES = ["Av. Juárez", "Calle Hidalgo", "Av. Reforma", "Calle Morelos", "Blvd. Insurgentes", "Calle Allende"]
+NOMBRES = ["María", "José", "Guadalupe", "Juan", "Ana", "Luis", "Rosa", "Carlos"]
+APELLIDOS = ["Hernández", "García", "Martínez", "López", "González", "Pérez", "Rodríguez", "Sánchez"]
+
+CATEGORIAS = {
+    1: "Salud", 2: "Educación", 3: "Vivienda", 4: "Alimentación", 5: "Discapacidad",
+    6: "Desastres naturales", 7: "Emprendimiento", 8: "Adultos mayores", 9: "Animales", 10: "Otros"
+}
+
+# Aparece en esta fracción de las descripciones: consulta sobre un término muy común
+TERMINO_COMUN = "apoyo"
+FRACCION_COMUN = 0.8
+
+# Vocabulario del resto de las palabras; cada una aparece en pocos casos
+TAMANO_VOCABULARIO = 50_000
+
+def _vocabulario(azar: random.Random) -> list:
+    return ["".join(azar.choices(string.ascii_lowercase, k=azar.randint(5, 10))) for _ in range(TAMANO_VOCABULARIO)]
+
+def _texto(azar: random.Random, vocabulario: list, palabras: int) -> str:
+    """Mezcla de palabras frecuentes y del vocabulario, sin repetir el mismo texto"""
+    return " ".join(
+        azar.choice(PALABRAS_FRECUENTES) if azar.random() < 0.3 else azar.choice(vocabulario)
+        for _ in range(palabras)
+    )
+
+def generar_casos(cantidad: int, semilla: int = 1) -> list:
+    """Filas de casos completas (caso + categoría + beneficiario), ids descendentes"""
+    azar = random.Random(semilla)
+    vocabulario = _vocabulario(azar)
+    inicio = datetime(2024, 1, 1)
+    casos = []
+    for caso_id in range(cantidad, 0, -1):
+        descripcion = _texto(azar, vocabulario, azar.randint(30, 80))
+        if azar.random() < FRACCION_COMUN:
+            descripcion = f"{TERMINO_COMUN} {descripcion}"
+        imagen = f"https://bucket.s3.us-east-1.amazonaws.com/casos/caso_{caso_id}/imagen_1_{azar.getrandbits(64):016x}/original.jpg"
+        casos.append({
+            "id": caso_id,
+            "idBeneficiario": azar.randint(1, 5000),
+            "idEstado": azar.randint(1, 5),
+            "titulo": _texto(azar, vocabulario, azar.randint(3, 8)).capitalize(),
+            "descripcion": descripcion,
+            # pymysql entrega las columnas DECIMAL con su escala
+            "montoObjetivo": Decimal(azar.randint(100_000, 50_000_000)).scaleb(-2),
+            "montoRecaudado": Decimal(azar.randint(0, 100_000)).scaleb(-2),
+            "entidad": azar.choice(ENTIDADES),
+            "direccion": f"{azar.choice(CALLES)} {azar.randint(1, 999)}",
+            "latitud": Decimal(f"{azar.uniform(14.5, 32.7):.6f}"),
+            "longitud": Decimal(f"{azar.uniform(-117.1, -86.7):.6f}"),
+            "fechaLimite": inicio + timedelta(days=azar.randint(30, 365)),
+            "fechaCreacion": inicio + timedelta(seconds=caso_id * 37),
+            "imagen1": imagen,
+            "imagen2": None,
+            "imagen3": None,
+            "imagen4": None,
+            "estaAbierto": 1,
+            "version": azar.randint(1, 20),
+            "idCategoria": azar.randint(1, 10),
+            "nombreBeneficiario": azar.choice(NOMBRES),
+            "apellidoBeneficiario": azar.choice(APELLIDOS),
+            "apellidoMaterno": azar.choice(APELLIDOS),
+            "correoBeneficiario": f"beneficiario{caso_id}@correo.mx",
+            "telefonoBeneficiario": f"55{azar.randint(10000000, 99999999)}"
+        })
+    return casos
+
+def cargar_catalogos():
+    """Carga CATEGORIAS en el catálogo global sin base de datos, para que formatear_caso no pida refrescarlo"""
+    async def leer(funcion):
+        return dict(CATEGORIAS), {1: "Administrador", 2: "Beneficiario"}
+
+    catalogos_service.ejecutar_db = leer
+    asyncio.run(catalogos_service.catalogos.refrescar())
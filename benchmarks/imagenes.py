@@ -0,0 +1,82 @@
+# benchmarks/imagenes.py
+import argparse
+import io
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from app.core.config import settings
+from app.core.procesos import contexto_procesos
+from app.services.imagen_service import preparar_para_rekognition
+
+# Preparación de una foto de cámara (4000x3000) antes de enviarla a
+# Rekognition: bytes recibidos frente a bytes enviados y tiempo por imagen.
+
+def _codificar(imagen: Image.Image, orientacion: int) -> bytes:
+    exif = Image.Exif()
+    exif[0x0112] = orientacion
+    salida = io.BytesIO()
+    imagen.save(salida, format="JPEG", quality=92, exif=exif)
+    return salida.getvalue()
+
+def foto_gradiente(ancho: int, alto: int) -> bytes:
+    """Degradados: comprime muy bien, como una foto desenfocada o de fondo liso"""
+    canales = [
+        Image.linear_gradient("L").resize((ancho, alto)),
+        Image.radial_gradient("L").resize((ancho, alto)),
+        Image.linear_gradient("L").rotate(90).resize((ancho, alto))
+    ]
+    return _codificar(Image.merge("RGB", canales), 1)
+
+def foto_textura(ancho: int, alto: int, orientacion: int = 1, semilla: int = 1) -> bytes:
+    """Ruido suavizado: mucho detalle, el peor caso para JPEG"""
+    azar = random.Random(semilla)
+    base = Image.frombytes("RGB", (ancho // 10, alto // 10), azar.randbytes(ancho // 10 * alto // 10 * 3))
+    return _codificar(base.resize((ancho, alto), Image.BICUBIC), orientacion)
+
+def _en_pool(datos: bytes, repeticiones: int) -> list:
+    """Como ImagenService.preparar_rekognition: en un proceso aparte del mismo contexto"""
+    tiempos = []
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto_procesos()) as pool:
+        pool.submit(int).result()
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            pool.submit(
+                preparar_para_rekognition, datos, settings.REKOGNITION_MAX_DIMENSION, settings.REKOGNITION_CALIDAD
+            ).result()
+            tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+def main():
+    parser = argparse.ArgumentParser(description="Preparación de imágenes para Rekognition")
+    parser.add_argument("--ancho", type=int, default=4000)
+    parser.add_argument("--alto", type=int, default=3000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    argumentos = parser.parse_args()
+
+    print(f"{argumentos.ancho}x{argumentos.alto}, REKOGNITION_MAX_DIMENSION={settings.REKOGNITION_MAX_DIMENSION}")
+    imagenes = [
+        ("gradiente", foto_gradiente(argumentos.ancho, argumentos.alto)),
+        ("textura", foto_textura(argumentos.ancho, argumentos.alto)),
+        ("textura, EXIF 6", foto_textura(argumentos.ancho, argumentos.alto, orientacion=6))
+    ]
+    for nombre, datos in imagenes:
+        tiempos = []
+        for _ in range(argumentos.repeticiones):
+            inicio = time.perf_counter()
+            enviados, ancho, alto = preparar_para_rekognition(
+                datos, settings.REKOGNITION_MAX_DIMENSION, settings.REKOGNITION_CALIDAD
+            )
+            tiempos.append(time.perf_counter() - inicio)
+        print(
+            f"{nombre:>16}: {len(datos) / 1024:7.1f} KB -> {len(enviados) / 1024:6.1f} KB "
+            f"({ancho}x{alto} orientada), mediana {statistics.median(tiempos) * 1000:6.1f} ms"
+        )
+
+    # Mismo trabajo en un proceso del pool, como en las rutas
+    tiempos = _en_pool(datos, argumentos.repeticiones)
+    print(f"en un proceso del pool: mediana {statistics.median(tiempos) * 1000:6.1f} ms (incluye copiar los bytes)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/lotes.py
+import argparse
+import asyncio
+import csv
+import io
+import time
+import orjson
+from starlette.requests import Request
+from app.api.routes.casos import CasoCreate
+from app.core.lotes import LectorLote, validar_fila
+from benchmarks.datos import generar_casos
+
+# Lectura y validación de una carga masiva de casos (la parte de
+# /casos/crear-lote que no depende de MySQL), en filas por segundo.
+
+TAMANO_BLOQUE = 64 * 1024
+COLUMNAS = list(CasoCreate.model_fields)
+
+def _filas(cantidad: int) -> list:
+    return [
+        {
+            "idBeneficiario": caso["idBeneficiario"],
+            "idCategoria": caso["idCategoria"],
+            "titulo": caso["titulo"],
+            "descripcion": caso["descripcion"],
+            "montoObjetivo": str(caso["montoObjetivo"]),
+            "entidad": caso["entidad"],
+            "direccion": caso["direccion"],
+            "fechaLimite": caso["fechaLimite"].isoformat(),
+            "latitud": str(caso["latitud"]),
+            "longitud": str(caso["longitud"])
+        }
+        for caso in generar_casos(cantidad)
+    ]
+
+def cuerpo_csv(filas: list) -> bytes:
+    salida = io.StringIO()
+    escritor = csv.DictWriter(salida, fieldnames=COLUMNAS)
+    escritor.writeheader()
+    escritor.writerows(filas)
+    return salida.getvalue().encode("utf-8")
+
+def _peticion(cuerpo: bytes, tipo: str) -> Request:
+    """Petición cuyo cuerpo llega en bloques, como desde el servidor"""
+    bloques = [cuerpo[inicio:inicio + TAMANO_BLOQUE] for inicio in range(0, len(cuerpo), TAMANO_BLOQUE)]
+
+    async def receive():
+        bloque = bloques.pop(0)
+        return {"type": "http.request", "body": bloque, "more_body": bool(bloques)}
+
+    scope = {"type": "http", "method": "POST", "path": "/casos/crear-lote", "headers": [(b"content-type", tipo.encode())]}
+    return Request(scope, receive)
+
+async def _leer_y_validar(cuerpo: bytes, tipo: str) -> tuple:
+    lector = LectorLote(_peticion(cuerpo, tipo), max_filas=10**9)
+    validas = invalidas = 0
+    async for _, fila in lector.filas():
+        caso, _ = validar_fila(CasoCreate, fila)
+        if caso is None:
+            invalidas += 1
+        else:
+            validas += 1
+    return validas, invalidas
+
+def main():
+    parser = argparse.ArgumentParser(description="Lectura y validación de cargas masivas")
+    parser.add_argument("--filas", type=int, default=50_000)
+    argumentos = parser.parse_args()
+
+    filas = _filas(argumentos.filas)
+    cuerpos = [("CSV", cuerpo_csv(filas), "text/csv"), ("JSON", orjson.dumps(filas), "application/json")]
+    for nombre, cuerpo, tipo in cuerpos:
+        inicio = time.perf_counter()
+        validas, invalidas = asyncio.run(_leer_y_validar(cuerpo, tipo))
+        duracion = time.perf_counter() - inicio
+        print(
+            f"{nombre:>4}: {len(cuerpo) / (1024 * 1024):5.1f} MB, {validas} válidas, {invalidas} inválidas, "
+            f"{duracion:.2f} s ({validas / duracion:,.0f} filas/s)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/metricas.py
+import argparse
+import asyncio
+import statistics
+import time
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from app.core.metricas import MetricasMiddleware, duracion_http, metricas, peticiones_en_curso, peticiones_http
+from benchmarks.asgi import llamar
+
+# Costo de MetricasMiddleware por petición: una ruta mínima llamada por ASGI
+# con y sin el middleware, en rondas alternadas para repartir el ruido.
+
+def crear_aplicacion(con_metricas: bool) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.get("/casos/obtener/{caso_id}")
+    async def obtener(caso_id: int):
+        return {"id": caso_id}
+
+    if con_metricas:
+        app.add_middleware(MetricasMiddleware)
+    return app
+
+async def _ronda(app, peticiones: int) -> float:
+    inicio = time.perf_counter()
+    for numero in range(peticiones):
+        await llamar(app, f"/casos/obtener/{numero}")
+    return (time.perf_counter() - inicio) / peticiones
+
+def _solo_actualizaciones(repeticiones: int) -> float:
+    """Lo que el middleware agrega a cada petición, sin la petición"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        peticiones_en_curso.sumar()
+        peticiones_en_curso.sumar(cantidad=-1)
+        duracion_http.observar("GET", "/casos/obtener/{caso_id}", valor=0.0001)
+        peticiones_http.incrementar("GET", "/casos/obtener/{caso_id}", "200")
+    return (time.perf_counter() - inicio) / repeticiones
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo del middleware de métricas")
+    parser.add_argument("--rondas", type=int, default=12)
+    parser.add_argument("--peticiones", type=int, default=5000)
+    argumentos = parser.parse_args()
+
+    aplicaciones = {"sin métricas": crear_aplicacion(False), "con métricas": crear_aplicacion(True)}
+    tiempos = {nombre: [] for nombre in aplicaciones}
+
+    async def medir():
+        # Primera petición fuera de la medición: FastAPI arma la pila de middlewares
+        for app in aplicaciones.values():
+            await llamar(app, "/casos/obtener/0")
+        for _ in range(argumentos.rondas):
+            for nombre, app in aplicaciones.items():
+                tiempos[nombre].append(await _ronda(app, argumentos.peticiones))
+
+    asyncio.run(medir())
+    print(f"{argumentos.rondas} rondas de {argumentos.peticiones} peticiones")
+    for nombre, valores in tiempos.items():
+        print(f"{nombre:>15}: mediana {statistics.median(valores) * 1e6:6.1f} us por petición")
+    print(f"{'actualizaciones':>15}: {_solo_actualizaciones(argumentos.peticiones * 10) * 1e6:6.1f} us por petición")
+
+    inicio = time.perf_counter()
+    texto = metricas.exponer()
+    print(f"{'GET /metrics':>15}: {(time.perf_counter() - inicio) * 1000:6.2f} ms para {len(texto.splitlines())} líneas")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# benchmarks/serializacion.py
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.api.routes.casos import _caso_a_json, formatear_caso, serializar_valor
+from app.schemas.casos import ListaCasosResponse
+from benchmarks.asgi import llamar
+from benchmarks.datos import cargar_catalogos, generar_casos
+
+# Formatear y serializar una página grande de casos a través de FastAPI:
+# sin response_model (jsonable_encoder + json.dumps, como antes) frente a los
+# TypedDict de app/schemas/casos.py con ORJSONResponse. También la codificación
+# por caso de la transmisión NDJSON.
+
+def _pagina(casos: list) -> dict:
+    return {"success": True, "total": len(casos), "data": [formatear_caso(caso) for caso in casos], "siguienteCursor": None}
+
+def crear_aplicaciones(casos: list) -> dict:
+    anterior = FastAPI(default_response_class=JSONResponse)
+    actual = FastAPI(default_response_class=ORJSONResponse)
+
+    @anterior.get("/listar")
+    async def listar_anterior():
+        return _pagina(casos)
+
+    @actual.get("/listar", response_model=ListaCasosResponse)
+    async def listar_actual():
+        return _pagina(casos)
+
+    return {"jsonable_encoder + json.dumps": anterior, "TypedDict + orjson": actual}
+
+def _linea_anterior(caso: dict) -> bytes:
+    return (json.dumps(formatear_caso(caso), default=serializar_valor, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _linea_actual(caso: dict) -> bytes:
+    return _caso_a_json(caso) + b"\n"
+
+async def _medir_aplicacion(app, repeticiones: int) -> tuple:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        status, _, cuerpo = await llamar(app, "/listar")
+        tiempos.append(time.perf_counter() - inicio)
+        assert status == 200, cuerpo[:200]
+    return statistics.median(tiempos), cuerpo
+
+def _medir_ndjson(codificar, casos: list, repeticiones: int) -> tuple:
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        cuerpo = b"".join(codificar(caso) for caso in casos)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), cuerpo
+
+def _comparar(nombre: str, anterior: bytes, actual: bytes):
+    if anterior == actual:
+        igualdad = "bytes idénticos"
+    elif [json.loads(linea) for linea in anterior.splitlines()] == [json.loads(linea) for linea in actual.splitlines()]:
+        # Mismos valores con otra representación (p. ej. 1500 frente a 1500.0)
+        igualdad = "mismos valores, bytes distintos"
+    else:
+        igualdad = "distinto"
+    print(f"{nombre:>30}: {igualdad}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialización de casos")
+    parser.add_argument("--casos", type=int, default=10_000)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    argumentos = parser.parse_args()
+
+    cargar_catalogos()
+    casos = generar_casos(argumentos.casos)
+    print(f"{argumentos.casos} casos, mediana de {argumentos.repeticiones} repeticiones")
+
+    cuerpos = []
+    for nombre, app in crear_aplicaciones(casos).items():
+        mediana, cuerpo = asyncio.run(_medir_aplicacion(app, argumentos.repeticiones))
+        cuerpos.append(cuerpo)
+        print(f"{nombre:>30}: {mediana * 1000:7.0f} ms ({len(cuerpo) / 1024:.0f} KB)")
+    _comparar("JSON", *cuerpos)
+
+    lineas = []
+    for nombre, codificar in (("NDJSON json.dumps", _linea_anterior), ("NDJSON orjson", _linea_actual)):
+        mediana, cuerpo = _medir_ndjson(codificar, casos, argumentos.repeticiones)
+        lineas.append(cuerpo)
+        print(f"{nombre:>30}: {mediana * 1000:7.0f} ms")
+    _comparar("NDJSON", *lineas)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,66 @@
 # main.py
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.routes import health, s3, rekognition, test, auth, casos
+from app.core.database import db_pool, cerrar_executor
+from app.core.aws_clients import aws_gateway
+from app.core.compresion import CompresionMiddleware
+from app.core.metricas import MetricasMiddleware
+from app.services.imagen_service import imagen_service
+from app.core.seguridad import hash_pool
+from app.services.rekognition_service import cache_rekognition
+from app.services.busqueda_service import reconstruir_periodicamente as reconstruir_indice_busqueda
+from app.services.geo_service import reconstruir_periodicamente as reconstruir_indice_geografico
+from app.services.estadisticas_service import conciliar_periodicamente
+from app.services.catalogos_service import refrescar_periodicamente
+from app.services.revocacion_service import sincronizar_periodicamente
+from app.api.routes import health, s3, rekognition, test, auth, casos, catalogos
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Inicialización y liberación de recursos de la aplicación"""
+    # Con un secreto por defecto cualquiera podría firmar tokens válidos
+    if not settings.JWT_SECRET:
+        raise RuntimeError("JWT_SECRET no está configurado")
+    
+    # Restaurar la caché de Rekognition guardada en el apagado anterior
+    if settings.REKOGNITION_CACHE_ARCHIVO:
+        cache_rekognition.cargar_de_disco(settings.REKOGNITION_CACHE_ARCHIVO)
+    
+    # Los índices en memoria se construyen en segundo plano: /casos/buscar responde
+    # 503 hasta entonces y las consultas geográficas usan SQL
+    construcciones = [
+        asyncio.create_task(refrescar_periodicamente()),
+        asyncio.create_task(reconstruir_indice_busqueda()),
+        asyncio.create_task(reconstruir_indice_geografico()),
+        asyncio.create_task(conciliar_periodicamente()),
+        asyncio.create_task(sincronizar_periodicamente())
+    ]
+    
+    yield
+    
+    for construccion in construcciones:
+        construccion.cancel()
+    if settings.REKOGNITION_CACHE_ARCHIVO:
+        cache_rekognition.guardar_en_disco(settings.REKOGNITION_CACHE_ARCHIVO)
+    
+    # Liberar conexiones, executors y pools de procesos al apagar
+    cerrar_executor()
+    db_pool.cerrar()
+    aws_gateway.cerrar()
+    imagen_service.cerrar()
+    hash_pool.cerrar()
 
 # Crear instancia de FastAPI
 app = FastAPI(
     title=settings.APP_NAME,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan,
+    # Serializa las respuestas con orjson en lugar de json.dumps
+    default_response_class=ORJSONResponse
 )
 
 # Configurar CORS
@@ -19,10 +72,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir las respuestas grandes (JSON y NDJSON) según Accept-Encoding
+app.add_middleware(
+    CompresionMiddleware,
+    preferencia=[nombre.strip() for nombre in settings.COMPRESION_ALGORITMOS.split(",") if nombre.strip()]
+)
+
+# Métricas por ruta (GET /metrics); se agrega al final para medir también la compresión
+app.add_middleware(MetricasMiddleware)
+
 # Incluir rutas
 app.include_router(health.router, tags=["Health"])
 app.include_router(auth.router, prefix="/auth", tags=["Autenticación"])
 app.include_router(casos.router, prefix="/casos", tags=["Casos"])
+app.include_router(catalogos.router, prefix="/catalogos", tags=["Catálogos"])
 app.include_router(s3.router, prefix="/s3", tags=["S3"])
 app.include_router(rekognition.router, prefix="/rekognition", tags=["Rekognition"])
 app.include_router(test.router, prefix="/api", tags=["Test"])
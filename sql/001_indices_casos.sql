@@ -0,0 +1,13 @@
+-- Índices para la paginación por cursor y los filtros de GET /casos/listar.
+-- Todos terminan en (fechaCreacion, id) para que cada filtro pueda recorrer
+-- el índice en el orden de la página sin ordenar en memoria.
+
+CREATE INDEX idx_casos_creacion ON Casos (fechaCreacion, id);
+CREATE INDEX idx_casos_estado_creacion ON Casos (idEstado, fechaCreacion, id);
+CREATE INDEX idx_casos_abierto_creacion ON Casos (estaAbierto, fechaCreacion, id);
+CREATE INDEX idx_casos_entidad_creacion ON Casos (entidad, fechaCreacion, id);
+CREATE INDEX idx_casos_fecha_limite ON Casos (fechaLimite);
+
+-- Filtro por categoría y join desde Casos
+CREATE INDEX idx_casocategorias_categoria ON CasoCategorias (idCategoria, idCaso);
+CREATE INDEX idx_casocategorias_caso ON CasoCategorias (idCaso);
@@ -0,0 +1,10 @@
+-- Rostros indexados en la colección de Rekognition por cada caso.
+-- Permite eliminar los rostros de un caso sin recorrer toda la colección.
+
+CREATE TABLE IF NOT EXISTS CasoRostros (
+    faceId CHAR(36) NOT NULL PRIMARY KEY,
+    idCaso INT NOT NULL,
+    campo VARCHAR(10) NOT NULL,
+    fechaCreacion DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_casorostros_caso (idCaso)
+);
@@ -0,0 +1,9 @@
+-- Ubicación opcional de los casos para GET /casos/cercanos y /casos/en-area.
+-- El índice permite filtrar por caja (rango de latitud) mientras el índice
+-- geográfico en memoria se construye al iniciar.
+
+ALTER TABLE Casos
+    ADD COLUMN latitud DECIMAL(9, 6) NULL,
+    ADD COLUMN longitud DECIMAL(9, 6) NULL;
+
+CREATE INDEX idx_casos_ubicacion ON Casos (latitud, longitud);
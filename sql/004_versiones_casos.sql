@@ -0,0 +1,14 @@
+-- Versiones para los ETag de GET /casos/obtener y /casos/listar.
+-- Casos.version se incrementa en cada escritura de un caso y la fila 'casos'
+-- de VersionesColeccion en cada alta, cambio o baja. Quien escriba en Casos
+-- fuera de esta API debe incrementar ambas para que los clientes vean el cambio.
+
+ALTER TABLE Casos
+    ADD COLUMN version INT UNSIGNED NOT NULL DEFAULT 1;
+
+CREATE TABLE IF NOT EXISTS VersionesColeccion (
+    nombre VARCHAR(32) NOT NULL PRIMARY KEY,
+    version BIGINT UNSIGNED NOT NULL DEFAULT 1
+);
+
+INSERT IGNORE INTO VersionesColeccion (nombre, version) VALUES ('casos', 1);
@@ -0,0 +1,12 @@
+-- Tokens JWT revocados (logout) o ya usados (refresco), compartidos entre workers.
+-- La clave primaria sobre jti hace que marcar un token de refresco como usado
+-- sea atómico: un segundo INSERT del mismo jti falla. Cada worker copia las
+-- filas nuevas a su lista en memoria cada REVOCACION_SINCRONIZAR_SEGUNDOS.
+
+CREATE TABLE IF NOT EXISTS TokensRevocados (
+    jti BINARY(16) NOT NULL PRIMARY KEY,
+    expira DATETIME NOT NULL,
+    revocadoEn DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+    INDEX idx_tokensrevocados_revocado (revocadoEn),
+    INDEX idx_tokensrevocados_expira (expira)
+);
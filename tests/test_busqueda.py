@@ -0,0 +1,89 @@
+# tests/test_busqueda.py
+import asyncio
+import pytest
+from app.services import busqueda_service
+from app.services.busqueda_service import IndiceBusqueda, normalizar_texto, tokenizar
+
+def caso(caso_id: int, titulo: str = "", descripcion: str = "", entidad: str = "", direccion: str = "") -> dict:
+    return {"id": caso_id, "titulo": titulo, "descripcion": descripcion, "entidad": entidad, "direccion": direccion}
+
+def indice_con(*casos) -> IndiceBusqueda:
+    indice = IndiceBusqueda()
+    indice.iniciar_reconstruccion()
+    indice.reconstruir(list(casos))
+    return indice
+
+def ids(resultado: tuple) -> list:
+    return [caso_id for caso_id, _ in resultado[1]]
+
+def test_normalizar_quita_acentos_y_minusculas():
+    assert normalizar_texto("Niño Extraviado en MÉRIDA") == "nino extraviado en merida"
+    assert normalizar_texto("Çà") == "ca"
+
+def test_tokenizar_descarta_palabras_vacias():
+    assert tokenizar("La búsqueda de un perro en el parque") == ["busqueda", "perro", "parque"]
+    assert tokenizar(None) == []
+
+def test_el_titulo_pesa_mas_que_la_descripcion():
+    indice = indice_con(
+        caso(1, titulo="Reporte", descripcion="perro perdido cerca del mercado"),
+        caso(2, titulo="Perro perdido", descripcion="reporte del mercado"),
+        caso(3, titulo="Bache", descripcion="calle rota")
+    )
+    total, resultados = indice.buscar("perro", limite=10)
+    assert total == 2
+    assert [caso_id for caso_id, _ in resultados] == [2, 1]
+
+def test_coincidencia_por_prefijo_con_menor_peso():
+    indice = indice_con(caso(1, titulo="perro"), caso(2, titulo="perrito"))
+    assert ids(indice.buscar("perr", limite=10)) == [2, 1]
+    # La palabra exacta puntúa por encima de sus expansiones
+    assert ids(indice.buscar("perro", limite=10)) == [1]
+
+def test_paginacion_y_empates_por_id_descendente():
+    indice = indice_con(*(caso(caso_id, titulo="lampara") for caso_id in range(1, 6)))
+    total, resultados = indice.buscar("lampara", limite=2, desplazamiento=1)
+    assert total == 5
+    assert [caso_id for caso_id, _ in resultados] == [4, 3]
+
+def test_indexar_y_eliminar_casos():
+    indice = indice_con(caso(1, titulo="farola apagada"))
+    indice.indexar_caso(caso(2, titulo="farola rota"))
+    assert ids(indice.buscar("farola", limite=10)) == [2, 1]
+    indice.indexar_caso(caso(2, titulo="semáforo roto"))
+    assert ids(indice.buscar("farola", limite=10)) == [1]
+    indice.eliminar_caso(1)
+    assert indice.buscar("farola", limite=10) == (0, [])
+    assert indice.estadisticas()["terminos"] == 2
+
+def test_reconstruir_reaplica_las_escrituras_ocurridas_durante_la_carga():
+    indice = indice_con(caso(1, titulo="arbol caido"))
+    indice.iniciar_reconstruccion()
+    # Los casos ya se leyeron; estas escrituras no están en la lectura
+    indice.indexar_caso(caso(3, titulo="arbol seco"))
+    indice.eliminar_caso(2)
+    indice.reconstruir([caso(1, titulo="arbol caido"), caso(2, titulo="arbol en la via")])
+    assert ids(indice.buscar("arbol", limite=10)) == [3, 1]
+    assert not indice.estadisticas()["construyendo"]
+
+def test_reconstruccion_fallida_conserva_el_indice_anterior():
+    indice = indice_con(caso(1, titulo="fuga de agua"))
+    indice.iniciar_reconstruccion()
+    with pytest.raises(KeyError):
+        indice.reconstruir([{"titulo": "sin id"}])
+    assert ids(indice.buscar("fuga", limite=10)) == [1]
+    assert not indice.estadisticas()["construyendo"]
+
+def test_construir_indice_cancela_la_reconstruccion_si_falla_la_lectura(monkeypatch):
+    indice = IndiceBusqueda()
+
+    async def ejecutar_db_falla(funcion):
+        raise ConnectionError("sin base de datos")
+
+    monkeypatch.setattr(busqueda_service, "indice_busqueda", indice)
+    monkeypatch.setattr(busqueda_service, "ejecutar_db", ejecutar_db_falla)
+    with pytest.raises(ConnectionError):
+        asyncio.run(busqueda_service.construir_indice_busqueda())
+    estadisticas = indice.estadisticas()
+    assert not estadisticas["listo"]
+    assert not estadisticas["construyendo"]
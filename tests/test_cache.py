@@ -0,0 +1,250 @@
+# tests/test_cache.py
+import asyncio
+import io
+import time
+import pytest
+from fastapi import UploadFile
+from app.core.cache import CacheBackend, CacheLectura, MemoriaLRU
+from app.services import rekognition_service
+from app.services.imagen_service import imagen_service
+
+def crear_cache(max_entradas: int = 10, ttl: float = 60) -> CacheLectura:
+    return CacheLectura(MemoriaLRU(max_entradas), prefijo="prueba", ttl=ttl)
+
+def test_un_backend_incompleto_falla_al_crearse():
+    class SinEstadisticas(CacheBackend):
+        def obtener(self, clave):
+            return False, None
+
+        def guardar(self, clave, valor, ttl):
+            pass
+
+        def eliminar(self, clave):
+            pass
+
+        def limpiar(self):
+            pass
+
+    with pytest.raises(TypeError, match="estadisticas"):
+        SinEstadisticas()
+
+def test_memoria_lru_expulsa_la_menos_usada():
+    memoria = MemoriaLRU(2)
+    memoria.guardar("a", 1, ttl=0)
+    memoria.guardar("b", 2, ttl=0)
+    memoria.obtener("a")
+    memoria.guardar("c", 3, ttl=0)
+    assert memoria.obtener("b") == (False, None)
+    assert memoria.obtener("a") == (True, 1)
+    assert memoria.estadisticas()["expulsiones"] == 1
+
+def test_memoria_lru_expira_por_ttl():
+    memoria = MemoriaLRU(10)
+    memoria.guardar("a", 1, ttl=0.01)
+    time.sleep(0.02)
+    assert memoria.obtener("a") == (False, None)
+    assert memoria.estadisticas()["expiraciones"] == 1
+
+def test_memoria_lru_sobrevive_al_reinicio(tmp_path):
+    ruta = str(tmp_path / "cache.pickle")
+    memoria = MemoriaLRU(10)
+    memoria.guardar("vigente", {"id": 1}, ttl=60)
+    memoria.guardar("vencida", {"id": 2}, ttl=0.001)
+    time.sleep(0.01)
+    memoria.guardar_en_disco(ruta)
+    nueva = MemoriaLRU(10)
+    assert nueva.cargar_de_disco(ruta) == 1
+    assert nueva.obtener("vigente") == (True, {"id": 1})
+
+def test_una_sola_carga_para_peticiones_simultaneas():
+    cache = crear_cache()
+    cargas = []
+
+    async def cargador():
+        cargas.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": 1}
+
+    async def escenario():
+        resultados = await asyncio.gather(*(cache.obtener_o_cargar(1, cargador) for _ in range(5)))
+        assert resultados == [{"id": 1}] * 5
+        # Ya en caché: no vuelve a cargar
+        assert await cache.obtener_o_cargar(1, cargador) == {"id": 1}
+
+    asyncio.run(escenario())
+    assert len(cargas) == 1
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["cargas"], estadisticas["cargasCompartidas"]) == (1, 4)
+
+def test_none_no_se_guarda():
+    cache = crear_cache()
+    cargas = []
+
+    async def cargador():
+        cargas.append(1)
+        return None
+
+    async def escenario():
+        assert await cache.obtener_o_cargar(1, cargador) is None
+        assert await cache.obtener_o_cargar(1, cargador) is None
+
+    asyncio.run(escenario())
+    assert len(cargas) == 2
+
+def test_el_error_de_la_carga_llega_a_quienes_esperan():
+    cache = crear_cache()
+
+    async def cargador():
+        await asyncio.sleep(0.01)
+        raise ValueError("falló la base")
+
+    async def escenario():
+        return await asyncio.gather(
+            *(cache.obtener_o_cargar(1, cargador) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    resultados = asyncio.run(escenario())
+    assert all(isinstance(resultado, ValueError) for resultado in resultados)
+
+def test_cancelar_a_quien_carga_no_cancela_a_quienes_esperan():
+    cache = crear_cache()
+    cargas = []
+
+    async def cargador():
+        cargas.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": 1}
+
+    async def escenario():
+        lider = asyncio.create_task(cache.obtener_o_cargar(1, cargador))
+        await asyncio.sleep(0)
+        espera = asyncio.create_task(cache.obtener_o_cargar(1, cargador))
+        await asyncio.sleep(0.01)
+        lider.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lider
+        return await espera
+
+    assert asyncio.run(escenario()) == {"id": 1}
+    # Quien esperaba toma el lugar de la carga cancelada
+    assert len(cargas) == 2
+
+def test_invalidar_durante_la_carga_evita_guardar_el_valor_viejo():
+    cache = crear_cache()
+
+    async def escenario():
+        async def cargador():
+            await cache.invalidar(1)
+            return {"version": 1}
+
+        assert await cache.obtener_o_cargar(1, cargador) == {"version": 1}
+
+        async def cargador_nuevo():
+            return {"version": 2}
+
+        return await cache.obtener_o_cargar(1, cargador_nuevo)
+
+    assert asyncio.run(escenario()) == {"version": 2}
+
+def test_invalidar_varias_claves():
+    cache = crear_cache()
+
+    async def escenario():
+        for clave in (1, 2, 3):
+            await cache.obtener_o_cargar(clave, lambda: asyncio.sleep(0, {"id": clave}))
+        await cache.invalidar(1, 2)
+        return [cache.backend.obtener(cache._clave(clave))[0] for clave in (1, 2, 3)]
+
+    assert asyncio.run(escenario()) == [False, False, True]
+
+def test_memoria_lru_en_disco_conserva_el_ttl_restante_y_el_limite(tmp_path):
+    ruta = str(tmp_path / "rekognition.pickle")
+    memoria = MemoriaLRU(10)
+    memoria.guardar("detect:aaa:ALL", [{"Confidence": 99.9}], ttl=0.2)
+    memoria.guardar("compare:aaa:bbb", {"FaceMatches": []}, ttl=60)
+    memoria.guardar("sin-ttl", 1, ttl=0)
+    memoria.guardar_en_disco(ruta)
+    assert not (tmp_path / "rekognition.pickle.tmp").exists()
+
+    nueva = MemoriaLRU(2)
+    # Las más recientes sobreviven al límite de la nueva instancia
+    assert nueva.cargar_de_disco(ruta) == 3
+    assert nueva.obtener("detect:aaa:ALL") == (False, None)
+    assert nueva.obtener("compare:aaa:bbb") == (True, {"FaceMatches": []})
+    assert nueva.obtener("sin-ttl") == (True, 1)
+
+    otra = MemoriaLRU(10)
+    otra.cargar_de_disco(ruta)
+    time.sleep(0.25)
+    # La expiración restante sobrevive al reinicio
+    assert otra.obtener("detect:aaa:ALL") == (False, None)
+    assert otra.obtener("compare:aaa:bbb")[0]
+    assert MemoriaLRU(10).cargar_de_disco(str(tmp_path / "no-existe.pickle")) == 0
+
+@pytest.fixture
+def rekognition(monkeypatch):
+    """RekognitionService con caché propia; registra cada llamada a AWS en vez de hacerla"""
+    llamadas = []
+
+    async def ejecutar(operacion, funcion, **parametros):
+        llamadas.append((operacion, parametros))
+        if operacion == "rekognition.detect_faces":
+            return {"FaceDetails": [{"Atributos": parametros["Attributes"]}]}
+        return {"FaceMatches": [], "UnmatchedFaces": [], "Llamada": len(llamadas)}
+
+    async def preparar(datos):
+        return datos, None, None
+
+    monkeypatch.setattr(rekognition_service.aws_gateway, "ejecutar", ejecutar)
+    monkeypatch.setattr(imagen_service, "preparar_rekognition", preparar)
+    servicio = rekognition_service.RekognitionService()
+    servicio.cache = MemoriaLRU(10)
+    return servicio, llamadas
+
+def _archivo(datos: bytes) -> UploadFile:
+    return UploadFile(file=io.BytesIO(datos))
+
+def test_detect_faces_usa_una_clave_por_conjunto_de_atributos(rekognition):
+    servicio, llamadas = rekognition
+
+    async def escenario():
+        await servicio.detect_faces(_archivo(b"foto"))
+        await servicio.detect_faces(_archivo(b"foto"), atributos=("DEFAULT",))
+        await servicio.detect_faces(_archivo(b"foto"), atributos=("AGE_RANGE", "EMOTIONS"))
+        # El orden de los atributos no cambia la clave
+        await servicio.detect_faces(_archivo(b"foto"), atributos=("EMOTIONS", "AGE_RANGE"))
+        return await servicio.detect_faces(_archivo(b"foto"), atributos=("DEFAULT",))
+
+    resultado = asyncio.run(escenario())
+    assert resultado["faces"] == [{"Atributos": ["DEFAULT"]}]
+    assert [parametros["Attributes"] for _, parametros in llamadas] == [["ALL"], ["DEFAULT"], ["AGE_RANGE", "EMOTIONS"]]
+
+def test_compare_faces_usa_las_huellas_de_origen_y_destino_en_orden(rekognition):
+    servicio, llamadas = rekognition
+
+    async def escenario():
+        directa = await servicio.compare_faces(_archivo(b"origen"), _archivo(b"destino"))
+        invertida = await servicio.compare_faces(_archivo(b"destino"), _archivo(b"origen"))
+        repetida = await servicio.compare_faces(_archivo(b"origen"), _archivo(b"destino"))
+        return directa, invertida, repetida
+
+    directa, invertida, repetida = asyncio.run(escenario())
+    assert len(llamadas) == 2
+    assert llamadas[1][1]["SourceImage"] == {"Bytes": b"destino"}
+    assert repetida == directa != invertida
+
+def test_compare_faces_s3_expira_con_el_ttl(rekognition):
+    servicio, llamadas = rekognition
+    servicio.cache_ttl = 0.05
+
+    async def escenario():
+        await servicio.compare_faces_s3(b"origen", "huella", "casos/1.jpg", 80.0)
+        await servicio.compare_faces_s3(b"origen", "huella", "casos/1.jpg", 80.0)
+        # Otro umbral es otra consulta
+        await servicio.compare_faces_s3(b"origen", "huella", "casos/1.jpg", 90.0)
+        await asyncio.sleep(0.06)
+        await servicio.compare_faces_s3(b"origen", "huella", "casos/1.jpg", 80.0)
+
+    asyncio.run(escenario())
+    assert [parametros["SimilarityThreshold"] for _, parametros in llamadas] == [80.0, 90.0, 80.0]
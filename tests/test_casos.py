@@ -0,0 +1,182 @@
+# tests/test_casos.py
+from datetime import datetime
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.routes import casos
+from app.api.routes.casos import CasoCreate
+from app.core.cache import CacheLectura, MemoriaLRU
+from app.services import catalogos_service
+from app.services.catalogos_service import catalogos
+from app.services.versiones_service import leer_version_caso
+
+FILA = {"id": 7, "titulo": "Silla de ruedas", "idEstado": 1, "estaAbierto": 1, "idCategoria": 5, "version": 3}
+
+def _cargar_categorias(monkeypatch, categorias: dict):
+    """Como Catalogos.refrescar, sin la base"""
+    monkeypatch.setattr(catalogos, "_categorias", categorias)
+    monkeypatch.setattr(catalogos, "_etags", {**catalogos._etags, "categorias": catalogos_service._etag(categorias)})
+
+@pytest.fixture
+def cliente(monkeypatch):
+    cargas = []
+
+    async def ejecutar_db(funcion, *args):
+        if funcion is leer_version_caso:
+            return FILA["version"]
+        cargas.append(funcion.__name__)
+        return dict(FILA)
+
+    monkeypatch.setattr(casos, "ejecutar_db", ejecutar_db)
+    monkeypatch.setattr(casos, "cache_casos", CacheLectura(MemoriaLRU(10), prefijo="caso", ttl=60))
+    _cargar_categorias(monkeypatch, {5: "Discapacidad"})
+    app = FastAPI()
+    app.include_router(casos.router, prefix="/casos")
+    return TestClient(app), cargas
+
+def test_obtener_caso_usa_la_cache_con_el_mismo_etag(cliente):
+    cliente, cargas = cliente
+    primera = cliente.get("/casos/obtener/7")
+    segunda = cliente.get("/casos/obtener/7")
+    assert primera.json() == segunda.json()
+    assert primera.headers["ETag"] == segunda.headers["ETag"]
+    assert cargas == ["_obtener_caso"]
+
+def test_obtener_caso_reformatea_si_cambia_el_catalogo(cliente, monkeypatch):
+    cliente, cargas = cliente
+    antes = cliente.get("/casos/obtener/7")
+    assert antes.json()["data"]["categoria"]["nombre"] == "Discapacidad"
+
+    _cargar_categorias(monkeypatch, {5: "Movilidad"})
+    despues = cliente.get("/casos/obtener/7")
+    assert despues.json()["data"]["categoria"]["nombre"] == "Movilidad"
+    assert despues.headers["ETag"] != antes.headers["ETag"]
+    assert len(cargas) == 2
+    # El ETag enviado corresponde al contenido: un If-None-Match con él responde 304
+    assert cliente.get("/casos/obtener/7", headers={"If-None-Match": despues.headers["ETag"]}).status_code == 304
+
+class _CursorFalso:
+    def __init__(self, conexion):
+        self.connection = conexion
+        self.lastrowid = None
+        self._filas = []
+
+    def execute(self, consulta, args=None):
+        self.connection.registrar(consulta)
+        self._filas = self.connection.ejecutar(self, " ".join(consulta.split()), args)
+
+    def executemany(self, consulta, filas):
+        self.connection.registrar(consulta)
+        self.connection.ejecutar_varias(self, " ".join(consulta.split()), filas)
+
+    def fetchall(self):
+        return self._filas
+
+    def fetchone(self):
+        return self._filas[0] if self._filas else None
+
+class ConexionFalsa:
+    """
+    Lo que _insertar_lote_casos le pide a MySQL, en memoria. `ajenas` son filas
+    de otra sesión que el servidor intercala tras la primera fila de cada
+    INSERT múltiple, como cuando executemany parte la sentencia.
+    """
+
+    def __init__(self, usuarios=(1, 2), categorias=(5,), ajenas=0):
+        self.usuarios, self.categorias, self.ajenas = set(usuarios), set(categorias), ajenas
+        self.casos = {}
+        self.caso_categorias = []
+        self.siguiente_id = 100
+        self.eventos = []
+        self._insertados = None
+
+    def cursor(self):
+        return _CursorFalso(self)
+
+    def registrar(self, consulta):
+        self.eventos.append(" ".join(consulta.split()[:3]))
+
+    def begin(self):
+        self.eventos.append("BEGIN")
+        self._insertados = []
+
+    def commit(self):
+        self.eventos.append("COMMIT")
+        self._insertados = None
+
+    def rollback(self):
+        self.eventos.append("ROLLBACK")
+        for caso_id in self._insertados or []:
+            del self.casos[caso_id]
+        self._insertados = None
+
+    def _insertar(self, valores, ajena=False) -> int:
+        caso_id = self.siguiente_id
+        self.siguiente_id += 1
+        self.casos[caso_id] = {"id": caso_id, "idBeneficiario": valores[0], "titulo": valores[2]}
+        if not ajena and self._insertados is not None:
+            self._insertados.append(caso_id)
+        return caso_id
+
+    def ejecutar(self, cursor, consulta, args):
+        if consulta.startswith("SELECT id FROM Usuarios"):
+            return [{"id": id_} for id_ in args if id_ in self.usuarios]
+        if consulta.startswith("SELECT id FROM Categorias"):
+            return [{"id": id_} for id_ in args if id_ in self.categorias]
+        if consulta.startswith("INSERT INTO Casos"):
+            cursor.lastrowid = self._insertar(args)
+            return []
+        if "WHERE id BETWEEN" in consulta:
+            return [self.casos[id_] for id_ in range(args[0], args[1] + 1) if id_ in self.casos]
+        if "WHERE c.id IN" in consulta:
+            return [self.casos[id_] for id_ in args if id_ in self.casos]
+        return []
+
+    def ejecutar_varias(self, cursor, consulta, filas):
+        if consulta.startswith("INSERT INTO CasoCategorias"):
+            self.caso_categorias.extend(filas)
+            return
+        cursor.lastrowid = self._insertar(filas[0])
+        for _ in range(self.ajenas):
+            self._insertar((99, None, "ajeno"), ajena=True)
+        for valores in filas[1:]:
+            self._insertar(valores)
+
+def crear_caso_lote(beneficiario: int, titulo: str) -> CasoCreate:
+    return CasoCreate(
+        idBeneficiario=beneficiario, idCategoria=5, titulo=titulo, descripcion="Descripción",
+        montoObjetivo=1000, entidad="Jalisco", direccion="Calle Hidalgo 1", fechaLimite=datetime(2030, 1, 1)
+    )
+
+def test_lote_incrementa_la_version_de_la_coleccion_despues_del_commit():
+    conexion = ConexionFalsa()
+    resultados, creados = casos._insertar_lote_casos(
+        conexion, [crear_caso_lote(1, "Uno"), crear_caso_lote(7, "Sin beneficiario"), crear_caso_lote(2, "Dos")]
+    )
+    assert resultados == [100, "idBeneficiario: no existe el usuario 7", 101]
+    assert [caso["titulo"] for caso in creados] == ["Uno", "Dos"]
+    # La fila de VersionesColeccion no se bloquea dentro de la transacción de los casos
+    version = conexion.eventos.index("UPDATE VersionesColeccion SET")
+    assert conexion.eventos[version - 1] == "COMMIT"
+    assert conexion.eventos[version + 1] == "COMMIT"
+    assert "BEGIN" not in conexion.eventos[version:]
+
+def test_insertar_grupo_usa_los_ids_consecutivos_desde_lastrowid():
+    conexion = ConexionFalsa()
+    conexion.begin()
+    ids = casos._insertar_grupo_casos(conexion.cursor(), [crear_caso_lote(1, titulo) for titulo in ("A", "B", "C")])
+    assert ids == [100, 101, 102]
+    assert "ROLLBACK" not in conexion.eventos
+
+def test_insertar_grupo_inserta_fila_por_fila_si_los_ids_no_son_consecutivos():
+    # Otra sesión insertó un caso en medio del INSERT múltiple
+    conexion = ConexionFalsa(ajenas=1)
+    resultados, creados = casos._insertar_lote_casos(
+        conexion, [crear_caso_lote(1, "A"), crear_caso_lote(2, "B"), crear_caso_lote(1, "C")]
+    )
+    assert "ROLLBACK" in conexion.eventos
+    assert [conexion.casos[caso_id]["titulo"] for caso_id in resultados] == ["A", "B", "C"]
+    assert [caso["titulo"] for caso in creados] == ["A", "B", "C"]
+    assert conexion.caso_categorias == [(caso_id, 5) for caso_id in resultados]
+    # Solo quedan los casos del lote y el ajeno, que el rollback no toca
+    assert sorted(caso["titulo"] for caso in conexion.casos.values()) == ["A", "B", "C", "ajeno"]
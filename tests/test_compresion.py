@@ -0,0 +1,108 @@
+# tests/test_compresion.py
+import gzip
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from app.core.compresion import COMPRESORES, CompresionMiddleware, negociar, sin_compresion
+from app.core.config import settings
+
+GRANDE = {"casos": [{"id": numero, "titulo": "Caso de prueba"} for numero in range(200)]}
+
+@pytest.mark.parametrize("accept_encoding, esperado", [
+    ("gzip, deflate", "gzip"),
+    ("br;q=1.0, gzip;q=0.5", "br"),
+    ("gzip;q=0, *", "br"),
+    ("*;q=0", None),
+    ("identity", None),
+    ("", None),
+    ("GZIP;q=0.1", "gzip"),
+    ("gzip;q=abc", None)
+])
+def test_negociar(accept_encoding, esperado):
+    assert negociar(accept_encoding, ["br", "gzip"]) == esperado
+
+def test_negociar_respeta_el_orden_del_servidor():
+    assert negociar("gzip;q=1.0, br;q=0.2", ["br", "gzip"]) == "br"
+
+@sin_compresion
+async def exportar(request):
+    return JSONResponse(GRANDE)
+
+async def grande(request):
+    return JSONResponse(GRANDE, headers={"ETag": '"v1"'})
+
+async def pequena(request):
+    return JSONResponse({"ok": True})
+
+async def imagen(request):
+    return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+async def sin_contenido(request):
+    return Response(status_code=304, headers={"ETag": '"v1"'})
+
+async def transmitida(request):
+    async def lineas():
+        for numero in range(50):
+            yield f'{{"id": {numero}}}\n'
+    return StreamingResponse(lineas(), media_type="application/x-ndjson")
+
+@pytest.fixture
+def cliente():
+    app = Starlette(routes=[
+        Route("/grande", grande),
+        Route("/pequena", pequena),
+        Route("/exportar", exportar),
+        Route("/imagen", imagen),
+        Route("/sin-contenido", sin_contenido),
+        Route("/transmitida", transmitida)
+    ])
+    return TestClient(CompresionMiddleware(app, ["br", "gzip"]))
+
+def test_comprime_respuestas_grandes_y_debilita_el_etag(cliente):
+    respuesta = cliente.get("/grande", headers={"Accept-Encoding": "gzip"})
+    assert respuesta.headers["content-encoding"] == "gzip"
+    assert respuesta.headers["etag"] == 'W/"v1"'
+    assert "Accept-Encoding" in respuesta.headers["vary"]
+    assert int(respuesta.headers["content-length"]) < len(respuesta.content)
+    assert "compresion;dur=" in respuesta.headers["server-timing"]
+    assert respuesta.json() == GRANDE
+
+@pytest.mark.skipif("br" not in COMPRESORES, reason="brotli no está instalado")
+def test_prefiere_brotli(cliente):
+    import brotli
+    with cliente.stream("GET", "/grande", headers={"Accept-Encoding": "gzip, br"}) as respuesta:
+        assert respuesta.headers["content-encoding"] == "br"
+        crudo = b"".join(respuesta.iter_raw())
+    assert b'"id":199' in brotli.decompress(crudo)
+
+def test_no_comprime_cuerpos_pequenos(cliente):
+    respuesta = cliente.get("/pequena", headers={"Accept-Encoding": "gzip"})
+    assert len(respuesta.content) < settings.COMPRESION_MIN_BYTES
+    assert "content-encoding" not in respuesta.headers
+    assert "Accept-Encoding" in respuesta.headers["vary"]
+
+@pytest.mark.parametrize("ruta", ["/exportar", "/imagen", "/sin-contenido"])
+def test_respeta_las_exclusiones(cliente, ruta):
+    respuesta = cliente.get(ruta, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in respuesta.headers
+
+def test_sin_algoritmo_aceptado_no_comprime(cliente):
+    respuesta = cliente.get("/grande", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in respuesta.headers
+    assert respuesta.headers["etag"] == '"v1"'
+
+def test_comprime_respuestas_transmitidas_por_fragmentos(cliente):
+    with cliente.stream("GET", "/transmitida", headers={"Accept-Encoding": "gzip"}) as respuesta:
+        assert respuesta.headers["content-encoding"] == "gzip"
+        assert "content-length" not in respuesta.headers
+        crudo = b"".join(respuesta.iter_raw())
+    lineas = gzip.decompress(crudo).decode().splitlines()
+    assert lineas[0] == '{"id": 0}'
+    assert len(lineas) == 50
+
+def test_desactivada_por_configuracion(cliente, monkeypatch):
+    monkeypatch.setattr(settings, "COMPRESION_ACTIVA", False)
+    respuesta = cliente.get("/grande", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in respuesta.headers
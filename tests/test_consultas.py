@@ -0,0 +1,98 @@
+# tests/test_consultas.py
+import logging
+import pymysql
+import pytest
+from app.core import consultas
+from app.core.consultas import OTRAS, RegistroConsultas, huella, redactar
+
+@pytest.mark.parametrize("consulta, esperada", [
+    ("SELECT * FROM Casos WHERE id = 5", "select * from casos where id = ?"),
+    ("SELECT * FROM Casos WHERE id = %s", "select * from casos where id = ?"),
+    ("select *  from Casos\n where titulo = 'O''Hara' ;", "select * from casos where titulo = ?"),
+    ("SELECT * FROM Casos WHERE id IN (1, 2, 3)", "select * from casos where id in (?+)"),
+    ("SELECT * FROM Casos WHERE id IN (%s,%s)", "select * from casos where id in (?+)"),
+    ("SELECT * FROM Casos WHERE lat > -19.5 AND nombre = %(nombre)s", "select * from casos where lat > ? and nombre = ?"),
+    ("SELECT col1, t2.x FROM t2", "select col1, t2.x from t2")
+])
+def test_huella(consulta, esperada):
+    assert huella(consulta) == esperada
+
+def test_inserts_multiples_comparten_huella():
+    una = huella("INSERT INTO Casos (titulo, lat) VALUES ('a', 1.5)")
+    varias = huella("INSERT INTO Casos (titulo, lat) VALUES ('a', 1.5), ('b', NULL), ('c', 3)")
+    assert una == varias == "insert into casos (titulo, lat) values (?+)"
+
+def test_redactar_no_expone_valores():
+    assert redactar(None) is None
+    assert redactar(("secreto", 3, None, b"\x00\x01", [1, 2])) == ["str[7]", "int", "NULL", "bytes[2]", "list[2]"]
+    assert redactar({"clave": "secreto"}) == {"clave": "str[7]"}
+    assert redactar(1.5) == "float"
+
+def test_estadisticas_por_huella():
+    registro = RegistroConsultas(umbral_lenta=1.0)
+    for duracion in (0.001, 0.002, 0.003):
+        registro.registrar(None, "SELECT * FROM Casos WHERE id = %s", (1,), duracion)
+    registro.registrar(None, bytearray(b"INSERT INTO Casos (id) VALUES (1),(2)"), None, 0.010)
+    estadisticas = registro.estadisticas()
+    assert estadisticas["huellas"] == 2
+    assert estadisticas["consultasLentas"] == 0
+    insercion, seleccion = estadisticas["consultas"]
+    assert insercion["huella"] == "insert into casos (id) values (?+)"
+    assert seleccion["llamadas"] == 3
+    assert seleccion["totalMs"] == 6.0
+    assert seleccion["p50Ms"] == 2.0
+    assert seleccion["maxMs"] == 3.0
+
+def test_consultas_lentas_se_registran_redactadas(caplog):
+    registro = RegistroConsultas(umbral_lenta=0.05)
+    with caplog.at_level(logging.WARNING, logger=consultas.__name__):
+        registro.registrar(None, "UPDATE Usuarios SET contrasena = %s WHERE id = %s", ("secreto", 1), 0.2)
+    assert registro.estadisticas()["consultasLentas"] == 1
+    assert "secreto" not in caplog.text
+    assert "str[7]" in caplog.text
+
+def test_huellas_excedentes_van_a_otras(monkeypatch):
+    monkeypatch.setattr(consultas, "MAX_HUELLAS", 2)
+    registro = RegistroConsultas(umbral_lenta=1.0)
+    for tabla in ("a", "b", "c", "d"):
+        registro.registrar(None, f"SELECT * FROM {tabla}", None, 0.001)
+    estadisticas = registro.estadisticas()
+    assert estadisticas["huellas"] == 3
+    otras = next(consulta for consulta in estadisticas["consultas"] if consulta["huella"] == OTRAS)
+    assert otras["llamadas"] == 2
+
+class _ConexionSinServidor:
+    """Lo que pymysql necesita para armar las sentencias, sin enviarlas"""
+    encoding = "utf8"
+    _result = None
+
+    def literal(self, valor):
+        return pymysql.converters.escape_item(valor, "utf8")
+
+class _CursorSinServidor(pymysql.cursors.Cursor):
+    def _query(self, consulta):
+        self.ejecutadas.append(len(consulta))
+        return 1
+
+class _CursorPrueba(consultas._CursorInstrumentado, _CursorSinServidor):
+    pass
+
+def test_executemany_no_deja_el_insert_multiple_en_la_cache(monkeypatch):
+    registro = RegistroConsultas(umbral_lenta=10.0)
+    monkeypatch.setattr(consultas, "registro_consultas", registro)
+    consultas._huella_cacheada.cache_clear()
+    cursor = _CursorPrueba(_ConexionSinServidor())
+    cursor.ejecutadas = []
+    filas = [(f"usuario{numero}@correo.mx", "$2b$12$" + "x" * 53) for numero in range(2000)]
+    cursor.executemany("INSERT INTO Usuarios (correo, contrasena) VALUES (%s, %s)", filas)
+
+    assert max(cursor.ejecutadas) > consultas.LARGO_MAXIMO_CACHE
+    assert consultas._huella_cacheada.cache_info().currsize == 0
+    estadisticas = registro.estadisticas()
+    assert estadisticas["consultas"][0]["huella"] == "insert into usuarios (correo, contrasena) values (?+)"
+
+def test_las_consultas_cortas_usan_la_cache():
+    consultas._huella_cacheada.cache_clear()
+    huella("SELECT * FROM Casos WHERE id = 1")
+    huella("SELECT * FROM Casos WHERE id = 1")
+    assert consultas._huella_cacheada.cache_info().hits == 1
@@ -0,0 +1,26 @@
+# tests/test_cursor.py
+from datetime import datetime
+import pytest
+from fastapi import HTTPException
+from app.api.routes.casos import FiltrosCasos, codificar_cursor, construir_filtros, decodificar_cursor
+
+def test_cursor_ida_y_vuelta():
+    caso = {"id": 42, "fechaCreacion": datetime(2024, 5, 1, 12, 30, 15, 250000)}
+    cursor = codificar_cursor(caso)
+    assert decodificar_cursor(cursor) == (caso["fechaCreacion"], 42)
+
+@pytest.mark.parametrize("cursor", ["", "no-es-base64!", "bnVsbA==", "WyJheWVyIiwgMV0="])
+def test_cursor_invalido_responde_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decodificar_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_filtros_con_posicion_usan_keyset():
+    posicion = (datetime(2024, 5, 1), 7)
+    where, valores = construir_filtros(FiltrosCasos(estaAbierto=1), posicion)
+    assert where.startswith(" WHERE c.estaAbierto = %s AND ")
+    assert "c.fechaCreacion < %s OR (c.fechaCreacion = %s AND c.id < %s)" in where
+    assert valores == [1, posicion[0], posicion[0], 7]
+
+def test_filtros_vacios_sin_where():
+    assert construir_filtros(FiltrosCasos(), None) == ("", [])
@@ -0,0 +1,136 @@
+# tests/test_database.py
+import threading
+import time
+import pymysql
+import pytest
+from app.core.database import ConnectionPool, PoolTimeoutError
+
+class ConexionFalsa:
+    """Conexión de pymysql simulada: registra lo que se le pide"""
+
+    def __init__(self, numero: int):
+        self.numero = numero
+        self.cerrada = False
+        self.rollbacks = 0
+        self.ping_falla = False
+        self.rollback_falla = False
+
+    def ping(self, reconnect=False):
+        if self.ping_falla:
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def rollback(self):
+        if self.rollback_falla:
+            raise pymysql.err.OperationalError(2013, "Lost connection")
+        self.rollbacks += 1
+
+    def close(self):
+        self.cerrada = True
+
+def crear_pool(**opciones):
+    creadas = []
+
+    def creador():
+        conexion = ConexionFalsa(len(creadas) + 1)
+        creadas.append(conexion)
+        return conexion
+
+    return ConnectionPool(creador, **opciones), creadas
+
+def test_reutiliza_la_conexion_devuelta():
+    pool, creadas = crear_pool(tamano=2, max_overflow=0)
+    primera = pool.obtener()
+    numero = primera.numero
+    primera.close()
+    segunda = pool.obtener()
+    assert segunda.numero == numero
+    assert len(creadas) == 1
+    # Al devolverla se descarta cualquier transacción pendiente
+    assert creadas[0].rollbacks == 1
+
+def test_close_es_idempotente_y_la_envoltura_queda_inutilizable():
+    pool, _ = crear_pool(tamano=1, max_overflow=0)
+    conexion = pool.obtener()
+    conexion.close()
+    conexion.close()
+    assert pool.estadisticas()["inactivas"] == 1
+    with pytest.raises(pymysql.err.InterfaceError):
+        conexion.ping()
+
+def test_overflow_se_cierra_al_devolver():
+    pool, creadas = crear_pool(tamano=1, max_overflow=1)
+    primera, segunda = pool.obtener(), pool.obtener()
+    primera.close()
+    segunda.close()
+    estadisticas = pool.estadisticas()
+    assert estadisticas["abiertas"] == 1
+    assert estadisticas["inactivas"] == 1
+    assert [conexion.cerrada for conexion in creadas] == [False, True]
+
+def test_timeout_cuando_el_pool_esta_agotado():
+    pool, _ = crear_pool(tamano=1, max_overflow=0, timeout=0.05)
+    conexion = pool.obtener()
+    inicio = time.monotonic()
+    with pytest.raises(PoolTimeoutError):
+        pool.obtener()
+    assert time.monotonic() - inicio >= 0.05
+    assert pool.estadisticas()["timeouts"] == 1
+    conexion.close()
+
+def test_la_espera_termina_cuando_otro_hilo_devuelve_una_conexion():
+    pool, creadas = crear_pool(tamano=1, max_overflow=0, timeout=5)
+    conexion = pool.obtener()
+    threading.Timer(0.05, conexion.close).start()
+    otra = pool.obtener()
+    assert otra.numero == 1
+    assert len(creadas) == 1
+    assert pool.estadisticas()["esperas"] == 1
+
+def test_recicla_conexiones_viejas():
+    pool, creadas = crear_pool(tamano=1, max_overflow=0, reciclar=0.01)
+    pool.obtener().close()
+    time.sleep(0.02)
+    conexion = pool.obtener()
+    assert conexion.numero == 2
+    assert creadas[0].cerrada
+    assert pool.estadisticas()["recicladas"] == 1
+
+def test_descarta_la_conexion_si_falla_el_ping():
+    pool, creadas = crear_pool(tamano=1, max_overflow=0)
+    pool.obtener().close()
+    creadas[0].ping_falla = True
+    conexion = pool.obtener()
+    assert conexion.numero == 2
+    assert creadas[0].cerrada
+    assert pool.estadisticas()["descartadas"] == 1
+
+def test_descarta_la_conexion_si_falla_el_rollback_al_devolver():
+    pool, creadas = crear_pool(tamano=1, max_overflow=0)
+    conexion = pool.obtener()
+    creadas[0].rollback_falla = True
+    conexion.close()
+    estadisticas = pool.estadisticas()
+    assert estadisticas["abiertas"] == 0
+    assert estadisticas["enUso"] == 0
+    assert creadas[0].cerrada
+
+def test_invalidar_libera_el_lugar_en_el_pool():
+    pool, creadas = crear_pool(tamano=1, max_overflow=0, timeout=0.05)
+    pool.obtener().invalidar()
+    assert creadas[0].cerrada
+    assert pool.obtener().numero == 2
+
+def test_un_error_al_crear_no_consume_capacidad():
+    intentos = []
+
+    def creador():
+        intentos.append(1)
+        if len(intentos) == 1:
+            raise pymysql.err.OperationalError(2003, "Can't connect")
+        return ConexionFalsa(len(intentos))
+
+    pool = ConnectionPool(creador, tamano=1, max_overflow=0, timeout=0.05)
+    with pytest.raises(pymysql.err.OperationalError):
+        pool.obtener()
+    assert pool.estadisticas()["abiertas"] == 0
+    assert pool.obtener().numero == 2
@@ -0,0 +1,104 @@
+# tests/test_estadisticas.py
+import asyncio
+from decimal import Decimal
+import pytest
+from app.services import estadisticas_service
+from app.services.estadisticas_service import EstadisticasCasos
+
+def caso(caso_id: int, estado: int = 1, abierto: int = 1, categoria: int = 5, entidad: str = "Jalisco",
+         objetivo="1000.00", recaudado="0.00") -> dict:
+    return {
+        "id": caso_id, "idEstado": estado, "estaAbierto": abierto, "idCategoria": categoria, "entidad": entidad,
+        "montoObjetivo": Decimal(objetivo) if isinstance(objetivo, str) else objetivo,
+        "montoRecaudado": Decimal(recaudado) if isinstance(recaudado, str) else recaudado
+    }
+
+def estadisticas_con(*casos) -> EstadisticasCasos:
+    estadisticas = EstadisticasCasos()
+    estadisticas.iniciar_reconstruccion()
+    estadisticas.reconstruir(list(casos))
+    return estadisticas
+
+def test_crear_actualizar_y_eliminar_aplican_la_diferencia():
+    estadisticas = estadisticas_con(caso(1, objetivo="1500.50", recaudado="200.25"))
+    estadisticas.actualizar_caso(caso(2, estado=2, categoria=3, entidad="Puebla", objetivo="99.99", recaudado="10.10"))
+    resumen = estadisticas.resumen()
+    assert resumen["total"] == 2
+    assert resumen["montoObjetivo"] == Decimal("1600.49")
+    assert resumen["montoRecaudado"] == Decimal("210.35")
+    assert resumen["porEstado"] == {1: 1, 2: 1}
+
+    # Actualizar resta lo que aportaba antes
+    estadisticas.actualizar_caso(caso(2, estado=5, abierto=0, categoria=5, entidad="Puebla", objetivo="99.99", recaudado="99.99"))
+    resumen = estadisticas.resumen()
+    assert resumen["abiertos"] == 1
+    assert resumen["montoRecaudado"] == Decimal("300.24")
+    assert resumen["porEstado"] == {1: 1, 5: 1}
+    assert resumen["porCategoria"] == {5: 2}
+
+    estadisticas.eliminar_caso(1)
+    estadisticas.eliminar_caso(1)
+    resumen = estadisticas.resumen()
+    assert resumen["total"] == 1
+    assert resumen["montoObjetivo"] == Decimal("99.99")
+    assert resumen["porEntidad"] == {"Puebla": 1}
+
+def test_los_montos_se_suman_como_decimal():
+    estadisticas = estadisticas_con()
+    # Flotantes y nulos (casos sin montoRecaudado) no acumulan error de redondeo
+    estadisticas.actualizar_caso(caso(1, objetivo=0.1, recaudado=None))
+    estadisticas.actualizar_caso(caso(2, objetivo=0.2, recaudado=None))
+    resumen = estadisticas.resumen()
+    assert resumen["montoObjetivo"] == Decimal("0.3")
+    assert resumen["montoRecaudado"] == 0
+    assert isinstance(resumen["montoObjetivo"], Decimal)
+
+def test_la_conciliacion_cuenta_los_casos_desfasados():
+    estadisticas = EstadisticasCasos()
+    estadisticas.iniciar_reconstruccion()
+    # La primera construcción no tiene contra qué comparar
+    assert estadisticas.reconstruir([caso(1), caso(2), caso(4, estado=3)]) == 0
+
+    # Fuera de esta API: el 1 cambió de monto, el 3 se creó y el 4 se eliminó
+    estadisticas.iniciar_reconstruccion()
+    diferencias = estadisticas.reconstruir([caso(1, recaudado="50.00"), caso(2), caso(3, entidad="Yucatán")])
+    assert diferencias == 3
+    resumen = estadisticas.resumen()
+    assert resumen["montoRecaudado"] == Decimal("50.00")
+    assert resumen["porEntidad"] == {"Jalisco": 2, "Yucatán": 1}
+    assert 3 not in resumen["porEstado"]
+    assert estadisticas.estadisticas()["conciliaciones"] == 2
+    assert estadisticas.estadisticas()["diferenciasCorregidas"] == 3
+
+def test_reconstruir_reaplica_las_escrituras_ocurridas_durante_la_carga():
+    estadisticas = estadisticas_con(caso(1), caso(2, recaudado="10.00"))
+    estadisticas.iniciar_reconstruccion()
+    # Los casos ya se leyeron; estas escrituras no están en la lectura
+    estadisticas.actualizar_caso(caso(1, estado=4, recaudado="75.00"))
+    estadisticas.actualizar_caso(caso(3, objetivo="500.00"))
+    estadisticas.eliminar_caso(2)
+    diferencias = estadisticas.reconstruir([caso(1), caso(2, recaudado="10.00")])
+    # Lo que ya se había aplicado en memoria no cuenta como desfase
+    assert diferencias == 0
+    resumen = estadisticas.resumen()
+    assert resumen["total"] == 2
+    assert resumen["porEstado"] == {1: 1, 4: 1}
+    assert resumen["montoObjetivo"] == Decimal("1500.00")
+    assert resumen["montoRecaudado"] == Decimal("75.00")
+    assert not estadisticas._construyendo
+
+def test_conciliar_cancela_la_reconstruccion_si_falla_la_lectura(monkeypatch):
+    estadisticas = estadisticas_con(caso(1))
+
+    async def ejecutar_db_falla(funcion):
+        raise ConnectionError("sin base de datos")
+
+    monkeypatch.setattr(estadisticas_service, "estadisticas_casos", estadisticas)
+    monkeypatch.setattr(estadisticas_service, "ejecutar_db", ejecutar_db_falla)
+    with pytest.raises(ConnectionError):
+        asyncio.run(estadisticas_service.conciliar_estadisticas())
+    assert not estadisticas._construyendo
+    # Una escritura posterior ya no queda pendiente para una reconstrucción que no llegará
+    estadisticas.actualizar_caso(caso(2))
+    assert estadisticas._pendientes == []
+    assert estadisticas.resumen()["total"] == 2
@@ -0,0 +1,147 @@
+# tests/test_geo.py
+import asyncio
+import math
+import pytest
+from app.services import geo_service
+from app.services.geo_service import (
+    KM_POR_GRADO,
+    RADIO_TIERRA_KM,
+    IndiceGeografico,
+    caja_de_radio,
+    casos_cercanos,
+    distancia_km
+)
+
+def ubicacion(caso_id: int, latitud, longitud) -> dict:
+    return {"id": caso_id, "latitud": latitud, "longitud": longitud}
+
+def indice_con(*casos) -> IndiceGeografico:
+    indice = IndiceGeografico()
+    indice.iniciar_reconstruccion()
+    indice.reconstruir(list(casos))
+    return indice
+
+def ids(resultado: list) -> list:
+    return sorted(caso_id for caso_id, *_ in resultado)
+
+@pytest.mark.parametrize("origen, destino, esperada", [
+    ((51.5074, -0.1278), (48.8566, 2.3522), 343.6),  # Londres - París
+    ((19.4326, -99.1332), (20.6597, -103.3496), 461.1),  # CDMX - Guadalajara
+    ((0.0, 0.0), (0.0, 90.0), math.pi / 2 * RADIO_TIERRA_KM),
+    ((0.0, 0.0), (0.0, 180.0), math.pi * RADIO_TIERRA_KM),
+    ((10.0, 20.0), (11.0, 20.0), KM_POR_GRADO)
+])
+def test_distancia_haversine(origen, destino, esperada):
+    assert distancia_km(*origen, *destino) == pytest.approx(esperada, abs=0.1)
+    assert distancia_km(*destino, *origen) == pytest.approx(esperada, abs=0.1)
+
+def _punto_a(latitud: float, longitud: float, distancia: float, rumbo: float) -> tuple:
+    """Punto a `distancia` km del origen con rumbo en grados (fórmula de destino)"""
+    phi, lam, theta = math.radians(latitud), math.radians(longitud), math.radians(rumbo)
+    delta = distancia / RADIO_TIERRA_KM
+    phi2 = math.asin(math.sin(phi) * math.cos(delta) + math.cos(phi) * math.sin(delta) * math.cos(theta))
+    lam2 = lam + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi), math.cos(delta) - math.sin(phi) * math.sin(phi2))
+    return math.degrees(phi2), math.degrees(lam2)
+
+@pytest.mark.parametrize("latitud, longitud, radio", [(19.4, -99.1, 10), (-33.4, -70.6, 80), (60.0, 10.0, 500), (0.0, 0.0, 1000)])
+def test_caja_de_radio_contiene_el_circulo(latitud, longitud, radio):
+    sur, oeste, norte, este = caja_de_radio(latitud, longitud, radio)
+    for rumbo in range(0, 360, 3):
+        lat, lon = _punto_a(latitud, longitud, radio, rumbo)
+        assert sur - 1e-9 <= lat <= norte + 1e-9 and oeste - 1e-9 <= lon <= este + 1e-9, rumbo
+    # Ajustada: el círculo toca los cuatro lados
+    assert distancia_km(latitud, longitud, norte, longitud) == pytest.approx(radio)
+    assert max(_punto_a(latitud, longitud, radio, rumbo / 10)[1] for rumbo in range(0, 3600)) == pytest.approx(este, abs=1e-5)
+
+def test_caja_de_radio_en_los_extremos():
+    # Cerca del polo abarca todas las longitudes; los límites no pasan de ±90/±180
+    assert caja_de_radio(89.99, 0, 50) == (pytest.approx(89.5403, abs=1e-4), -180.0, 90.0, 180.0)
+    assert caja_de_radio(0, 179.95, 20)[3] == 180.0
+    assert caja_de_radio(0, 0, 30000) == (-90.0, -180.0, 90.0, 180.0)
+
+def test_consultas_que_cruzan_el_borde_de_las_celdas():
+    # 19.999/20.001 y -99.05/-98.95 caen en celdas distintas de 0.1 grados
+    indice = indice_con(
+        ubicacion(1, 19.999, -99.05),
+        ubicacion(2, 20.001, -99.05),
+        ubicacion(3, 19.999, -98.95),
+        ubicacion(4, 20.001, -98.95),
+        ubicacion(5, 20.09, -99.09)
+    )
+    assert indice.estadisticas()["celdas"] == 4
+    assert ids(indice.en_caja(19.99, -99.06, 20.01, -98.94)) == [1, 2, 3, 4]
+    assert ids(indice.en_caja(19.99, -99.06, 20.01, -99.0)) == [1, 2]
+    # Misma celda que el 2 pero fuera de la caja
+    assert 5 not in ids(indice.en_caja(20.0, -99.06, 20.05, -99.0))
+
+def test_en_caja_incluye_los_bordes_y_no_depende_del_recorrido():
+    casos = [ubicacion(caso_id, 19 + caso_id * 0.037, -99 - caso_id * 0.053) for caso_id in range(1, 40)]
+    indice = indice_con(*casos)
+    sur, oeste, norte, este = 19.037 * 1 + 0.037 * 4, -99 - 0.053 * 20, 19 + 0.037 * 20, -99 - 0.053 * 5
+    esperados = [c["id"] for c in casos if sur <= c["latitud"] <= norte and oeste <= c["longitud"] <= este]
+    # Caja pequeña: recorre celdas; caja enorme: recorre todas las posiciones
+    assert ids(indice.en_caja(sur, oeste, norte, este)) == esperados
+    assert ids(indice.en_caja(-90, -180, 90, 180)) == list(range(1, 40))
+    assert ids(indice.en_caja(19.074, -99.106, 19.074, -99.106)) == [2]
+
+def test_mover_y_quitar_casos_limpia_las_celdas():
+    indice = indice_con(ubicacion(1, 19.45, -99.15))
+    indice.actualizar_caso(ubicacion(1, 25.65, -100.3))
+    assert indice.en_caja(19.4, -99.2, 19.5, -99.1) == []
+    assert ids(indice.en_caja(25.6, -100.4, 25.7, -100.2)) == [1]
+    indice.actualizar_caso(ubicacion(1, None, None))
+    estadisticas = indice.estadisticas()
+    assert (estadisticas["casos"], estadisticas["celdas"]) == (0, 0)
+
+def test_reconstruir_reaplica_las_escrituras_ocurridas_durante_la_carga():
+    indice = indice_con(ubicacion(1, 19.4, -99.1), ubicacion(2, 19.41, -99.11))
+    indice.iniciar_reconstruccion()
+    # Las ubicaciones ya se leyeron; estas escrituras no están en la lectura
+    indice.actualizar_caso(ubicacion(1, 20.5, -103.3))
+    indice.actualizar_caso(ubicacion(3, 19.42, -99.12))
+    indice.eliminar_caso(2)
+    indice.reconstruir([ubicacion(1, 19.4, -99.1), ubicacion(2, 19.41, -99.11)])
+    assert ids(indice.en_caja(19.3, -99.2, 19.5, -99.0)) == [3]
+    assert ids(indice.en_caja(20.4, -103.4, 20.6, -103.2)) == [1]
+    # Después de reconstruir las escrituras ya no se acumulan
+    indice.actualizar_caso(ubicacion(4, 0, 0))
+    assert indice._pendientes == []
+
+def test_casos_cercanos_filtra_por_radio_y_ordena_por_distancia(monkeypatch):
+    indice = indice_con(
+        ubicacion(1, 19.43, -99.13),
+        ubicacion(2, 19.50, -99.13),
+        ubicacion(3, 19.44, -99.13),
+        ubicacion(4, 19.43, -99.30)
+    )
+    monkeypatch.setattr(geo_service, "indice_geografico", indice)
+    caja = caja_de_radio(19.43, -99.13, 10)
+    resultado = asyncio.run(casos_cercanos(19.43, -99.13, caja, radio_km=10))
+    assert [caso_id for caso_id, _ in resultado] == [1, 3, 2]
+    assert resultado[2][1] == pytest.approx(0.07 * KM_POR_GRADO, rel=1e-3)
+
+def test_casos_cercanos_consulta_la_base_si_la_rejilla_no_esta_vigente(monkeypatch):
+    consultas = []
+
+    async def ejecutar_db(funcion, *caja):
+        consultas.append(caja)
+        return [(8, 19.44, -99.13), (9, 19.43, -99.13)]
+
+    monkeypatch.setattr(geo_service, "indice_geografico", IndiceGeografico())
+    monkeypatch.setattr(geo_service, "ejecutar_db", ejecutar_db)
+    caja = caja_de_radio(19.43, -99.13, 5)
+    assert [caso_id for caso_id, _ in asyncio.run(casos_cercanos(19.43, -99.13, caja))] == [9, 8]
+    assert consultas == [caja]
+
+def test_construir_indice_cancela_la_reconstruccion_si_falla_la_lectura(monkeypatch):
+    indice = indice_con(ubicacion(1, 19.4, -99.1))
+
+    async def ejecutar_db_falla(funcion):
+        raise ConnectionError("sin base de datos")
+
+    monkeypatch.setattr(geo_service, "indice_geografico", indice)
+    monkeypatch.setattr(geo_service, "ejecutar_db", ejecutar_db_falla)
+    with pytest.raises(ConnectionError):
+        asyncio.run(geo_service.construir_indice_geografico())
+    assert not indice._construyendo
+    assert ids(indice.en_caja(19.3, -99.2, 19.5, -99.0)) == [1]
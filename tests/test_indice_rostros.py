@@ -0,0 +1,168 @@
+# tests/test_indice_rostros.py
+import asyncio
+from types import SimpleNamespace
+import pytest
+from app.services import indice_rostros_service
+from app.services.indice_rostros_service import (
+    IndiceRostros,
+    IndiceRostrosLocal,
+    IndiceRostrosRekognition,
+    _agrupar_por_caso,
+    buscar_rostro
+)
+
+def crear_indice_local(imagenes: dict) -> IndiceRostrosLocal:
+    """Índice local que lee las imágenes de un diccionario URL -> bytes en vez de S3"""
+    indice = IndiceRostrosLocal()
+
+    async def leer_imagen(url):
+        return imagenes[url]
+
+    indice._leer_imagen = leer_imagen
+    return indice
+
+def test_indice_local_encuentra_las_imagenes_identicas():
+    indice = crear_indice_local({"s3://a": b"rostro-a", "s3://b": b"rostro-b", "s3://a-copia": b"rostro-a"})
+
+    async def probar():
+        assert await indice.indexar_caso(1, {"imagen1": "s3://a", "imagen2": "s3://b", "imagen3": None}) == 2
+        await indice.indexar_caso(2, {"imagen1": "s3://a-copia"})
+        return await indice.buscar(b"rostro-a", 80.0, 10), await indice.buscar(b"otro", 80.0, 10)
+
+    encontrados, ninguno = asyncio.run(probar())
+    assert sorted(c["caso_id"] for c in encontrados) == [1, 2]
+    assert all(c["similitud"] == 100.0 for c in encontrados)
+    assert ninguno == []
+
+def test_indice_local_reindexar_y_eliminar_quitan_los_rostros_anteriores():
+    indice = crear_indice_local({"s3://a": b"rostro-a", "s3://b": b"rostro-b"})
+
+    async def probar():
+        await indice.indexar_caso(1, {"imagen1": "s3://a"})
+        await indice.indexar_caso(1, {"imagen1": "s3://b"})
+        reindexado = (await indice.buscar(b"rostro-a", 80.0, 10), await indice.buscar(b"rostro-b", 80.0, 10))
+        await indice.eliminar_caso(1)
+        return reindexado, await indice.buscar(b"rostro-b", 80.0, 10)
+
+    (viejo, nuevo), eliminado = asyncio.run(probar())
+    assert viejo == []
+    assert nuevo == [{"caso_id": 1, "imagen": "imagen1", "similitud": 100.0}]
+    assert eliminado == []
+    assert indice._por_hash == {} and indice._por_caso == {}
+
+def test_un_indice_incompleto_falla_al_crearse():
+    class SinBuscar(IndiceRostros):
+        async def indexar_caso(self, caso_id, imagenes):
+            return 0
+
+        async def eliminar_caso(self, caso_id):
+            pass
+
+    with pytest.raises(TypeError, match="buscar"):
+        SinBuscar()
+
+def test_agrupar_por_caso_conserva_la_mejor_imagen_y_ordena():
+    coincidencias = [(1, "imagen1", 81.0), (2, "imagen1", 99.5), (1, "imagen3", 93.456), (3, "imagen2", 85.0)]
+    assert _agrupar_por_caso(coincidencias, 10) == [
+        {"caso_id": 2, "imagen": "imagen1", "similitud": 99.5},
+        {"caso_id": 1, "imagen": "imagen3", "similitud": 93.46},
+        {"caso_id": 3, "imagen": "imagen2", "similitud": 85.0}
+    ]
+    assert [c["caso_id"] for c in _agrupar_por_caso(coincidencias, 2)] == [2, 1]
+
+def test_buscar_rostro_descarta_los_casos_eliminados_sin_cambiar_el_orden(monkeypatch):
+    class IndiceFijo:
+        async def buscar(self, imagen, umbral, max_resultados):
+            return _agrupar_por_caso([(4, "imagen1", 90.0), (9, "imagen1", 97.0), (2, "imagen2", 88.0)], max_resultados)
+
+    async def ejecutar_db(funcion, caso_ids):
+        assert funcion is indice_rostros_service._casos_existentes
+        return {2, 4}
+
+    monkeypatch.setattr(indice_rostros_service, "indice_rostros", IndiceFijo())
+    monkeypatch.setattr(indice_rostros_service, "ejecutar_db", ejecutar_db)
+    coincidencias, eliminados = asyncio.run(buscar_rostro(b"foto", 80.0, 10))
+    assert [c["caso_id"] for c in coincidencias] == [4, 2]
+    assert eliminados == [9]
+
+@pytest.fixture
+def indice_rekognition(monkeypatch):
+    """IndiceRostrosRekognition con AWS y la base sustituidos; registra las llamadas"""
+    llamadas = []
+    indice = IndiceRostrosRekognition("casos")
+    indice.cliente = SimpleNamespace(index_faces=None, delete_faces=None)
+    indice._coleccion_lista = True
+    indice.fallar_en = set()
+
+    async def ejecutar(operacion, funcion, **parametros):
+        llamadas.append((operacion, parametros))
+        if operacion in indice.fallar_en:
+            raise RuntimeError(operacion)
+        if operacion == "rekognition.index_faces":
+            campo = parametros["ExternalImageId"].rsplit("_", 1)[1]
+            return {"FaceRecords": [{"Face": {"FaceId": f"rostro-{campo}"}}]}
+        return {}
+
+    async def ejecutar_db(funcion, *args):
+        if funcion.__name__ in indice.fallar_en:
+            raise RuntimeError(funcion.__name__)
+        return [] if funcion.__name__ == "_rostros_de_caso" else None
+
+    monkeypatch.setattr(indice_rostros_service.aws_gateway, "ejecutar", ejecutar)
+    monkeypatch.setattr(indice_rostros_service, "ejecutar_db", ejecutar_db)
+    return indice, llamadas
+
+def _borrados(llamadas: list) -> list:
+    return [sorted(parametros["FaceIds"]) for operacion, parametros in llamadas if operacion == "rekognition.delete_faces"]
+
+def test_indexar_borra_los_rostros_nuevos_si_no_se_pudieron_registrar(indice_rekognition):
+    indice, llamadas = indice_rekognition
+    indice.fallar_en = {"_guardar_rostros"}
+    with pytest.raises(RuntimeError):
+        asyncio.run(indice.indexar_caso(5, {"imagen1": "https://b/1.jpg", "imagen2": "https://b/2.jpg"}))
+    assert _borrados(llamadas) == [["rostro-imagen1", "rostro-imagen2"]]
+
+def test_indexar_borra_los_rostros_de_las_otras_imagenes_si_una_falla(indice_rekognition, monkeypatch):
+    indice, llamadas = indice_rekognition
+    original = indice_rostros_service.aws_gateway.ejecutar
+
+    async def fallar_imagen2(operacion, funcion, **parametros):
+        if parametros.get("ExternalImageId", "").endswith("imagen2"):
+            raise RuntimeError("imagen inválida")
+        return await original(operacion, funcion, **parametros)
+
+    monkeypatch.setattr(indice_rostros_service.aws_gateway, "ejecutar", fallar_imagen2)
+    with pytest.raises(RuntimeError, match="imagen inválida"):
+        asyncio.run(indice.indexar_caso(5, {"imagen1": "https://b/1.jpg", "imagen2": "https://b/2.jpg"}))
+    assert _borrados(llamadas) == [["rostro-imagen1"]]
+
+def test_reindexar_y_desindexar_un_caso_no_se_intercalan(monkeypatch):
+    eventos = []
+
+    class IndiceLento:
+        async def indexar_caso(self, caso_id, imagenes):
+            eventos.append(("inicio", caso_id))
+            await asyncio.sleep(0.01)
+            eventos.append(("fin", caso_id))
+
+        async def eliminar_caso(self, caso_id):
+            eventos.append(("inicio", caso_id))
+            await asyncio.sleep(0)
+            eventos.append(("fin", caso_id))
+
+    monkeypatch.setattr(indice_rostros_service, "indice_rostros", IndiceLento())
+
+    async def probar():
+        await asyncio.gather(
+            indice_rostros_service.reindexar_caso(1, {}),
+            indice_rostros_service.reindexar_caso(1, {}),
+            indice_rostros_service.desindexar_caso(1),
+            indice_rostros_service.reindexar_caso(2, {})
+        )
+
+    asyncio.run(probar())
+    caso_1 = [evento for evento, caso_id in eventos if caso_id == 1]
+    assert caso_1 == ["inicio", "fin"] * 3
+    # Otro caso no espera
+    assert eventos.index(("inicio", 2)) < eventos.index(("fin", 1))
+    assert indice_rostros_service._bloqueos_caso == {}
@@ -0,0 +1,111 @@
+# tests/test_lotes.py
+import asyncio
+import csv
+import io
+from typing import Optional
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel, Field
+from app.core.lotes import LectorLote, _registros_csv, en_grupos, validar_fila
+
+class PeticionFalsa:
+    """Lo que LectorLote usa de la petición: encabezados y el cuerpo en bloques"""
+
+    def __init__(self, cuerpo: bytes, tipo: str = "text/csv", tamano_bloque: Optional[int] = None):
+        self.headers = {"content-type": tipo}
+        self._bloques = [cuerpo[i:i + tamano_bloque] for i in range(0, len(cuerpo), tamano_bloque)] if tamano_bloque else [cuerpo]
+
+    async def stream(self):
+        for bloque in self._bloques:
+            yield bloque
+
+    async def body(self) -> bytes:
+        return b"".join(self._bloques)
+
+class Fila(BaseModel):
+    nombre: str
+    monto: float = Field(..., gt=0)
+    nota: Optional[str] = None
+
+def leer(peticion, max_filas: int = 100) -> tuple:
+    lector = LectorLote(peticion, max_filas)
+
+    async def todas():
+        return [fila async for fila in lector.filas()]
+
+    return asyncio.run(todas()), lector
+
+CSV = (
+    '\ufeffnombre,monto,nota\r\n'
+    'Ana,10.5,"dos\r\nlíneas, con coma"\n'
+    '"Pérez, José",20,\n'
+    'Luis,30,"comillas ""internas"""\n'
+    'María,40,ñandú\n'
+).encode("utf-8")
+
+def test_registros_csv_no_dependen_de_donde_se_corten_los_bloques():
+    esperados = list(csv.reader(io.StringIO(CSV.decode("utf-8-sig"), newline="")))
+
+    async def registros(tamano):
+        return [registro async for registro in _registros_csv(PeticionFalsa(CSV, tamano_bloque=tamano))]
+
+    # Bloques de 1 byte cortan dentro de las comillas, entre \r y \n y a mitad de los caracteres UTF-8
+    for tamano in (1, 2, 3, 7, 16, len(CSV)):
+        obtenidos = [next(csv.reader([registro])) for registro in asyncio.run(registros(tamano))]
+        assert obtenidos == esperados, tamano
+
+def test_filas_csv_con_campos_entrecomillados():
+    filas, lector = leer(PeticionFalsa(CSV, tamano_bloque=5))
+    assert [numero for numero, _ in filas] == [1, 2, 3, 4]
+    assert filas[0][1] == {"nombre": "Ana", "monto": "10.5", "nota": "dos\r\nlíneas, con coma"}
+    assert filas[1][1] == {"nombre": "Pérez, José", "monto": "20", "nota": None}
+    assert filas[2][1]["nota"] == 'comillas "internas"'
+    assert not lector.excedido
+
+def test_ultimo_registro_sin_salto_de_linea_y_lineas_vacias():
+    filas, _ = leer(PeticionFalsa(b"nombre,monto\n\nAna,1\n\nLuis,2", tamano_bloque=4))
+    assert [fila for _, fila in filas] == [{"nombre": "Ana", "monto": "1"}, {"nombre": "Luis", "monto": "2"}]
+
+def test_validacion_por_fila():
+    cuerpo = "nombre,monto,nota\nAna,10,\nLuis,-3,\nSolo dos,1\nMaría,abc,x\n".encode("utf-8")
+    filas, _ = leer(PeticionFalsa(cuerpo, tamano_bloque=8))
+    resultados = [validar_fila(Fila, fila) for _, fila in filas]
+
+    valida, errores = resultados[0]
+    assert valida == Fila(nombre="Ana", monto=10) and errores is None
+    assert resultados[1][0] is None and resultados[1][1][0].startswith("monto: ")
+    assert resultados[2] == (None, ["CSV: se esperaban 3 columnas y hay 2"])
+    assert resultados[3][1][0].startswith("monto: ")
+    # Un elemento del arreglo JSON que no es objeto también es un error de su fila
+    assert validar_fila(Fila, "texto")[1] == ["fila: Input should be a valid dictionary or instance of Fila"]
+
+def test_max_filas_marca_el_exceso_sin_leer_el_resto():
+    cuerpo = b"nombre,monto\n" + b"".join(f"fila{numero},1\n".encode() for numero in range(10))
+    filas, lector = leer(PeticionFalsa(cuerpo, tamano_bloque=16), max_filas=3)
+    assert len(filas) == 3
+    assert lector.excedido
+
+def test_filas_json():
+    filas, _ = leer(PeticionFalsa(b'[{"nombre": "Ana", "monto": 1}, 5]', tipo="application/json; charset=utf-8"))
+    assert filas == [(1, {"nombre": "Ana", "monto": 1}), (2, 5)]
+
+@pytest.mark.parametrize("cuerpo, tipo, codigo", [
+    (b'{"nombre": "Ana"}', "application/json", 400),
+    (b'[{"nombre": ', "application/json", 400),
+    (b"nombre\n\xff\xfe\n", "text/csv", 400),
+    (b"<filas/>", "application/xml", 415)
+])
+def test_cuerpos_invalidos(cuerpo, tipo, codigo):
+    with pytest.raises(HTTPException) as error:
+        leer(PeticionFalsa(cuerpo, tipo=tipo))
+    assert error.value.status_code == codigo
+
+def test_en_grupos():
+    async def numeros():
+        for numero in range(7):
+            yield numero
+
+    async def grupos():
+        return [grupo async for grupo in en_grupos(numeros(), 3)]
+
+    assert asyncio.run(grupos()) == [[0, 1, 2], [3, 4, 5], [6]]
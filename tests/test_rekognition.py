@@ -0,0 +1,57 @@
+# tests/test_rekognition.py
+import io
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+from app.api.routes import rekognition
+from app.core.config import settings
+from app.services.imagen_service import imagen_service, preparar_para_rekognition
+
+def _foto() -> bytes:
+    salida = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 120, 40)).save(salida, format="JPEG")
+    return salida.getvalue()
+
+@pytest.fixture
+def cliente(monkeypatch):
+    """Router de Rekognition con la base, AWS y el pool de procesos sustituidos"""
+    llamadas = {"db": 0, "comparaciones": []}
+
+    async def preparar(datos):
+        return preparar_para_rekognition(datos, settings.REKOGNITION_MAX_DIMENSION, settings.REKOGNITION_CALIDAD)
+
+    async def ejecutar_db(funcion, *args):
+        llamadas["db"] += 1
+        return [(1, "imagen1", "https://bucket/casos/1.jpg"), (2, "imagen1", "https://bucket/casos/2.jpg")]
+
+    async def compare_faces_s3(source_bytes, source_hash, clave, umbral):
+        llamadas["comparaciones"].append((source_bytes, source_hash))
+        return {"FaceMatches": [{"Similarity": 91.234}]} if clave.endswith("1.jpg") else {}
+
+    monkeypatch.setattr(settings, "REKOGNITION_PREPROCESAR", True)
+    monkeypatch.setattr(imagen_service, "preparar_rekognition", preparar)
+    monkeypatch.setattr(rekognition, "ejecutar_db", ejecutar_db)
+    monkeypatch.setattr(rekognition.rekognition_service, "compare_faces_s3", compare_faces_s3)
+    app = FastAPI()
+    app.include_router(rekognition.router)
+    return TestClient(app), llamadas
+
+def test_compare_batch_rechaza_una_foto_invalida_antes_de_transmitir(cliente):
+    cliente, llamadas = cliente
+    respuesta = cliente.post("/compare-batch", files={"file": ("foto.jpg", b"no es una imagen", "image/jpeg")})
+    assert respuesta.status_code == 400
+    assert llamadas["db"] == 0
+    assert llamadas["comparaciones"] == []
+
+def test_compare_batch_transmite_con_la_foto_preparada(cliente):
+    cliente, llamadas = cliente
+    foto = _foto()
+    respuesta = cliente.post("/compare-batch", files={"file": ("foto.jpg", foto, "image/jpeg")})
+    assert respuesta.status_code == 200
+    lineas = [json.loads(linea) for linea in respuesta.text.splitlines()]
+    assert lineas[-1] == {"resumen": {"comparaciones": 2, "coincidencias": 1, "errores": 0}}
+    assert {linea["caso_id"]: linea["coincide"] for linea in lineas[:-1]} == {1: True, 2: False}
+    # La huella es la de los bytes recibidos, para compartir la caché con compare_faces
+    assert {huella for _, huella in llamadas["comparaciones"]} == {rekognition.huella_imagen(foto)}
@@ -0,0 +1,112 @@
+# tests/test_seguridad.py
+import asyncio
+import multiprocessing
+import time
+import uuid
+from datetime import datetime
+import jwt
+import pytest
+from app.core.procesos import contexto_procesos
+from app.core.seguridad import GestorTokens, ListaRevocacion, TokenInvalidoError
+from app.services import revocacion_service
+
+USUARIO = {"id": 7, "idTipoUsuario": 2}
+
+def crear_gestor(**opciones):
+    parametros = {"secreto": "secreto-de-prueba", "algoritmo": "HS256", "minutos_acceso": 15, "dias_refresco": 7, "max_cache": 100}
+    parametros.update(opciones)
+    return GestorTokens(**parametros)
+
+def test_lista_revocacion_revoca_hasta_la_expiracion():
+    lista = ListaRevocacion()
+    vigente, vencido = uuid.uuid4().hex, uuid.uuid4().hex
+    lista.revocar(vigente, time.time() + 60)
+    lista.revocar(vencido, time.time() - 1)
+    assert lista.esta_revocado(vigente)
+    assert not lista.esta_revocado(uuid.uuid4().hex)
+    # len purga los jti cuyo token ya habría expirado
+    assert len(lista) == 1
+    assert not lista.esta_revocado(vencido)
+
+def test_lista_revocacion_ignora_duplicados():
+    lista = ListaRevocacion()
+    jti = uuid.uuid4().hex
+    lista.revocar(jti, time.time() + 60)
+    lista.revocar(jti.upper(), time.time() + 120)
+    assert len(lista) == 1
+
+def test_verifica_tokens_emitidos_y_usa_la_cache():
+    gestor = crear_gestor()
+    tokens = gestor.crear_tokens(USUARIO)
+    claims = gestor.verificar(tokens["acceso"])
+    assert claims["sub"] == "7"
+    assert claims["idTipoUsuario"] == 2
+    assert gestor.verificar(tokens["acceso"]) == claims
+    estadisticas = gestor.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"]) == (1, 1)
+
+def test_rechaza_el_tipo_incorrecto():
+    gestor = crear_gestor()
+    tokens = gestor.crear_tokens(USUARIO)
+    with pytest.raises(TokenInvalidoError):
+        gestor.verificar(tokens["refresco"])
+    assert gestor.verificar(tokens["refresco"], tipo="refresco")["tipo"] == "refresco"
+
+def test_rechaza_tokens_revocados_aunque_esten_en_cache():
+    gestor = crear_gestor()
+    token = gestor.crear_tokens(USUARIO)["acceso"]
+    claims = gestor.verificar(token)
+    gestor.revocar(claims)
+    with pytest.raises(TokenInvalidoError, match="revocado"):
+        gestor.verificar(token)
+
+def test_rechaza_firma_ajena_y_tokens_vencidos():
+    gestor = crear_gestor()
+    ajeno = crear_gestor(secreto="otro-secreto").crear_tokens(USUARIO)["acceso"]
+    with pytest.raises(TokenInvalidoError):
+        gestor.verificar(ajeno)
+    vencido = jwt.encode(
+        {"sub": "7", "tipo": "acceso", "jti": uuid.uuid4().hex, "exp": int(time.time()) - 10},
+        "secreto-de-prueba",
+        algorithm="HS256"
+    )
+    with pytest.raises(TokenInvalidoError):
+        gestor.verificar(vencido)
+
+def test_exige_jti():
+    gestor = crear_gestor()
+    sin_jti = jwt.encode({"sub": "7", "tipo": "acceso", "exp": int(time.time()) + 60}, "secreto-de-prueba", algorithm="HS256")
+    with pytest.raises(TokenInvalidoError):
+        gestor.verificar(sin_jti)
+
+def test_la_cache_respeta_su_tamano_maximo():
+    gestor = crear_gestor(max_cache=2)
+    for numero in range(5):
+        gestor.verificar(gestor.crear_tokens({"id": numero})["acceso"])
+    assert gestor.estadisticas()["tokensEnCache"] == 2
+
+def test_sincronizador_copia_los_revocados_y_avanza_el_punto_de_partida(monkeypatch):
+    gestor = crear_gestor()
+    jti = uuid.uuid4().hex.upper()
+    ahora = datetime(2024, 5, 1, 12, 0, 0)
+    llamadas = []
+
+    async def ejecutar_db_falso(funcion, desde):
+        llamadas.append(desde)
+        return ahora, [{"jti": jti, "expira": time.time() + 60}]
+
+    monkeypatch.setattr(revocacion_service, "ejecutar_db", ejecutar_db_falso)
+    monkeypatch.setattr(revocacion_service, "gestor_tokens", gestor)
+    sincronizador = revocacion_service.SincronizadorRevocaciones(intervalo=5)
+    assert asyncio.run(sincronizador.sincronizar()) == 1
+    asyncio.run(sincronizador.sincronizar())
+    assert gestor.revocados.esta_revocado(jti)
+    assert llamadas == [None, ahora - revocacion_service.MARGEN_SINCRONIZACION]
+
+@pytest.mark.parametrize("metodos, esperado", [
+    (["fork", "spawn", "forkserver"], "forkserver"),
+    (["spawn"], "spawn")
+])
+def test_contexto_procesos_usa_spawn_sin_forkserver(monkeypatch, metodos, esperado):
+    monkeypatch.setattr(multiprocessing, "get_all_start_methods", lambda: metodos)
+    assert contexto_procesos().get_start_method() == esperado